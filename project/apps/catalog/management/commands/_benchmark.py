@@ -0,0 +1,126 @@
+"""
+Спільний каркас benchmark-команд каталогу: синтетичні викладачі й теми,
+замір і прибирання.
+
+Команди пишуть тисячі рядків у таблиці користувачів і тем, тому без
+--allow-live-db вони працюють лише з тестовою базою.
+"""
+import statistics
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.catalog.models import TeacherTheme
+from apps.catalog.services import theme_search
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'benchmark.invalid'
+MARKER = '[benchmark]'
+BATCH_SIZE = 1000
+
+
+def is_test_database():
+    """База створена тестовим раннером Django (test_*, in-memory SQLite або TEST.NAME)."""
+    settings_dict = connection.settings_dict
+    name = str(settings_dict['NAME'])
+    return (
+        name == settings_dict.get('TEST', {}).get('NAME')
+        or Path(name).name.startswith('test_')
+        or 'mode=memory' in name
+        or name == ':memory:'
+    )
+
+
+def percentile(timings, share):
+    """Значення з відсортованого списку, нижче якого лежить частка `share` замірів."""
+    return timings[max(int(len(timings) * share) - 1, 0)]
+
+
+class ThemeBenchmarkCommand(BaseCommand):
+    """
+    Підкласи реалізують run(**options) і створюють дані через create_teachers
+    та create_themes; прибирання і перевірка бази — тут.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', action='store_true', help='Не видаляти синтетичні дані після заміру')
+        parser.add_argument(
+            '--allow-live-db', action='store_true',
+            help='Дозволити запуск на базі, яка не є тестовою',
+        )
+
+    def handle(self, *args, **options):
+        if not options['allow_live_db'] and not is_test_database():
+            raise CommandError(
+                f"База '{connection.settings_dict['NAME']}' не є тестовою. "
+                'Передайте --allow-live-db, щоб заповнити її синтетичними даними.'
+            )
+        try:
+            self.run(**options)
+        finally:
+            if not options['keep']:
+                self.cleanup()
+        self.stdout.write(self.style.SUCCESS(f"Backend: {connection.vendor}"))
+
+    def run(self, **options):
+        raise NotImplementedError
+
+    def create_teachers(self, prefix, count, first_name, last_name):
+        """Викладачі bench-<prefix>-<i>@EMAIL_DOMAIN; first_name/last_name — функції від i."""
+        return [
+            User.objects.create_user(
+                email=f"bench-{prefix}-{i}@{EMAIL_DOMAIN}", first_name=first_name(i),
+                last_name=last_name(i), role='Викладач',
+            )
+            for i in range(count)
+        ]
+
+    def create_themes(self, themes, teachers=None):
+        """
+        Зберігає теми пачками. Якщо передано викладачів, будує пошуковий
+        документ з їхніми ПІБ без додаткових запитів.
+        """
+        names = {user.pk: (user.first_name, user.last_name, user.patronymic) for user in teachers or ()}
+        batch = []
+        for theme in themes:
+            theme.theme_key = theme_search.theme_key(theme.theme)
+            if names:
+                theme.search_title, theme.search_document = theme_search.build_document(
+                    theme, names[theme.teacher_id_id]
+                )
+            batch.append(theme)
+            if len(batch) >= BATCH_SIZE:
+                TeacherTheme.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            TeacherTheme.objects.bulk_create(batch)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            table = TeacherTheme._meta.db_table
+            if connection.vendor == 'mysql':
+                cursor.execute(f"ANALYZE TABLE {table}")
+            elif connection.vendor in ('sqlite', 'postgresql'):
+                cursor.execute(f"ANALYZE {table}")
+
+    def report(self, label, timings, target_ms=None, share=0.95):
+        """Рядок p50/pNN; з target_ms — зелений або з попередженням."""
+        timings = sorted(timings)
+        line = (
+            f"{label}: p50 {statistics.median(timings):.2f} мс, "
+            f"p{round(share * 100)} {percentile(timings, share):.2f} мс ({len(timings)} замірів)"
+        )
+        if target_ms is None:
+            self.stdout.write(line)
+        elif percentile(timings, share) <= target_ms:
+            self.stdout.write(self.style.SUCCESS(line))
+        else:
+            self.stdout.write(self.style.WARNING(f"{line} — вище цілі {target_ms:.0f} мс"))
+
+    def cleanup(self):
+        self.stdout.write("Видалення синтетичних даних...")
+        TeacherTheme.objects.filter(theme_description__startswith=MARKER).delete()
+        User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
@@ -0,0 +1,68 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.catalog.services import academic_context
+from apps.catalog.views import TeachersListView, ThemesAPIView
+
+User = get_user_model()
+
+VIEWS = [
+    ('Каталог викладачів', TeachersListView, '/catalog/'),
+    ('API тем', ThemesAPIView, '/catalog/themes/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Порівнює кількість запитів до БД і час каталогу для студента '
+        'з холодним та теплим кешем академічного контексту'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Email студента (за замовчуванням — перший студент з групою)')
+        parser.add_argument('--iterations', type=int, default=50, help='Кількість запитів на замір')
+
+    def handle(self, *args, **options):
+        student = self.get_student(options['email'])
+        self.stdout.write(f"Студент: {student.email} ({student.academic_group})")
+        factory = RequestFactory()
+        for label, view_class, path in VIEWS:
+            view = view_class.as_view()
+            cold = self.measure(factory, view, path, student, options['iterations'], warm=False)
+            warm = self.measure(factory, view, path, student, options['iterations'], warm=True)
+            self.stdout.write(
+                f"{label}: {cold[0]} -> {warm[0]} запитів "
+                f"(заощаджено {cold[0] - warm[0]}), {cold[1]:.2f} -> {warm[1]:.2f} мс"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Backend: {connection.vendor}"))
+
+    def get_student(self, email):
+        students = User.objects.filter(role='Студент').exclude(academic_group='')
+        if email:
+            students = students.filter(email=email)
+        student = students.first()
+        if student is None:
+            raise CommandError('Студента з академічною групою не знайдено')
+        return student
+
+    def measure(self, factory, view, path, student, iterations, warm):
+        """Повертає (запитів до БД на один HTTP-запит, середній час у мс)."""
+        queries = 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            # Новий об'єкт користувача, як у кожному HTTP-запиті після AuthenticationMiddleware
+            user = User.objects.get(pk=student.pk)
+            if not warm:
+                academic_context.invalidate(user.pk)
+            request = factory.get(path)
+            request.user = user
+            with CaptureQueriesContext(connection) as captured:
+                view(request)
+            queries = len(captured)
+        elapsed = (time.perf_counter() - started) * 1000 / max(iterations, 1)
+        return queries, elapsed
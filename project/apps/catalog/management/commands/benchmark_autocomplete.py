@@ -0,0 +1,97 @@
+import random
+import time
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from apps.catalog.management.commands._benchmark import MARKER, ThemeBenchmarkCommand
+from apps.catalog.models import OnlyTeacher, TeacherTheme
+from apps.catalog.services import autocomplete_index
+
+FIRST_NAMES = ['Олена', 'Іван', 'Ганна', 'Петро', 'Юлія', 'Тарас', 'Ірина', 'Богдан']
+LAST_NAMES = ['Петренко', 'Коваль', 'Шевчук', 'Бондар', 'Ткаченко', 'Мельник', 'Кравець', 'Олійник']
+WORDS = [
+    'аналіз', 'моделювання', 'нейронні', 'мережі', 'сенсори', 'напівпровідникові', 'структури',
+    'оптичні', 'системи', 'обробка', 'сигналів', 'мікроконтролери', 'кластеризація', 'графів',
+    'радіочастотні', 'антени', 'квантові', 'обчислення', 'ґрунтові', 'біомедичні', 'прилади',
+]
+
+
+class Command(ThemeBenchmarkCommand):
+    help = (
+        "Вимірює p50/p99 автокомпліту з префіксного індексу в пам'яті "
+        'проти попередніх запитів icontains до БД'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--themes', type=int, default=20_000, help='Кількість синтетичних тем')
+        parser.add_argument('--teachers', type=int, default=300, help='Кількість синтетичних викладачів')
+        parser.add_argument('--queries', type=int, default=2000, help='Кількість запитів автокомпліту')
+
+    def run(self, **options):
+        self.fill(options['teachers'], options['themes'])
+        queries = self.make_queries(options['queries'])
+
+        autocomplete_index.reset()
+        started = time.perf_counter()
+        autocomplete_index.get_index()
+        self.stdout.write(f"Побудова індексу: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+        with CaptureQueriesContext(connection) as captured:
+            indexed = self.measure(autocomplete_index.search, queries)
+        legacy = self.measure(self.legacy_search, queries[:200])
+
+        self.report("Індекс у пам'яті", indexed, share=0.99)
+        self.stdout.write(f"  запитів до БД: {len(captured)}")
+        self.report('icontains (до змін)', legacy, share=0.99)
+
+    def fill(self, teachers, themes):
+        self.stdout.write(f"Створення {teachers} викладачів і {themes} тем...")
+        users = self.create_teachers(
+            'ac', teachers, first_name=lambda i: random.choice(FIRST_NAMES),
+            last_name=lambda i: f"{random.choice(LAST_NAMES)}{i}",
+        )
+        self.create_themes((
+            TeacherTheme(
+                teacher_id_id=random.choice(users).pk,
+                theme=' '.join(random.sample(WORDS, 4)).capitalize(),
+                theme_description=MARKER,
+            )
+            for _ in range(themes)
+        ), teachers=users)
+
+    def make_queries(self, count):
+        # Префікси, які користувач набирає посимвольно: 2-6 літер слова чи прізвища
+        sources = WORDS + [name.lower() for name in FIRST_NAMES + LAST_NAMES]
+        queries = []
+        for _ in range(count):
+            word = random.choice(sources)
+            queries.append(word[:random.randint(2, min(6, len(word)))])
+        return queries
+
+    def legacy_search(self, query):
+        teachers = list(OnlyTeacher.objects.select_related('teacher_id').filter(
+            Q(teacher_id__first_name__icontains=query) |
+            Q(teacher_id__last_name__icontains=query) |
+            Q(teacher_id__patronymic__icontains=query)
+        )[:5])
+        for teacher in teachers:
+            teacher.teacher_id.get_department_name()
+        return list(TeacherTheme.objects.select_related('teacher_id__teacher_id').filter(
+            Q(theme__icontains=query) | Q(theme_description__icontains=query),
+            is_active=True, is_deleted=False,
+        )[:5])
+
+    def measure(self, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)
+
+    def cleanup(self):
+        super().cleanup()
+        autocomplete_index.reset()
@@ -0,0 +1,55 @@
+import random
+import time
+
+from apps.catalog.management.commands._benchmark import MARKER, ThemeBenchmarkCommand
+from apps.catalog.models import TeacherTheme
+from apps.catalog.services import theme_search
+
+WORDS = [
+    'аналіз', 'моделювання', 'нейронні', 'мережі', 'сенсори', 'напівпровідникові', 'структури',
+    'оптичні', 'системи', 'обробка', 'сигналів', 'мікроконтролери', 'кластеризація', 'графів',
+]
+
+
+class Command(ThemeBenchmarkCommand):
+    help = (
+        'Порівнює пошук однакових тем через theme__iexact і через індексований theme_key: '
+        'плани запитів і час'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--themes', type=int, default=50_000, help='Кількість синтетичних тем')
+        parser.add_argument('--lookups', type=int, default=200, help='Кількість пошуків')
+
+    def run(self, **options):
+        titles = self.fill(options['themes'])
+        sample = random.sample(titles, min(options['lookups'], len(titles)))
+        self.explain_and_time('theme__iexact (до змін)', lambda title: TeacherTheme.objects.filter(
+            theme__iexact=title, is_active=True, is_deleted=False,
+        ), sample)
+        self.explain_and_time('theme_key', lambda title: TeacherTheme.objects.filter(
+            theme_key=theme_search.theme_key(title), is_active=True, is_deleted=False,
+        ), sample)
+
+    def fill(self, count):
+        self.stdout.write(f"Створення {count} тем...")
+        teacher = self.create_teachers('key', 1, first_name=lambda i: 'Bench', last_name=lambda i: 'Key')[0]
+        titles = [f"{' '.join(random.sample(WORDS, 3)).capitalize()} {i}" for i in range(count)]
+        self.create_themes(
+            TeacherTheme(teacher_id_id=teacher.pk, theme=title, theme_description=MARKER) for title in titles
+        )
+        self.analyze()
+        return titles
+
+    def explain_and_time(self, label, make_queryset, titles):
+        self.stdout.write(f"--- {label}")
+        self.stdout.write(make_queryset(titles[0]).order_by().values('teacher_id').explain())
+        timings = []
+        for title in titles:
+            # Сучасна форма запиту: лише teacher_id, без сортування за Meta.ordering
+            qs = make_queryset(title.upper()).order_by().values_list('teacher_id', flat=True)
+            started = time.perf_counter()
+            list(qs)
+            timings.append((time.perf_counter() - started) * 1000)
+        self.report('пошуки', timings)
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.db.models import Q
+
+from apps.catalog.models import TeacherTheme
+from apps.catalog.services import theme_search
+
+from apps.catalog.management.commands._benchmark import MARKER, ThemeBenchmarkCommand
+
+WORDS = [
+    'аналіз', 'моделювання', 'нейронні', 'мережі', 'сенсори', 'напівпровідникові', 'структури',
+    'оптичні', 'системи', 'обробка', 'сигналів', 'мікроконтролери', 'кластеризація', 'графів',
+    'радіочастотні', 'антени', 'квантові', 'обчислення', 'ґрунтові', "об'єкти", 'біомедичні',
+    'прилади', 'розпізнавання', 'образів', 'безпровідні', 'протоколи', 'енергоефективність',
+]
+QUERIES = ['нейр', 'обробка сигналів', 'квант', 'ГРУНТ', 'об’єкти', 'антени радіо', 'мікро', 'петренко']
+
+
+class Command(ThemeBenchmarkCommand):
+    help = (
+        'Наповнює таблицю тем синтетичними даними (за замовчуванням 30 000) і порівнює '
+        'p50/p95 пошуку через icontains та через пошуковий індекс theme_search'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--themes', type=int, default=30_000, help='Кількість тем')
+        parser.add_argument('--teachers', type=int, default=200, help='Кількість викладачів')
+        parser.add_argument('--repeat', type=int, default=20, help='Повторів кожного запиту')
+        parser.add_argument('--target-ms', type=float, default=50.0, help='Цільовий p95, мс')
+
+    def run(self, **options):
+        self.fill(options['teachers'], options['themes'])
+        legacy = self.measure(self.legacy_search, options['repeat'])
+        indexed = self.measure(self.indexed_search, options['repeat'])
+        self.report('icontains', legacy, options['target_ms'])
+        self.report('theme_search', indexed, options['target_ms'])
+
+    def fill(self, teachers, themes):
+        self.stdout.write(f"Створення {teachers} викладачів і {themes} тем...")
+        started = time.perf_counter()
+        # Профіль OnlyTeacher створюється сигналом; пошуковий документ уже містить ПІБ викладача
+        users = self.create_teachers(
+            'theme', teachers, first_name=lambda i: 'Олена',
+            last_name=lambda i: random.choice(['Петренко', 'Коваль', 'Шевчук', 'Бондар']) + str(i),
+        )
+        self.create_themes((
+            TeacherTheme(
+                teacher_id_id=random.choice(users).pk,
+                theme=' '.join(random.sample(WORDS, 4)).capitalize(),
+                theme_description=f"{MARKER} " + ' '.join(random.sample(WORDS, 12)),
+            )
+            for _ in range(themes)
+        ), teachers=users)
+        self.analyze()
+        self.stdout.write(f"  {time.perf_counter() - started:.1f} с")
+
+    def base_queryset(self):
+        return TeacherTheme.objects.select_related('teacher_id__teacher_id').filter(
+            is_active=True, is_deleted=False, is_occupied=False,
+        )
+
+    def legacy_search(self, query):
+        # Попередній варіант ThemesAPIView
+        return self.base_queryset().filter(
+            Q(theme__icontains=query) |
+            Q(theme_description__icontains=query) |
+            Q(teacher_id__teacher_id__first_name__icontains=query) |
+            Q(teacher_id__teacher_id__last_name__icontains=query)
+        ).order_by('theme')[:50]
+
+    def indexed_search(self, query):
+        return theme_search.search(self.base_queryset(), query)[:50]
+
+    def measure(self, search, repeat):
+        timings = []
+        for _ in range(repeat):
+            for query in QUERIES:
+                started = time.perf_counter()
+                list(search(query))
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.models import Slot
+
+
+class Command(BaseCommand):
+    help = 'Звіряє лічильники зайнятих місць у слотах з кількістю активних запитів'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slot',
+            type=int,
+            action='append',
+            dest='slot_ids',
+            help='ID слота для перевірки (можна вказати кілька разів; за замовчуванням — усі слоти)',
+        )
+
+    def handle(self, *args, **options):
+        fixed = Slot.reconcile_occupied(slot_ids=options['slot_ids'])
+        if fixed:
+            self.stdout.write(self.style.WARNING(f'Виправлено слотів: {fixed}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Розбіжностей не знайдено'))
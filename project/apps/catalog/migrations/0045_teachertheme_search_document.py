@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+FULLTEXT_INDEXES = {
+    'theme_search_title_ft': 'search_title',
+    'theme_search_document_ft': 'search_document',
+}
+
+
+def populate_search_documents(apps, schema_editor):
+    from apps.catalog.services.theme_search import build_document
+
+    TeacherTheme = apps.get_model('catalog', 'TeacherTheme')
+    batch = []
+    for theme in TeacherTheme.objects.select_related('teacher_id__teacher_id').iterator(chunk_size=500):
+        user = theme.teacher_id.teacher_id if theme.teacher_id else None
+        names = (user.first_name, user.last_name, user.patronymic) if user else ()
+        theme.search_title, theme.search_document = build_document(theme, names)
+        batch.append(theme)
+        if len(batch) >= 500:
+            TeacherTheme.objects.bulk_update(batch, ['search_title', 'search_document'])
+            batch = []
+    if batch:
+        TeacherTheme.objects.bulk_update(batch, ['search_title', 'search_document'])
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    # FULLTEXT є лише в MySQL; на інших СУБД theme_search шукає через LIKE
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for name, column in FULLTEXT_INDEXES.items():
+        schema_editor.execute(f"CREATE FULLTEXT INDEX {name} ON catalog_teachertheme ({column})")
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for name in FULLTEXT_INDEXES:
+        schema_editor.execute(f"DROP INDEX {name} ON catalog_teachertheme")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0044_populate_short_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teachertheme',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='teachertheme',
+            name='search_title',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+def populate_theme_keys(apps, schema_editor):
+    from apps.catalog.services.theme_search import theme_key
+
+    TeacherTheme = apps.get_model('catalog', 'TeacherTheme')
+    batch = []
+    for theme in TeacherTheme.objects.only('id', 'theme').iterator(chunk_size=1000):
+        theme.theme_key = theme_key(theme.theme)
+        batch.append(theme)
+        if len(batch) >= 1000:
+            TeacherTheme.objects.bulk_update(batch, ['theme_key'])
+            batch = []
+    if batch:
+        TeacherTheme.objects.bulk_update(batch, ['theme_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0045_teachertheme_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teachertheme',
+            name='theme_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(populate_theme_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='teachertheme',
+            index=models.Index(fields=['theme_key'], name='theme_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teachertheme',
+            index=models.Index(fields=['teacher_id', 'theme_key'], name='theme_teacher_key_idx'),
+        ),
+    ]
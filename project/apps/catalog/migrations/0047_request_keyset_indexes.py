@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0046_teachertheme_theme_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['teacher_id', 'request_date'], name='request_teacher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['student_id', 'request_date'], name='request_student_date_idx'),
+        ),
+    ]
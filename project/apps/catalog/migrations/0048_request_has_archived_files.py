@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_has_archived_files(apps, schema_editor):
+    Request = apps.get_model('catalog', 'Request')
+    RequestFile = apps.get_model('catalog', 'RequestFile')
+    archived = RequestFile.objects.filter(request=models.OuterRef('pk'), is_archived=True)
+    Request.objects.filter(models.Exists(archived)).update(has_archived_files=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0047_request_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='has_archived_files',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(populate_has_archived_files, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['teacher_id', 'request_status', 'has_archived_files', 'request_date'], name='request_teacher_archive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['student_id', 'request_status', 'has_archived_files', 'request_date'], name='request_student_archive_idx'),
+        ),
+    ]
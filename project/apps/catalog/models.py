@@ -122,40 +122,72 @@ class Slot(models.Model):
         return f"{self.stream_id.stream_code} ({available} доступно з {self.quota})"
     
     def get_available_slots(self):
-        # Рахуємо тільки активні запити, які займають місця
-        occupied_requests_count = Request.objects.filter(
-            slot=self,
-            request_status='Активний'
-        ).count()
-        
-        self.occupied = occupied_requests_count
-        self.save()
         return self.quota - self.occupied
     
     @classmethod
     def filter_by_available_slots(cls):
-        slots = cls.objects.all()
-        for slot in slots:
-            slot.get_available_slots()  
         return cls.objects.filter(occupied__lt=F('quota'))
-    
-    def update_occupied_slots(self, increment):
+
+    def reserve(self):
         """
-        Increment or decrement occupied slots but ensure it never exceeds quota.
+        Атомарно займає одне місце умовним UPDATE (occupied < quota).
+        Повертає True, якщо місце вдалося зайняти.
         """
-        logger.info(f"Before update: occupied = {self.occupied}, increment = {increment}")
-
-        if increment > 0 and self.occupied + increment > self.quota:
-            raise ValidationError("The number of occupied slots cannot exceed the quota.")
+        updated = Slot.objects.filter(pk=self.pk, occupied__lt=F('quota')).update(
+            occupied=F('occupied') + 1
+        )
+        if updated:
+            self.occupied += 1
+            self._invalidate_catalog()
+        return bool(updated)
+
+    def release(self):
+        """Атомарно звільняє одне місце. Повертає True, якщо лічильник зменшився."""
+        updated = Slot.objects.filter(pk=self.pk, occupied__gt=0).update(
+            occupied=F('occupied') - 1
+        )
+        if updated:
+            self.occupied = max(self.occupied - 1, 0)
+            self._invalidate_catalog()
+        return bool(updated)
 
-        self.occupied = Request.objects.filter(
-            slot=self,
-            request_status='Активний'
-        ).count()
-        
-        self.save()
+    def _invalidate_catalog(self):
+        # UPDATE через queryset не надсилає post_save, тому скидаємо знімок каталогу вручну
+        from apps.catalog.services import catalog_snapshot
+        stream_id = self.stream_id_id
+        transaction.on_commit(lambda: catalog_snapshot.invalidate_streams([stream_id]))
 
-        logger.info(f"After update: occupied = {self.occupied}")
+    @classmethod
+    def reconcile_occupied(cls, slot_ids=None):
+        """
+        Виправляє розбіжність лічильників occupied з фактичною кількістю активних запитів.
+        Рахує всі слоти одним GROUP BY; повертає кількість виправлених слотів.
+        """
+        with transaction.atomic():
+            slots = cls.objects.select_for_update().only('pk', 'occupied', 'stream_id')
+            active = Request.objects.filter(request_status='Активний', slot__isnull=False)
+            if slot_ids is not None:
+                slots = slots.filter(pk__in=slot_ids)
+                active = active.filter(slot_id__in=slot_ids)
+            slots = list(slots)
+
+            actual = dict(
+                active.order_by().values('slot').annotate(count=models.Count('pk')).values_list('slot', 'count')
+            )
+            drifted = []
+            for slot in slots:
+                expected = actual.get(slot.pk, 0)
+                if slot.occupied != expected:
+                    logger.info(f"Slot {slot.pk}: occupied {slot.occupied} -> {expected}")
+                    slot.occupied = expected
+                    drifted.append(slot)
+
+            if drifted:
+                cls.objects.bulk_update(drifted, ['occupied'], batch_size=500)
+                from apps.catalog.services import catalog_snapshot
+                stream_ids = {slot.stream_id_id for slot in drifted}
+                transaction.on_commit(lambda: catalog_snapshot.invalidate_streams(stream_ids))
+        return len(drifted)
 
     def clean(self):
         """
@@ -207,6 +239,11 @@ class Request(models.Model):
         ('Відхилено', 'Відхилено'),
         ('Завершено', 'Завершено'),
     ]
+    # Статуси, у яких тема викладача повертається в пул вільних
+    THEME_RELEASING_STATUSES = ('Відхилено', 'Завершено', 'Відхилено студентом', 'Скасовано')
+    # Поля, початкові значення яких запам'ятовуються при завантаженні (див. get_changed_fields)
+    TRACKED_FIELDS = ('request_status', 'grade', 'topic_name', 'is_topic_locked', 'teacher_theme_id')
+
     student_id = models.ForeignKey('users.CustomUser', 
                                    on_delete=models.SET_NULL, 
                                    null=True,
@@ -225,6 +262,8 @@ class Request(models.Model):
     grade = models.IntegerField(null=True, blank=True)
     rejected_reason = models.TextField(blank=True, null=True)
     completion_date = models.DateTimeField(null=True, blank=True)
+    # Чи є в запиту архівні файли (RequestFile.is_archived); підтримується sync_archived_files()
+    has_archived_files = models.BooleanField(default=False, editable=False)
     academic_year = models.CharField(max_length=7, blank=True)  # Format: "2024/25"
     comment = models.TextField(blank=True, null=True, max_length=1000)
     send_contacts = models.BooleanField(default=False)
@@ -237,6 +276,20 @@ class Request(models.Model):
     class Meta:
         verbose_name = "Запит"
         verbose_name_plural = "Запити"
+        indexes = [
+            # Keyset-пагінація вкладок профілю (profile_tabs): запити користувача за датою
+            models.Index(fields=['teacher_id', 'request_date'], name='request_teacher_date_idx'),
+            models.Index(fields=['student_id', 'request_date'], name='request_student_date_idx'),
+            # Архів викладача/студента: статус 'Завершено' з архівними файлами, новіші спочатку
+            models.Index(
+                fields=['teacher_id', 'request_status', 'has_archived_files', 'request_date'],
+                name='request_teacher_archive_idx',
+            ),
+            models.Index(
+                fields=['student_id', 'request_status', 'has_archived_files', 'request_date'],
+                name='request_student_archive_idx',
+            ),
+        ]
 
     @property
     def is_active(self):
@@ -275,54 +328,116 @@ class Request(models.Model):
             return f"{match.group(1)}-{match.group(2)}"
         
         return None
+    @classmethod
+    def sync_archived_files(cls, request_ids):
+        """
+        Перераховує has_archived_files за файлами запитів одним UPDATE
+        (після масових змін RequestFile.is_archived чи видалення файлів).
+        """
+        request_ids = {pk for pk in request_ids if pk}
+        if not request_ids:
+            return 0
+        archived = RequestFile.objects.filter(request=models.OuterRef('pk'), is_archived=True)
+        return cls.objects.filter(pk__in=request_ids).update(has_archived_files=models.Exists(archived))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_original_state()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_original_state(fields)
+
+    def _snapshot_original_state(self, fields=None):
+        """Запам'ятовує значення відстежуваних полів у тому вигляді, в якому вони є в БД."""
+        deferred = self.get_deferred_fields()
+        state = getattr(self, '_original_state', None) or {}
+        for field in self.TRACKED_FIELDS:
+            if field in deferred:
+                continue
+            if fields is None or field in fields or field.removesuffix('_id') in fields:
+                state[field] = getattr(self, field)
+        self._original_state = state
+
+    def get_original_state(self):
+        """
+        Значення відстежуваних полів на момент завантаження з БД.
+        Для нового запиту повертає порожній dict; поля, яких немає у знімку
+        (відкладені або об'єкт створено вручну з pk), дочитуються одним запитом.
+        """
+        if not self.pk:
+            return {}
+        original = getattr(self, '_original_state', None) or {}
+        missing = [field for field in self.TRACKED_FIELDS if field not in original]
+        if missing:
+            row = Request.objects.filter(pk=self.pk).values(*missing).first()
+            if row is None:
+                return {}
+            original.update(row)
+            self._original_state = original
+        return dict(original)
+
+    def get_changed_fields(self):
+        """Відстежувані поля, що змінились від завантаження: {поле: (старе, нове)}."""
+        original = self.get_original_state()
+        return {
+            field: (old, getattr(self, field))
+            for field, old in original.items()
+            if old != getattr(self, field)
+        }
+
+    def has_changed(self, field):
+        return field in self.get_changed_fields()
+
     def clean(self):
         super().clean()
         
         # --- Блок перевірки дедлайнів семестру ---
+        # Якщо налаштувань немає, перевірки дат не застосовуються
+        from apps.catalog.services import semestr_policy
         semestr_settings = None
-        if self.teacher_id and self.teacher_id.department and self.academic_year:
-            current_month = timezone.now().month
-            current_semester_num = 1 if 9 <= current_month <= 12 or 1 <= current_month <= 2 else 2
-            try:
-                semestr_settings = Semestr.objects.get(
-                    department=self.teacher_id.department,
-                    academic_year=self.academic_year,
-                    semestr=current_semester_num
-                )
-            except Semestr.DoesNotExist:
-                pass # Якщо налаштувань немає, перевірки дат не застосовуються
+        if self.teacher_id:
+            semestr_settings = semestr_policy.get_policy(self.teacher_id.department_id, self.academic_year)
 
-        original = None
-        if self.pk:
-            try:
-                original = Request.objects.get(pk=self.pk)
-            except Request.DoesNotExist:
-                pass
+        original = self.get_original_state()
+        original_status = original.get('request_status')
+        topic_changed = bool(original) and original['topic_name'] != self.topic_name
 
         if semestr_settings:
             # 1. Перевірка при створенні нового запиту
-            if not self.pk and not semestr_settings.can_student_create_request():
+            if not self.pk and not semestr_settings.can_student_create_request:
                 raise ValidationError("Дедлайн подачі нових запитів минув. Створення неможливе.")
 
             if original:
                 # 2. Перевірка при спробі скасувати активний запит
-                if original.request_status == 'Активний' and self.request_status == 'Відхилено':
-                    if semestr_settings.should_lock_cancellations():
+                if original_status == 'Активний' and self.request_status == 'Відхилено':
+                    if semestr_settings.should_lock_cancellations:
                         raise ValidationError("Дедлайн для скасування активних робіт минув.")
 
                 # 3. Перевірка при спробі завершити роботу
-                if self.request_status == 'Завершено' and original.request_status != 'Завершено':
-                    if not semestr_settings.can_complete_requests():
+                if self.request_status == 'Завершено' and original_status != 'Завершено':
+                    if not semestr_settings.can_complete_requests:
                         raise ValidationError("Завершення робіт наразі не дозволено.")
                 
                 # 4. Перевірка зміни теми після блокування
-                if original.topic_name != self.topic_name and semestr_settings.should_lock_teacher_editing_themes():
+                if topic_changed and semestr_settings.should_lock_teacher_editing_themes:
                     raise ValidationError("Дедлайн для редагування тем минув.")
 
         # Захист від зміни заблокованої теми
-        if original and original.is_topic_locked and original.topic_name != self.topic_name:
+        if topic_changed and original['is_topic_locked']:
             raise ValidationError("Неможливо змінити затверджену тему, оскільки вона заблокована.")
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_status = getattr(self, '_expected_status', None)
+        if expected_status is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        base_qs = base_qs.filter(request_status=expected_status)
+        if not super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update):
+            raise ValidationError("Статус запиту вже змінено. Оновіть сторінку.")
+        return True
+
     def save(self, *args, **kwargs):
         # Встановлення навчального року (має бути до clean, бо clean його використовує)
         if not self.academic_year:
@@ -364,33 +479,35 @@ class Request(models.Model):
             except Stream.DoesNotExist:
                 raise ValidationError(f"Не знайдено потік з кодом: {student_stream_code}")
 
-        # Обробка зміни статусу для слотів
-        status_changed = False
-        old_status = None
-        if self.pk:
+        # Старий статус беремо зі знімка, зробленого при завантаженні (без повторного SELECT)
+        original = self.get_original_state()
+        old_status = original.get('request_status')
+        status_changed = not original or old_status != self.request_status
+
+        # 3. Зберігаємо об'єкт і займаємо/звільняємо місце в одній транзакції
+        with transaction.atomic():
+            # Перехід фіксується тим самим UPDATE, що зберігає запит, з умовою на старий
+            # статус (_do_update): з двох одночасних переходів того самого запиту
+            # (завершення/скасування) проходить лише один, і місце в слоті не звільняється двічі
+            self._expected_status = old_status if status_changed and original else None
             try:
-                old_request = Request.objects.get(pk=self.pk)
-                if old_request.request_status != self.request_status:
-                    status_changed = True
-                    old_status = old_request.request_status
-            except Request.DoesNotExist:
-                pass
-        else: # Якщо це новий запит
-            status_changed = True
-
-        # 3. Зберігаємо об'єкт
-        super().save(*args, **kwargs)
-        
-        # 4. Побічні ефекти, які виконуються після збереження
-        if status_changed:
-            if self.request_status == 'Активний':
-                self.slot.update_occupied_slots(+1)
-            elif old_status == 'Активний' and self.request_status != 'Активний':
-                self.slot.update_occupied_slots(-1)
-                
-            if self.request_status in ['Завершено', 'Відхилено'] and self.teacher_theme:
-                self.teacher_theme.is_occupied = False
-                self.teacher_theme.save()
+                super().save(*args, **kwargs)
+            finally:
+                self._expected_status = None
+            if status_changed:
+                if self.request_status == 'Активний':
+                    if not self.slot.reserve():
+                        raise ValidationError(
+                            f"Немає вільних місць у викладача {self.teacher_id} для потоку {self.slot.stream_id.stream_code}"
+                        )
+                elif old_status == 'Активний':
+                    self.slot.release()
+            self._snapshot_original_state(kwargs.get('update_fields'))
+
+            # 4. Звільняємо тему, якщо запит більше її не утримує
+            if status_changed and self.request_status in self.THEME_RELEASING_STATUSES:
+                if self.teacher_theme_id:
+                    self.teacher_theme.release()
                 
     def get_themes_display(self):
         """
@@ -432,16 +549,72 @@ class TeacherTheme(models.Model):
     is_active = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False, help_text='Позначає, чи тема була видалена (неактивна)')
     streams = models.ManyToManyField(Stream, blank=True, related_name='teacher_themes')
+    # Денормалізований пошуковий документ (див. services.theme_search)
+    search_title = models.CharField(max_length=200, blank=True, default='', editable=False)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Хеш нормалізованої назви для пошуку однакових тем (див. theme_search.theme_key)
+    theme_key = models.CharField(max_length=40, blank=True, default='', editable=False)
     
     class Meta:
         verbose_name = "Тема викладача"
         verbose_name_plural = "Теми викладачів"
         ordering = ['teacher_id__teacher_id__last_name', 'theme']
+        indexes = [
+            models.Index(fields=['theme_key'], name='theme_key_idx'),
+            models.Index(fields=['teacher_id', 'theme_key'], name='theme_teacher_key_idx'),
+        ]
 
     def __str__(self):
         status = "🟢" if self.is_active else "🔴"
         return f"{status} {self.theme}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'theme', 'theme_description', 'teacher_id'} & set(update_fields):
+            from .services import theme_search
+            self.search_title, self.search_document = theme_search.build_document(self)
+            self.theme_key = theme_search.theme_key(self.theme)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_title', 'search_document', 'theme_key'}
+        super().save(*args, **kwargs)
     
+    def claim(self):
+        """
+        Атомарно займає тему одним умовним UPDATE.
+        Повертає True, якщо саме цей виклик зайняв тему.
+        """
+        claimed = TeacherTheme.objects.filter(
+            pk=self.pk, is_occupied=False, is_deleted=False
+        ).update(is_occupied=True)
+        if claimed:
+            self.is_occupied = True
+        return bool(claimed)
+
+    def release(self):
+        """Звільняє тему без перезапису всього рядка."""
+        TeacherTheme.release_many([self.pk])
+        self.is_occupied = False
+
+    @classmethod
+    def release_many(cls, theme_ids):
+        """Звільняє кілька тем одним UPDATE. Повертає кількість звільнених тем."""
+        theme_ids = {pk for pk in theme_ids if pk}
+        if not theme_ids:
+            return 0
+        return cls.objects.filter(pk__in=theme_ids, is_occupied=True).update(is_occupied=False)
+
+    @classmethod
+    def find_by_title(cls, teacher, title):
+        """
+        Тема викладача з такою ж нормалізованою назвою або None.
+        theme_key не унікальний, тож серед дублікатів береться невидалена,
+        а далі найстаріша тема (як в імпорті з Excel).
+        """
+        from .services import theme_search
+        return cls.objects.filter(
+            teacher_id=teacher, theme_key=theme_search.theme_key(title)
+        ).order_by('is_deleted', 'pk').first()
+
     def can_be_deleted(self):
         """Перевіряє чи можна фізично видалити тему"""
         # Перевіряємо чи тема використовується тільки в завершених запитах
@@ -1,6 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from apps.catalog.models import Semestr, Request
+from apps.catalog.models import Request
+from apps.catalog.services import semestr_policy
 
 def _resolve_academic_year(academic_year: str | None):
     if academic_year:
@@ -10,46 +11,42 @@ def _resolve_academic_year(academic_year: str | None):
     return f"{y}/{str(y + 1)[-2:]}" if now.month >= 9 else f"{y - 1}/{str(y)[-2:]}"
 
 def _current_semestr_num() -> int:
-    m = timezone.now().month
-    return 1 if m in (9, 10, 11, 12, 1, 2) else 2
+    return semestr_policy.current_semestr_num()
 
-def _get_semestr(department, academic_year: str):
-    return Semestr.objects.filter(
-        department=department,
-        academic_year=academic_year,
-        semestr=_current_semestr_num(),
-    ).first()
+def _get_semestr(department_id, academic_year: str):
+    # Повертає кешовану SemestrPolicy (а не рядок Semestr) — без запиту до БД при повторних викликах
+    return semestr_policy.get_policy(department_id, academic_year, _current_semestr_num())
 
 def assert_can_create_request(teacher, academic_year: str | None = None):
-    if not getattr(teacher, "department", None):
+    if not getattr(teacher, "department_id", None):
         raise ValidationError("У викладача не вказана кафедра.")
     ay = _resolve_academic_year(academic_year)
-    sem = _get_semestr(teacher.department, ay)
+    sem = _get_semestr(teacher.department_id, ay)
     if not sem:
         raise ValidationError("Семестр не створений.")
-    if not sem.can_student_create_request():
+    if not sem.can_student_create_request:
         raise ValidationError("Створення нових запитів заблоковано (дедлайн минув).")
     return sem
 
 def assert_can_cancel_request(req: Request):
-    sem = _get_semestr(req.teacher_id.department, req.academic_year)
-    if sem and sem.should_lock_cancellations():
+    sem = _get_semestr(req.teacher_id.department_id, req.academic_year)
+    if sem and sem.should_lock_cancellations:
         raise ValidationError("Можливість скасування робіт заблоковано.")
 
 def assert_can_complete_request(req: Request):
-    sem = _get_semestr(req.teacher_id.department, req.academic_year)
+    sem = _get_semestr(req.teacher_id.department_id, req.academic_year)
     # Якщо семестр відсутній — забороняємо завершення
     if not sem:
         raise ValidationError("Семестр не створений.")
-    if not sem.can_complete_requests():
+    if not sem.can_complete_requests:
         raise ValidationError("Ще не дозволено завершувати роботи.")
 
 def assert_can_teacher_edit_themes(teacher, academic_year: str | None = None):
     ay = _resolve_academic_year(academic_year)
-    sem = _get_semestr(teacher.department, ay)
+    sem = _get_semestr(teacher.department_id, ay)
     if not sem:
         raise ValidationError("Семестр не створений.")
-    if sem.should_lock_teacher_editing_themes():
+    if sem.should_lock_teacher_editing_themes:
         raise ValidationError("Редагування тем викладачем заблоковано.")
     return sem
 
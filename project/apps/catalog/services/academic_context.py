@@ -0,0 +1,160 @@
+"""
+Академічний контекст користувача: курс, магістратура, код і pk потоку,
+кафедра та факультет.
+
+Раніше кожен view розбирав academic_group власною копією регулярних виразів,
+а CustomUser.get_department()/get_faculty() щоразу звертались до профілю,
+активного запиту та Group. Тепер контекст обчислюється один раз і кешується
+за користувачем разом із кодом групи, з якого його обчислено: якщо
+academic_group змінився, контекст перераховується. Ключ скидається
+сигналами при збереженні користувача, профілю чи запиту студента; зміна довідників (Group, Stream, Department, Faculty,
+Specialty) збільшує загальну версію, з якої формуються всі ключі.
+
+Протягом одного HTTP-запиту контекст також запам'ятовується на об'єкті
+користувача, тож повторні виклики не звертаються навіть до кешу.
+"""
+import re
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from . import cache_versions
+
+CACHE_TIMEOUT = 60 * 60
+VERSION_KEY = "academic:version"
+CONTEXT_KEY = "academic:ctx:{}:{}"
+# Атрибут об'єкта користувача, де контекст живе до кінця HTTP-запиту
+INSTANCE_ATTR = "_academic_context"
+
+STREAM_RE = re.compile(r"([А-ЯІЇЄҐ]+)-(\d+)(ВПК)?")
+COURSE_RE = re.compile(r"^ФЕ[СМЛПІ]-(\d+)(ВПК)?")
+
+
+@dataclass(frozen=True)
+class AcademicContext:
+    academic_group: str = ""
+    course: int = None
+    is_master: bool = False
+    stream_code: str = None
+    stream_id: int = None
+    department: object = None
+    faculty: object = None
+
+    @property
+    def department_id(self):
+        return self.department.pk if self.department else None
+
+    @property
+    def is_matched(self):
+        """Чи вдалося визначити потік студента з academic_group."""
+        return self.stream_code is not None
+
+    @property
+    def filters_by_department(self):
+        """3+ курс і магістри бачать лише викладачів своєї кафедри."""
+        return bool(self.department and ((self.course and self.course >= 3) or self.is_master))
+
+
+def parse_academic_group(academic_group):
+    """
+    Розбирає код групи без звернень до БД. Повертає (course, is_master, stream_code).
+    Для курсу й коду потоку береться лише перша цифра номера групи:
+    'ФЕС-33' -> (3, False, 'ФЕС-3'), 'ФЕП-24ВПК' -> (2, False, 'ФЕП-2ВПК'),
+    'ФЕІ-11м' -> (1, True, 'ФЕІ-1м').
+    """
+    academic_group = academic_group or ""
+    is_master = "М" in academic_group.upper()
+
+    course = None
+    match = COURSE_RE.match(academic_group)
+    if match:
+        course = int(match.group(1)[0])
+
+    stream_code = None
+    match = STREAM_RE.match(academic_group)
+    if match:
+        faculty, number, vpk = match.group(1), match.group(2), match.group(3) or ""
+        stream_code = f"{faculty}-{number[0]}{vpk}" + ("м" if is_master else "")
+    return course, is_master, stream_code
+
+
+def get_version():
+    return cache_versions.get(VERSION_KEY)
+
+
+def _key(user_id):
+    return CONTEXT_KEY.format(get_version(), user_id)
+
+
+def _build(user):
+    from apps.catalog.models import Group, Stream
+
+    course, is_master, stream_code = parse_academic_group(user.academic_group)
+    stream_id = None
+    if stream_code:
+        stream_id = (
+            Stream.objects.filter(stream_code__iexact=stream_code)
+            .values_list("pk", flat=True)
+            .first()
+        )
+    faculty = None
+    if user.academic_group:
+        group = (
+            Group.objects.select_related("stream__specialty__faculty")
+            .filter(group_code=user.academic_group)
+            .first()
+        )
+        if group and group.stream.specialty:
+            faculty = group.stream.specialty.faculty
+    return AcademicContext(
+        academic_group=user.academic_group or "",
+        course=course,
+        is_master=is_master,
+        stream_code=stream_code,
+        stream_id=stream_id,
+        department=user.resolve_department(),
+        faculty=faculty,
+    )
+
+
+def get_academic_context(user):
+    """Академічний контекст користувача (з об'єкта, з кешу або обчислений)."""
+    academic_group = user.academic_group or ""
+    context = getattr(user, INSTANCE_ATTR, None)
+    if context is not None and context.academic_group == academic_group:
+        return context
+    if user.pk is None:
+        return _build(user)
+
+    key = _key(user.pk)
+    context = cache.get(key)
+    if context is None or context.academic_group != academic_group:
+        context = _build(user)
+        cache.set(key, context, CACHE_TIMEOUT)
+    setattr(user, INSTANCE_ATTR, context)
+    return context
+
+
+def forget(user):
+    """Скидає контекст, запам'ятований на об'єкті користувача."""
+    if user is not None:
+        user.__dict__.pop(INSTANCE_ATTR, None)
+
+
+def invalidate(user_id):
+    """Скидає закешований контекст користувача."""
+    if user_id is not None:
+        cache.delete(_key(user_id))
+
+
+def invalidate_many(user_ids):
+    """Скидає контексти кількох користувачів (масові UPDATE запитів без сигналів)."""
+    version = get_version()
+    keys = [CONTEXT_KEY.format(version, user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_all():
+    """Скидає контексти всіх користувачів (зміна груп, потоків, кафедр чи факультетів)."""
+    cache_versions.bump(VERSION_KEY)
@@ -0,0 +1,285 @@
+"""
+Префіксний індекс автокомпліту в пам'яті процесу.
+
+Індекс тримає відсортовані масиви слів (ПІБ викладачів і назви активних
+тем після theme_search.fold()) з посиланнями на готові рядки відповіді, тож
+AutocompleteView відповідає без жодного запиту до БД: діапазон слів з
+потрібним префіксом знаходиться бінарним пошуком.
+
+Індекс версіонований. Сигнали після коміту викликають mark_changed(): це
+збільшує версію в спільному кеші (settings.CACHES — Redis, один на всі
+процеси) й записує під нею, що саме змінилося. Перед відповіддю процес
+порівнює свою версію зі спільною і довантажує з БД лише змінені записи (до
+MAX_REPLAY змін); якщо журнал змін неповний — будує індекс заново.
+warm_in_background() будує індекс під час старту процесу.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .theme_search import fold
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "autocomplete:version"
+CHANGE_KEY = "autocomplete:change:{}"
+CHANGE_TIMEOUT = 60 * 60
+# Скільки змін довантажувати поштучно, перш ніж перебудувати індекс повністю
+MAX_REPLAY = 200
+MIN_QUERY_LENGTH = 2
+
+TEACHER = "teacher"
+THEME = "theme"
+ALL = "all"
+
+
+class PrefixIndex:
+    """
+    Індекс записів одного типу. Відсортований масив різних слів дає діапазон
+    слів з префіксом; для кожного слова зберігається список записів,
+    упорядкований за підписом, тож перші limit результатів беруться злиттям
+    цих списків без перегляду всіх збігів.
+    """
+
+    def __init__(self):
+        self._words = []
+        self._postings = {}
+        self._entries = {}
+        self._tokens = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _order(pk, entry):
+        return (entry["label"], pk)
+
+    def load(self, items):
+        """Початкове заповнення: [(pk, tokens, entry)] з одним сортуванням замість вставок."""
+        for pk, tokens, entry in items:
+            tokens = frozenset(tokens)
+            self._entries[pk] = entry
+            self._tokens[pk] = tokens
+            for token in tokens:
+                self._postings.setdefault(token, []).append(self._order(pk, entry))
+        for posting in self._postings.values():
+            posting.sort()
+        self._words = sorted(self._postings)
+
+    def add(self, pk, tokens, entry):
+        self.remove(pk)
+        tokens = frozenset(tokens)
+        self._entries[pk] = entry
+        self._tokens[pk] = tokens
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = []
+                insort(self._words, token)
+            insort(posting, self._order(pk, entry))
+
+    def remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        order = self._order(pk, entry)
+        for token in self._tokens.pop(pk):
+            posting = self._postings[token]
+            position = bisect_left(posting, order)
+            if position < len(posting) and posting[position] == order:
+                del posting[position]
+            if not posting:
+                del self._postings[token]
+                del self._words[bisect_left(self._words, token)]
+
+    def _matching_words(self, prefix):
+        start = bisect_left(self._words, prefix)
+        end = bisect_left(self._words, prefix + "\U0010ffff", start)
+        return self._words[start:end]
+
+    def search(self, tokens, limit):
+        """Записи, у яких кожне слово запиту є префіксом якогось слова запису, за підписом."""
+        if not tokens:
+            return []
+        # Найдовший префікс зазвичай дає найменше слів
+        first, *rest = sorted(tokens, key=len, reverse=True)
+        postings = [self._postings[word] for word in self._matching_words(first)]
+        results = []
+        seen = set()
+        for _, pk in heapq.merge(*postings):
+            if pk in seen:
+                continue
+            seen.add(pk)
+            if all(any(word.startswith(token) for word in self._tokens[pk]) for token in rest):
+                results.append(self._entries[pk])
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_index = None
+_index_version = None
+_lock = threading.RLock()
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def mark_changed(kind, pk=None):
+    """
+    Повідомляє всі процеси про зміну: викладача (kind=TEACHER, разом з
+    описами його тем), теми (THEME) чи довідників (ALL — повна перебудова).
+    Викликати після коміту.
+    """
+    while True:
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            # Версії ще немає — індекси всіх процесів перебудуються
+            get_version()
+            return
+        # incr атомарний не в кожному backend кешу, тож два процеси можуть
+        # отримати ту саму версію; add() записує лише відсутній ключ, і
+        # процес, що не зайняв версію, бере наступну
+        if cache.add(CHANGE_KEY.format(version), (kind, pk), CHANGE_TIMEOUT):
+            return
+
+
+def _teacher_entry(teacher):
+    user = teacher.teacher_id
+    department = teacher.department
+    entry = {
+        "type": TEACHER,
+        "id": teacher.pk,
+        "label": f"👨‍🏫 {user.first_name} {user.last_name}",
+        "description": f"{teacher.academic_level} • {department.department_name if department else None}",
+        "url": "#",  # Не потрібен URL, фільтрування буде на тій же сторінці
+    }
+    tokens = fold(f"{user.first_name} {user.last_name} {user.patronymic or ''}").split()
+    return tokens, entry
+
+
+def _theme_entry(theme):
+    user = theme.teacher_id.teacher_id
+    entry = {
+        "type": THEME,
+        "id": theme.pk,
+        "label": f"📚 {theme.theme}",
+        "description": f"Викладач: {user.first_name} {user.last_name}",
+        "url": "#",
+    }
+    return theme.search_title.split(), entry
+
+
+def _teachers():
+    from apps.catalog.models import OnlyTeacher
+
+    return OnlyTeacher.objects.select_related("teacher_id", "department")
+
+
+def _themes():
+    from apps.catalog.models import TeacherTheme
+
+    return TeacherTheme.objects.select_related("teacher_id__teacher_id").filter(
+        is_active=True, is_deleted=False, teacher_id__isnull=False,
+    ).order_by()
+
+
+def build():
+    """Будує індекс з БД двома запитами."""
+    index = {TEACHER: PrefixIndex(), THEME: PrefixIndex()}
+    index[TEACHER].load([(teacher.pk, *_teacher_entry(teacher)) for teacher in _teachers()])
+    index[THEME].load([(theme.pk, *_theme_entry(theme)) for theme in _themes()])
+    return index
+
+
+def _apply_changes(index, changes):
+    """
+    Довантажує змінені записи. Повертає False, якщо зміну не можна
+    застосувати поштучно і індекс треба перебудувати.
+    """
+    if any(kind == ALL for kind, _ in changes):
+        return False
+    teacher_ids = {pk for kind, pk in changes if kind == TEACHER}
+    theme_ids = {pk for kind, pk in changes if kind == THEME}
+
+    if teacher_ids:
+        teachers = list(_teachers().filter(pk__in=teacher_ids))
+        if len(teachers) != len(teacher_ids):
+            # Видалений викладач: його теми втратили посилання без сигналу збереження
+            return False
+        for teacher in teachers:
+            index[TEACHER].add(teacher.pk, *_teacher_entry(teacher))
+    if theme_ids or teacher_ids:
+        # Опис теми містить ім'я викладача, тож теми змінених викладачів теж оновлюються
+        found = set()
+        for theme in _themes().filter(Q(pk__in=theme_ids) | Q(teacher_id__in=teacher_ids)):
+            index[THEME].add(theme.pk, *_theme_entry(theme))
+            found.add(theme.pk)
+        for pk in theme_ids - found:
+            index[THEME].remove(pk)
+    return True
+
+
+def get_index():
+    """Індекс процесу, синхронізований зі спільною версією."""
+    global _index, _index_version
+    version = get_version()
+    with _lock:
+        if _index is not None and _index_version == version:
+            return _index
+        changes = None
+        if _index is not None and 0 < version - _index_version <= MAX_REPLAY:
+            keys = [CHANGE_KEY.format(v) for v in range(_index_version + 1, version + 1)]
+            found = cache.get_many(keys)
+            if len(found) == len(keys):
+                changes = list(found.values())
+        if changes is None or not _apply_changes(_index, changes):
+            started = time.perf_counter()
+            _index = build()
+            logger.info(f"Autocomplete index built: {sum(map(len, _index.values()))} entries in "
+                        f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        _index_version = version
+        return _index
+
+
+def search(query, limit=5):
+    """Відповідь автокомпліту: до limit викладачів, потім до limit тем."""
+    tokens = fold(query).split()
+    if len(query.strip()) < MIN_QUERY_LENGTH or not tokens:
+        return []
+    index = get_index()
+    with _lock:
+        return index[TEACHER].search(tokens, limit) + index[THEME].search(tokens, limit)
+
+
+def reset():
+    """Скидає індекс процесу (наступний запит побудує його заново)."""
+    global _index, _index_version
+    with _lock:
+        _index = None
+        _index_version = None
+
+
+def warm_in_background():
+    """Будує індекс у фоновому потоці під час старту процесу."""
+    def warm():
+        try:
+            get_index()
+        except Exception as e:
+            logger.warning(f"Could not warm autocomplete index: {e}")
+        finally:
+            from django.db import connection
+            connection.close()
+
+    threading.Thread(target=warm, name="autocomplete-index-warmup", daemon=True).start()
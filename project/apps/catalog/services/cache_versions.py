@@ -0,0 +1,37 @@
+"""
+Версії кешованих даних у спільному кеші (settings.CACHES).
+
+Записи кешу позначаються версією (у ключі чи ETag), а інвалідація записує
+нову версію. Нова версія — унікальне значення з часу в наносекундах, а не
+incr: запис не залежить від поточного значення, тож дві одночасні
+інвалідації з різних процесів не отримають однакову версію за будь-якого
+backend кешу, і дані, закешовані між ними, не залишаться чинними.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def new_version():
+    return time.time_ns()
+
+
+def get(key):
+    """Поточна версія (створюється, якщо її ще немає або кеш очищено)."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump(key):
+    """Записує нову версію."""
+    cache.set(key, new_version(), None)
+
+
+def bump_existing(keys):
+    """Нові версії для вже створених ключів (без версії немає й даних під нею)."""
+    found = cache.get_many(list(keys))
+    if found:
+        cache.set_many({key: new_version() for key in found}, None)
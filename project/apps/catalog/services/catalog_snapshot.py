@@ -0,0 +1,200 @@
+"""
+Знімок каталогу викладачів для TeachersListView.
+
+Картки викладачів і вільні місця по потоках зберігаються в кеші окремо:
+картка перебудовується лише для викладача, що змінився, а список вільних
+місць — лише для потоку, чиї слоти змінились. Кожна інвалідація збільшує
+версію каталогу, з якої формується ETag відповіді.
+"""
+import hashlib
+import logging
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db.models import F
+from django.templatetags.static import static
+
+from apps.catalog.models import OnlyTeacher, Slot, Stream
+from apps.catalog.templatetags.catalog_extras import get_profile_picture_url
+
+from . import cache_versions
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 60 * 60
+VERSION_KEY = "catalog:version"
+TEACHER_IDS_KEY = "catalog:teacher_ids"
+TEACHER_CARD_KEY = "catalog:teacher:{}"
+STREAM_SLOTS_KEY = "catalog:slots:{}"
+STREAM_CODE_KEY = "catalog:stream_code:{}"
+ALL_STREAMS = "all"
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    cards: list
+    free_slots: dict
+
+
+def get_version():
+    """Поточна версія каталогу (ініціалізується часом, щоб не повторюватись після очищення кешу)."""
+    return cache_versions.get(VERSION_KEY)
+
+
+def _bump_version():
+    cache_versions.bump(VERSION_KEY)
+
+
+def _stream_code_key(stream_code):
+    digest = hashlib.md5(stream_code.lower().encode("utf-8")).hexdigest()
+    return STREAM_CODE_KEY.format(digest)
+
+
+def resolve_stream_id(stream_code):
+    """Повертає pk потоку за кодом (без урахування регістру) або None."""
+    key = _stream_code_key(stream_code)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+    stream_id = (
+        Stream.objects.filter(stream_code__iexact=stream_code)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    cache.set(key, stream_id or 0, CACHE_TIMEOUT)
+    return stream_id
+
+
+def _build_card(teacher):
+    user = teacher.teacher_id
+    if user.patronymic:
+        full_name = f"{user.last_name} {user.first_name} {user.patronymic}"
+    else:
+        full_name = f"{user.last_name} {user.first_name}"
+
+    try:
+        photo_url = get_profile_picture_url(user)
+    except Exception as e:
+        logger.warning(f"Error getting profile picture URL for teacher {teacher.pk}: {e}")
+        photo_url = static("images/default-avatar.jpg")
+
+    department = teacher.department
+    return {
+        "id": teacher.pk,
+        "department_id": department.pk if department else None,
+        "academic_level": teacher.academic_level,
+        "photo": photo_url,
+        "url": teacher.get_absolute_url(),
+        "teacher_id": {
+            "id": user.id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "department": department.department_name if department else None,
+            "department_short_name": department.short_name if department else None,
+            "full_name": full_name,
+        },
+    }
+
+
+def _get_teacher_ids():
+    teacher_ids = cache.get(TEACHER_IDS_KEY)
+    if teacher_ids is None:
+        teacher_ids = list(OnlyTeacher.objects.order_by("pk").values_list("pk", flat=True))
+        cache.set(TEACHER_IDS_KEY, teacher_ids, CACHE_TIMEOUT)
+    return teacher_ids
+
+
+def get_teacher_cards():
+    """Картки всіх викладачів; відсутні в кеші будуються одним запитом."""
+    teacher_ids = _get_teacher_ids()
+    keys = {TEACHER_CARD_KEY.format(pk): pk for pk in teacher_ids}
+    cached = cache.get_many(list(keys))
+    cards = {keys[key]: card for key, card in cached.items()}
+
+    missing = [pk for pk in teacher_ids if pk not in cards]
+    if missing:
+        rebuilt = {}
+        teachers = OnlyTeacher.objects.select_related("teacher_id", "department").filter(
+            pk__in=missing
+        )
+        for teacher in teachers:
+            cards[teacher.pk] = rebuilt[TEACHER_CARD_KEY.format(teacher.pk)] = _build_card(teacher)
+        cache.set_many(rebuilt, CACHE_TIMEOUT)
+
+    return [cards[pk] for pk in teacher_ids if pk in cards]
+
+
+def get_free_slots(stream_id=None):
+    """
+    Вільні місця, згруповані за викладачем: {teacher_pk: [slot, ...]}.
+    Без stream_id повертає місця для всіх потоків.
+    """
+    key = STREAM_SLOTS_KEY.format(stream_id or ALL_STREAMS)
+    free_slots = cache.get(key)
+    if free_slots is not None:
+        return free_slots
+
+    slots = Slot.objects.filter(occupied__lt=F("quota"))
+    if stream_id:
+        slots = slots.filter(stream_id=stream_id)
+
+    free_slots = {}
+    for teacher_pk, stream_code, quota, occupied in slots.order_by("pk").values_list(
+        "teacher_id", "stream_id__stream_code", "quota", "occupied"
+    ):
+        free_slots.setdefault(teacher_pk, []).append(
+            {
+                "stream_id": {"stream_code": stream_code},
+                "get_available_slots": quota - occupied,
+            }
+        )
+    cache.set(key, free_slots, CACHE_TIMEOUT)
+    return free_slots
+
+
+def get_snapshot(stream_code=None):
+    """
+    Знімок каталогу для коду потоку студента (або для всіх потоків, якщо код не вказано).
+    Версію читаємо до побудови, щоб ETag ніколи не випереджав дані.
+    """
+    version = get_version()
+    stream_id = None
+    if stream_code:
+        stream_id = resolve_stream_id(stream_code)
+        if stream_id is None:
+            return CatalogSnapshot(version=version, cards=get_teacher_cards(), free_slots={})
+    return CatalogSnapshot(
+        version=version,
+        cards=get_teacher_cards(),
+        free_slots=get_free_slots(stream_id),
+    )
+
+
+def make_etag(snapshot, *parts):
+    """ETag зі версії знімка та стану конкретного користувача."""
+    raw = ":".join(str(part) for part in (snapshot.version, *parts))
+    return '"%s"' % hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def invalidate_teachers(teacher_ids, membership_changed=False):
+    """Скидає картки вказаних викладачів (та список викладачів, якщо він змінився)."""
+    keys = [TEACHER_CARD_KEY.format(pk) for pk in teacher_ids]
+    if membership_changed:
+        keys.append(TEACHER_IDS_KEY)
+    if keys:
+        cache.delete_many(keys)
+    _bump_version()
+
+
+def invalidate_streams(stream_ids):
+    """Скидає вільні місця для вказаних потоків і загальний список."""
+    keys = [STREAM_SLOTS_KEY.format(pk) for pk in stream_ids if pk]
+    keys.append(STREAM_SLOTS_KEY.format(ALL_STREAMS))
+    cache.delete_many(keys)
+    _bump_version()
+
+
+def invalidate_stream_code(*stream_codes):
+    cache.delete_many([_stream_code_key(code) for code in stream_codes if code])
+    _bump_version()
@@ -0,0 +1,87 @@
+"""
+Дерева коментарів до файлів запиту одним запитом до БД.
+
+attach(files) вибирає всі коментарі файлів (з авторами) одним SELECT і
+збирає гілки в пам'яті. Після цього без звернень до БД працюють:
+
+* file.comments.all / file.comments.count — коментарі за часом створення;
+* comment.parent і comment.children.all — батьківський коментар і відповіді;
+* file.comment_tree — кореневі CommentNode з вкладеними replies;
+* file.last_comment_at — час останньої зміни коментарів (ключ кешу фрагмента
+  catalog/partials/comment_thread.html разом із кількістю коментарів).
+"""
+from dataclasses import dataclass, field
+
+from apps.catalog.models import FileComment
+
+
+@dataclass
+class CommentNode:
+    comment: FileComment
+    depth: int = 0
+    replies: list = field(default_factory=list)
+
+    def walk(self):
+        """Вузол і всі відповіді в порядку обходу гілки."""
+        yield self
+        for reply in self.replies:
+            yield from reply.walk()
+
+
+def _set_prefetched(instance, name, objects):
+    # Те саме, що робить prefetch_related: related-менеджер повертає готовий список
+    queryset = getattr(instance, name).get_queryset()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, "_prefetched_objects_cache"):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+def build_tree(comments):
+    """
+    Кореневі вузли з коментарів одного файлу (упорядкованих за часом). Коментар,
+    чий батько не входить у набір, стає кореневим.
+    """
+    nodes = {comment.pk: CommentNode(comment) for comment in comments}
+    roots = []
+    for comment in comments:
+        node = nodes[comment.pk]
+        parent = nodes.get(comment.parent_id)
+        if parent is None:
+            roots.append(node)
+            continue
+        comment._state.fields_cache["parent"] = parent.comment
+        parent.replies.append(node)
+    for root in roots:
+        for node in root.walk():
+            for reply in node.replies:
+                reply.depth = node.depth + 1
+    for node in nodes.values():
+        _set_prefetched(node.comment, "children", [reply.comment for reply in node.replies])
+    return roots
+
+
+def attach(files):
+    """Завантажує коментарі файлів одним запитом і розкладає їх по файлах."""
+    files = list(files)
+    if not files:
+        return files
+    by_file = {f.pk: [] for f in files}
+    comments = (
+        FileComment.objects.filter(file__in=by_file)
+        .select_related("author")
+        .order_by("created_at", "pk")
+    )
+    for comment in comments:
+        by_file[comment.file_id].append(comment)
+
+    for f in files:
+        file_comments = by_file[f.pk]
+        for comment in file_comments:
+            comment._state.fields_cache["file"] = f
+        f.comment_tree = build_tree(file_comments)
+        f.last_comment_at = max((c.updated_at for c in file_comments), default=None)
+        _set_prefetched(f, "comments", file_comments)
+    return files
+
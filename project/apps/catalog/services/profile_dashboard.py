@@ -0,0 +1,110 @@
+"""
+Дані сторінки профілю (вкладки запитів) за фіксовану кількість запитів до БД.
+
+Усі запити користувача вибираються одним SELECT разом з викладачем,
+студентом, темами й слотом; тематики студента і файли підтягуються
+prefetch-ем, а коментарі (з авторами, зібрані в гілки comment_tree) —
+лише для файлів активних запитів. Розбиття за статусами робиться в Python,
+тож кількість запитів не залежить від того, скільки запитів у користувача:
+щонайбільше 4 (запити, тематики, файли, коментарі).
+
+ProfileDashboard обслуговує повну сторінку профілю (users.views.profile);
+AJAX-вкладки завантажують лише потрібне їм через profile_tabs, використовуючи
+ті самі requests_for() і prefetch_comments().
+"""
+from dataclasses import dataclass, field
+
+from django.db.models import Prefetch
+
+from apps.catalog.models import Request, RequestFile
+
+from . import comment_tree
+
+ACTIVE = "Активний"
+PENDING = "Очікує"
+REJECTED = "Відхилено"
+COMPLETED = "Завершено"
+
+
+@dataclass
+class ProfileDashboard:
+    requests: list
+    by_status: dict = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        for req in self.requests:
+            self.by_status.setdefault(req.request_status, []).append(req)
+
+    def with_status(self, *statuses):
+        """Запити з будь-яким із статусів у порядку вибірки."""
+        if len(statuses) == 1:
+            return list(self.by_status.get(statuses[0], ()))
+        return [req for req in self.requests if req.request_status in statuses]
+
+    @property
+    def pending(self):
+        return self.with_status(PENDING)
+
+    @property
+    def active(self):
+        return self.with_status(ACTIVE)
+
+    @property
+    def rejected(self):
+        return self.with_status(REJECTED)
+
+    @property
+    def completed(self):
+        return self.with_status(COMPLETED)
+
+    @property
+    def accepted(self):
+        return self.with_status(ACTIVE, COMPLETED)
+
+    @property
+    def archived_with_files(self):
+        """Завершені запити, що мають хоча б один архівний файл (вкладка архіву)."""
+        return [req for req in self.completed if req.has_archived_files]
+
+    @property
+    def active_request_files(self):
+        """Файли активних запитів за str(request.id), як очікує фільтр get_item."""
+        return files_by_request(self.active)
+
+
+def files_by_request(requests):
+    """{str(request.id): [файли]} з уже підтягнутих файлів."""
+    return {str(req.id): list(req.files.all()) for req in requests}
+
+
+def requests_for(user, with_files=True):
+    """
+    Запити користувача з викладачем, студентом, темами, слотом і тематиками
+    студента; with_files додає prefetch файлів (новіші спочатку).
+    """
+    queryset = Request.objects.select_related(
+        "student_id", "teacher_id__teacher_id", "teacher_theme", "approved_student_theme", "slot",
+    )
+    lookups = ["student_themes"]
+    if with_files:
+        lookups.append(Prefetch(
+            "files",
+            queryset=RequestFile.objects.select_related("uploaded_by").order_by("-uploaded_at"),
+        ))
+    queryset = queryset.prefetch_related(*lookups)
+    if user.role == "Викладач":
+        # pk OnlyTeacher збігається з pk користувача, тож JOIN не потрібен
+        return queryset.filter(teacher_id=user.pk)
+    return queryset.filter(student_id=user)
+
+
+def prefetch_comments(requests):
+    """Один запит на коментарі до файлів запитів: дерева гілок збираються в пам'яті."""
+    comment_tree.attach(f for req in requests for f in req.files.all())
+
+
+def load_dashboard(user):
+    """Усі запити користувача (викладача чи студента), розбиті за статусами."""
+    requests = list(requests_for(user).order_by("pk"))
+    prefetch_comments([req for req in requests if req.request_status == ACTIVE])
+    return ProfileDashboard(requests)
@@ -0,0 +1,229 @@
+"""
+Ліниві завантажувачі AJAX-вкладок профілю (load_profile_tab, load_tab_content).
+
+Кожна вкладка реєструється декоратором @tab з назвою та шаблоном і
+завантажує лише те, що потрібно її шаблону: «Запити» — без файлів,
+«Активні» — файли й коментарі, «Архів» — лише завершені запити з архівними
+файлами. Запити впорядковані keyset-ключем (request_date, id), новіші
+спочатку. «Активні» й «Архів» віддаються посторінково, лише якщо клієнт
+просить сторінку (page_size або курсор): курсор наступної сторінки
+повертається разом із HTML. «Запити» не діляться на сторінки — у вкладці
+викладача кілька розділів за статусами, і спільна сторінка залишала б
+розділи порожніми.
+
+Сторінки кешуються за користувачем. Ключ містить версію користувача, яку
+змінюють сигнали збереження/видалення запиту, файлу, коментаря чи тематики
+студента (для студента й викладача запиту), а також загальну версію, яку
+скидають масові зміни (семестрові блокування). Версії записуються
+cache_versions, тож інвалідація з будь-якого процесу діє для всіх. Зміну
+імені співрозмовника кеш підхопить після CACHE_TIMEOUT.
+"""
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from apps.catalog.models import Request
+
+from . import cache_versions
+from .profile_dashboard import (
+    ACTIVE, COMPLETED, PENDING, REJECTED, files_by_request, prefetch_comments, requests_for,
+)
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+CACHE_TIMEOUT = 10 * 60
+VERSION_KEY = "profile:tabs:version"
+USER_VERSION_KEY = "profile:tabs:user:{}"
+PAGE_KEY = "profile:tabs:{}:{}:{}:{}:{}:{}"
+
+
+class InvalidPage(ValueError):
+    pass
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+@dataclass(frozen=True)
+class Tab:
+    template: str
+    loader: object
+    paginated: bool = True
+
+
+@dataclass
+class TabPage:
+    template: str
+    context: dict = field(default_factory=dict)
+    next_cursor: str = None
+
+
+TABS = {}
+
+
+def tab(name, template, paginated=True):
+    """
+    Реєструє завантажувач вкладки: loader(user, cursor, page_size) -> (context, next_cursor).
+    page_size=None — уся вкладка однією сторінкою.
+    """
+    def register(loader):
+        TABS[name] = Tab(template, loader, paginated)
+        return loader
+    return register
+
+
+# --- Курсор keyset-пагінації ---
+
+def encode_cursor(req):
+    raw = f"{req.request_date.isoformat()}|{req.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(request_date, id) з курсору; None — перша сторінка."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date), int(pk)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(f"Некоректний курсор: {cursor}") from e
+
+
+def parse_page_size(value):
+    """Розмір сторінки з параметра запиту; None — без поділу на сторінки."""
+    if not value:
+        return None
+    try:
+        page_size = int(value)
+    except ValueError:
+        page_size = 0
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise InvalidPage(f"Некоректний розмір сторінки: {value}")
+    return page_size
+
+
+def paginate(queryset, cursor, page_size):
+    """Сторінка запитів після курсору і курсор наступної сторінки (або None)."""
+    queryset = queryset.order_by("-request_date", "-pk")
+    position = decode_cursor(cursor)
+    if position:
+        date, pk = position
+        queryset = queryset.filter(Q(request_date__lt=date) | Q(request_date=date, pk__lt=pk))
+    if page_size is None:
+        return list(queryset), None
+    items = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+    return items[:page_size], next_cursor
+
+
+# --- Вкладки ---
+
+@tab("active", "profile/active.html")
+def load_active(user, cursor, page_size):
+    requests, next_cursor = paginate(
+        requests_for(user).filter(request_status=ACTIVE), cursor, page_size
+    )
+    prefetch_comments(requests)
+    return {
+        "active_requests": requests,
+        "active_request_files": files_by_request(requests),
+    }, next_cursor
+
+
+@tab("requests", "profile/requests.html", paginated=False)
+def load_requests(user, cursor, page_size):
+    if user.role == "Викладач":
+        requests, _ = paginate(
+            requests_for(user, with_files=False).filter(
+                request_status__in=[PENDING, REJECTED, ACTIVE, COMPLETED]
+            ),
+            None, None,
+        )
+        return {
+            "pending_requests": [r for r in requests if r.request_status == PENDING],
+            "accepted_requests": [r for r in requests if r.request_status in (ACTIVE, COMPLETED)],
+            "rejected_requests": [r for r in requests if r.request_status == REJECTED],
+        }, None
+
+    requests, _ = paginate(requests_for(user, with_files=False), None, None)
+    statuses = {r.request_status for r in requests}
+    return {
+        "all_requests": requests,
+        "has_pending": PENDING in statuses,
+        "has_rejected": REJECTED in statuses,
+        "active_requests": [r for r in requests if r.request_status == ACTIVE],
+        "archived_requests": [r for r in requests if r.request_status == COMPLETED],
+    }, None
+
+
+@tab("archive", "profile/archive.html")
+def load_archive(user, cursor, page_size):
+    # Файли архіву шаблон довантажує окремим запитом; наявність архівних файлів —
+    # денормалізований прапорець з індексом (користувач, статус, прапорець, дата)
+    requests, next_cursor = paginate(
+        requests_for(user, with_files=False).filter(request_status=COMPLETED, has_archived_files=True),
+        cursor, page_size,
+    )
+    return {"archived_requests": requests}, next_cursor
+
+
+# --- Кеш ---
+
+def _page_key(user_id, name, cursor, page_size):
+    user_key = USER_VERSION_KEY.format(user_id)
+    versions = cache.get_many([VERSION_KEY, user_key])
+    version = versions.get(VERSION_KEY) or cache_versions.get(VERSION_KEY)
+    user_version = versions.get(user_key) or cache_versions.get(user_key)
+    return PAGE_KEY.format(version, user_version, user_id, name, page_size or "all", cursor or "")
+
+
+def load_tab(user, name, cursor=None, page_size=None):
+    """
+    Вкладка name для користувача (з кешу або завантажена): уся або, якщо
+    задано page_size чи курсор, сторінка з page_size (типово PAGE_SIZE) запитів.
+    KeyError — невідома вкладка, InvalidCursor — зіпсований курсор.
+    """
+    spec = TABS[name]
+    if not spec.paginated:
+        cursor = page_size = None
+    elif cursor and page_size is None:
+        page_size = PAGE_SIZE
+    decode_cursor(cursor)
+    key = _page_key(user.pk, name, cursor, page_size)
+    page = cache.get(key)
+    if page is None:
+        context, next_cursor = spec.loader(user, cursor, page_size)
+        page = TabPage(spec.template, context, next_cursor)
+        cache.set(key, page, CACHE_TIMEOUT)
+    return page
+
+
+def invalidate_users(user_ids):
+    """Скидає закешовані вкладки вказаних користувачів."""
+    cache_versions.bump_existing({USER_VERSION_KEY.format(user_id) for user_id in user_ids if user_id is not None})
+
+
+def invalidate_requests(requests):
+    """Скидає вкладки студентів і викладачів запитів (pk OnlyTeacher = pk користувача)."""
+    invalidate_users(
+        user_id for req in requests for user_id in (req.student_id_id, req.teacher_id_id)
+    )
+
+
+def invalidate_request_ids(request_ids=(), file_ids=()):
+    """Скидає вкладки учасників запитів, заданих id запитів або id їхніх файлів."""
+    rows = Request.objects.filter(
+        Q(pk__in=request_ids) | Q(files__pk__in=file_ids)
+    ).values_list("student_id", "teacher_id")
+    invalidate_users(user_id for row in rows for user_id in row)
+
+
+def invalidate_all():
+    """Скидає вкладки всіх користувачів (масові UPDATE без сигналів)."""
+    cache_versions.bump(VERSION_KEY)
@@ -0,0 +1,177 @@
+"""
+Пакетні переходи статусів запитів (підтвердження/відхилення викладачем).
+
+Усі зміни виконуються в одній транзакції набором UPDATE-ів: статуси
+оновлюються bulk_update/update, місця в слотах займаються одним UPDATE на
+слот, теми звільняються одним TeacherTheme.release_many(). Сповіщення
+надсилаються одним пакетом після коміту.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from apps.catalog.models import Request, Slot, TeacherTheme
+from apps.catalog.services import academic_context, catalog_snapshot, profile_tabs
+from apps.notifications.services.request_notifications import notify_status_changed
+
+logger = logging.getLogger(__name__)
+
+APPROVE = 'approve'
+REJECT = 'reject'
+ACTIONS = (APPROVE, REJECT)
+
+DEFAULT_REJECT_REASON = "Викладач не вказав причину відмови"
+AUTO_CANCEL_REASON = "Автоматично скасовано через прийняття іншого запиту"
+
+
+def _topic_fields(req):
+    """Тема, яку Request.save() проставив би при переході в 'Активний'."""
+    if req.is_topic_locked or req.topic_name:
+        return req.topic_name, req.topic_description
+    if req.teacher_theme_id:
+        return req.teacher_theme.theme, req.teacher_theme.theme_description
+    if req.approved_student_theme_id:
+        return req.approved_student_theme.theme, req.topic_description
+    if req.custom_student_theme:
+        return req.custom_student_theme, req.topic_description
+    return req.topic_name, req.topic_description
+
+
+def _notification_queryset():
+    return Request.objects.select_related('student_id', 'teacher_id__teacher_id')
+
+
+def cancel_other_pending_requests(student_ids, exclude_ids=()):
+    """
+    Відхиляє всі інші запити зі статусом 'Очікує' вказаних студентів одним UPDATE
+    і звільняє їхні теми одним UPDATE. Повертає список скасованих запитів
+    (для пакетного сповіщення).
+    """
+    if not student_ids:
+        return []
+    cancelled = list(
+        _notification_queryset()
+        .select_for_update(of=('self',))
+        .filter(student_id__in=student_ids, request_status='Очікує')
+        .exclude(pk__in=exclude_ids)
+    )
+    if not cancelled:
+        return []
+
+    Request.objects.filter(pk__in=[req.pk for req in cancelled]).update(
+        request_status='Відхилено', rejected_reason=AUTO_CANCEL_REASON
+    )
+    TeacherTheme.release_many(req.teacher_theme_id for req in cancelled)
+    for req in cancelled:
+        req.request_status = 'Відхилено'
+        req.rejected_reason = AUTO_CANCEL_REASON
+    # UPDATE не надсилає post_save, тож вкладки профілю й академічний контекст скидаються явно
+    transaction.on_commit(lambda: profile_tabs.invalidate_requests(cancelled))
+    transaction.on_commit(lambda: academic_context.invalidate_many(req.student_id_id for req in cancelled))
+    return cancelled
+
+
+def bulk_transition(teacher, actions):
+    """
+    Застосовує набір дій викладача до його запитів зі статусом 'Очікує'.
+
+    actions — список dict: {"id": <request id>, "action": "approve"|"reject", "reason": <необов'язково>}.
+    Підтвердження залишає тему, яку обрав студент. Повертає
+    {"approved": [...], "rejected": [...], "cancelled": [...], "errors": {id: текст}}.
+    """
+    errors = {}
+    wanted = {}
+    for item in actions:
+        request_id = item.get('id')
+        action = item.get('action')
+        if not isinstance(request_id, int) or action not in ACTIONS:
+            errors[str(request_id)] = "Некоректна дія"
+            continue
+        wanted[request_id] = item
+
+    result = {'approved': [], 'rejected': [], 'cancelled': [], 'errors': errors}
+    if not wanted:
+        return result
+
+    with transaction.atomic():
+        requests = {
+            req.pk: req
+            for req in Request.objects.select_for_update(of=('self',))
+            .select_related('student_id', 'teacher_id__teacher_id', 'teacher_theme', 'approved_student_theme')
+            .filter(pk__in=wanted, teacher_id=teacher, request_status='Очікує')
+        }
+        for request_id in wanted:
+            if request_id not in requests:
+                errors[str(request_id)] = "Запит не знайдено або він вже оброблений"
+
+        to_reject = [req for pk, req in requests.items() if wanted[pk]['action'] == REJECT]
+        to_approve = [req for pk, req in requests.items() if wanted[pk]['action'] == APPROVE]
+
+        # --- Відхилення: одне UPDATE на кожну різну причину ---
+        by_reason = defaultdict(list)
+        for req in to_reject:
+            reason = (wanted[req.pk].get('reason') or '').strip() or DEFAULT_REJECT_REASON
+            req.request_status = 'Відхилено'
+            req.rejected_reason = reason
+            by_reason[reason].append(req.pk)
+        for reason, ids in by_reason.items():
+            Request.objects.filter(pk__in=ids).update(request_status='Відхилено', rejected_reason=reason)
+        TeacherTheme.release_many(req.teacher_theme_id for req in to_reject)
+
+        # --- Підтвердження: один студент — один активний запит, місця — в межах квоти ---
+        approved, seen_students, by_slot = [], set(), defaultdict(list)
+        for req in sorted(to_approve, key=lambda r: r.request_date):
+            if req.student_id_id in seen_students:
+                errors[str(req.pk)] = "Для цього студента вже підтверджено інший запит"
+                continue
+            if not req.slot_id:
+                errors[str(req.pk)] = "Для запиту не визначено слот"
+                continue
+            seen_students.add(req.student_id_id)
+            by_slot[req.slot_id].append(req)
+
+        slots = Slot.objects.select_for_update().in_bulk(list(by_slot))
+        touched_streams = set()
+        for slot_id, slot_requests in by_slot.items():
+            slot = slots[slot_id]
+            free = max(slot.quota - slot.occupied, 0)
+            for req in slot_requests[free:]:
+                errors[str(req.pk)] = "Немає вільних місць у слоті"
+                seen_students.discard(req.student_id_id)
+            granted = slot_requests[:free]
+            if granted:
+                Slot.objects.filter(pk=slot_id).update(occupied=F('occupied') + len(granted))
+                touched_streams.add(slot.stream_id_id)
+                approved.extend(granted)
+
+        for req in approved:
+            req.request_status = 'Активний'
+            req.topic_name, req.topic_description = _topic_fields(req)
+        if approved:
+            Request.objects.bulk_update(approved, ['request_status', 'topic_name', 'topic_description'])
+
+        cancelled = cancel_other_pending_requests(
+            {req.student_id_id for req in approved},
+            exclude_ids=[req.pk for req in approved],
+        )
+
+        changed = to_reject + approved + cancelled
+        transaction.on_commit(lambda: notify_status_changed(changed))
+        transaction.on_commit(lambda: profile_tabs.invalidate_requests(changed))
+        # Кафедра студента без профільної кафедри визначається за активним запитом
+        transaction.on_commit(lambda: academic_context.invalidate_many(req.student_id_id for req in changed))
+        if touched_streams:
+            transaction.on_commit(lambda: catalog_snapshot.invalidate_streams(touched_streams))
+
+    logger.info(
+        f"Bulk transition by teacher {teacher.pk}: approved={len(approved)}, "
+        f"rejected={len(to_reject)}, auto-cancelled={len(cancelled)}, errors={len(errors)}"
+    )
+    result.update(
+        approved=[req.pk for req in approved],
+        rejected=[req.pk for req in to_reject],
+        cancelled=[req.pk for req in cancelled],
+    )
+    return result
@@ -0,0 +1,121 @@
+"""
+Кеш дедлайнів семестру для Request.clean та semestr_rules.
+
+Налаштування Semestr змінюються кілька разів на рік, тому рядок читається
+один раз на процес для ключа (кафедра, навчальний рік, номер семестру).
+Кожен запис пам'ятає версію зі спільного кешу (cache_versions), з якою його
+прочитано. Сигнали на Semestr.save/delete записують нову версію, тож інші
+процеси перечитують рядок при наступному зверненні, а не через TTL.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date
+
+from django.utils import timezone
+
+from apps.catalog.models import Semestr
+
+from . import cache_versions
+
+VERSION_KEY = "semestr:policy:version"
+
+_cache = {}
+_lock = threading.Lock()
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class SemestrPolicy:
+    """Незмінний знімок дедлайнів семестру з відповідями, обчисленими на день `day`."""
+    semestr_id: int
+    day: date
+    lock_student_requests_date: date | None
+    lock_teacher_editing_themes_date: date | None
+    lock_cancel_requests_date: date | None
+    allow_complete_work_date: date | None
+    can_student_create_request: bool
+    should_lock_teacher_editing_themes: bool
+    should_lock_cancellations: bool
+    can_complete_requests: bool
+
+    @classmethod
+    def from_semestr(cls, semestr, day):
+        return cls._build(
+            semestr_id=semestr.pk,
+            day=day,
+            lock_student_requests_date=semestr.lock_student_requests_date,
+            lock_teacher_editing_themes_date=semestr.lock_teacher_editing_themes_date,
+            lock_cancel_requests_date=semestr.lock_cancel_requests_date,
+            allow_complete_work_date=semestr.allow_complete_work_date,
+        )
+
+    @classmethod
+    def _build(cls, day, **dates):
+        student = dates['lock_student_requests_date']
+        editing = dates['lock_teacher_editing_themes_date']
+        cancel = dates['lock_cancel_requests_date']
+        complete = dates['allow_complete_work_date']
+        # Та сама логіка, що й у методах Semestr
+        return cls(
+            day=day,
+            can_student_create_request=not student or day < student,
+            should_lock_teacher_editing_themes=bool(editing and day >= editing),
+            should_lock_cancellations=bool(cancel and day >= cancel),
+            can_complete_requests=bool(complete and day >= complete),
+            **dates,
+        )
+
+    def for_day(self, day):
+        """Ті самі дедлайни, перераховані на інший день (без запиту до БД)."""
+        if day == self.day:
+            return self
+        return self._build(
+            day=day,
+            semestr_id=self.semestr_id,
+            lock_student_requests_date=self.lock_student_requests_date,
+            lock_teacher_editing_themes_date=self.lock_teacher_editing_themes_date,
+            lock_cancel_requests_date=self.lock_cancel_requests_date,
+            allow_complete_work_date=self.allow_complete_work_date,
+        )
+
+
+def current_semestr_num():
+    month = timezone.now().month
+    return 1 if month in (9, 10, 11, 12, 1, 2) else 2
+
+
+def get_policy(department_id, academic_year, semestr=None):
+    """
+    Політика дедлайнів для кафедри/року/семестру (за замовчуванням — поточного)
+    або None, якщо семестр не створений.
+    """
+    if not department_id or not academic_year:
+        return None
+    if semestr is None:
+        semestr = current_semestr_num()
+    key = (department_id, academic_year, semestr)
+    today = timezone.localdate()
+    version = cache_versions.get(VERSION_KEY)
+
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == version:
+        policy = entry[1]
+        return None if policy is _MISSING else policy.for_day(today)
+
+    row = Semestr.objects.filter(
+        department_id=department_id, academic_year=academic_year, semestr=semestr
+    ).first()
+    policy = SemestrPolicy.from_semestr(row, today) if row else None
+    with _lock:
+        _cache[key] = (version, policy if policy else _MISSING)
+    return policy
+
+
+def invalidate():
+    """
+    Скидає весь кеш у всіх процесах (рядків небагато, а зміна кафедри/року
+    змінює ключ). Нова версія робить застарілими записи в кожному процесі.
+    """
+    cache_versions.bump(VERSION_KEY)
+    with _lock:
+        _cache.clear()
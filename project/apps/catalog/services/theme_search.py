@@ -0,0 +1,182 @@
+"""
+Повнотекстовий пошук тем викладачів.
+
+Кожна тема зберігає денормалізований пошуковий документ: search_title —
+нормалізована назва, search_document — назва, опис та ПІБ викладача.
+Обидва поля заповнює TeacherTheme.save(), а зміна імені викладача
+перебудовує документи його тем (сигнал у catalog/signals.py).
+
+theme_key() — окремий ключ рівності назв (регістр і пробіли не важать),
+за яким шукаються однакові теми без сканування таблиці.
+
+Нормалізація fold() для української: нижній регістр, без апострофів,
+ґ/ї/є/й зведені до г/і/е/и (а також російські ё/ы/э — набір не в тій
+розкладці), розділові знаки замінено пробілами.
+
+На MySQL поля мають FULLTEXT-індекси (міграція 0045), тож пошук не
+сканує таблицю: кожне слово запиту шукається як префікс (BOOLEAN MODE),
+а релевантність — 2 * збіг у назві + збіг у документі. Слова, коротші за
+innodb_ft_min_token_size, та інші СУБД використовують LIKE по документу
+з тим самим ранжуванням за назвою.
+"""
+import hashlib
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Case, ExpressionWrapper, F, FloatField, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+# innodb_ft_min_token_size за замовчуванням
+MIN_FULLTEXT_TOKEN = 3
+# Обмеження кількості слів запиту, щоб не будувати надто великі вирази
+MAX_QUERY_TOKENS = 8
+
+_FOLD_TABLE = str.maketrans({
+    "ґ": "г", "ї": "і", "є": "е", "й": "и",
+    "ё": "е", "ы": "и", "э": "е",
+    "'": None, "’": None, "ʼ": None, "`": None,
+})
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    """Нормалізований рядок для індексу та запиту: 'Ґрунтові об’єкти' -> 'грунтові обекти'."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_FOLD_TABLE)
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def normalize_theme(text):
+    """Назва теми для порівняння: без урахування регістру та зайвих пробілів."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def theme_key(text):
+    """
+    Ключ рівності тем (TeacherTheme.theme_key): SHA-1 нормалізованої назви.
+    Фіксована довжина дозволяє звичайний B-tree індекс замість theme__iexact.
+    """
+    return hashlib.sha1(normalize_theme(text).encode("utf-8")).hexdigest()
+
+
+def tokenize(query):
+    return fold(query).split()[:MAX_QUERY_TOKENS]
+
+
+def build_document(theme, teacher_names=None):
+    """
+    Повертає (search_title, search_document) теми. teacher_names —
+    (first_name, last_name, patronymic); якщо не передано, береться з
+    уже завантаженого викладача або одним запитом.
+    """
+    if teacher_names is None:
+        teacher_names = _teacher_names(theme)
+    search_title = fold(theme.theme)
+    parts = [search_title, fold(theme.theme_description), *(fold(name) for name in teacher_names)]
+    return search_title, " ".join(part for part in parts if part)
+
+
+def _teacher_names(theme):
+    if not theme.teacher_id_id:
+        return ()
+    teacher = theme._state.fields_cache.get("teacher_id")
+    if teacher is not None and "teacher_id" in teacher._state.fields_cache:
+        user = teacher.teacher_id
+        return (user.first_name, user.last_name, user.patronymic)
+    from apps.users.models import CustomUser
+
+    # pk OnlyTeacher збігається з pk користувача
+    return (
+        CustomUser.objects.filter(pk=theme.teacher_id_id)
+        .values_list("first_name", "last_name", "patronymic")
+        .first()
+    ) or ()
+
+
+def rebuild(theme_ids=None, teacher_ids=None, batch_size=500):
+    """
+    Перебудовує документи вибраних тем (або тем викладачів, або всіх тем).
+    Повертає кількість оновлених тем.
+    """
+    from apps.catalog.models import TeacherTheme
+
+    qs = TeacherTheme.objects.select_related("teacher_id__teacher_id").order_by("pk")
+    if theme_ids is not None:
+        qs = qs.filter(pk__in=theme_ids)
+    if teacher_ids is not None:
+        qs = qs.filter(teacher_id__in=teacher_ids)
+
+    updated = 0
+    batch = []
+    for theme in qs.iterator(chunk_size=batch_size):
+        user = theme.teacher_id.teacher_id if theme.teacher_id else None
+        names = (user.first_name, user.last_name, user.patronymic) if user else ()
+        theme.search_title, theme.search_document = build_document(theme, names)
+        batch.append(theme)
+        if len(batch) >= batch_size:
+            updated += TeacherTheme.objects.bulk_update(batch, ["search_title", "search_document"])
+            batch = []
+    if batch:
+        updated += TeacherTheme.objects.bulk_update(batch, ["search_title", "search_document"])
+    return updated
+
+
+def _fulltext_query(tokens):
+    return " ".join(f"+{token}*" for token in tokens)
+
+
+def search(queryset, query):
+    """
+    Фільтрує queryset тем за запитом і сортує за релевантністю (анотація
+    search_rank), далі за назвою. Порожній запит повертає queryset без змін.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    qn = connections[queryset.db].ops.quote_name
+    table = qn(queryset.model._meta.db_table)
+    use_fulltext = connections[queryset.db].vendor == "mysql"
+    long_tokens = [t for t in tokens if len(t) >= MIN_FULLTEXT_TOKEN] if use_fulltext else []
+    short_tokens = [t for t in tokens if t not in long_tokens]
+
+    for token in short_tokens:
+        queryset = queryset.filter(search_document__contains=token)
+
+    # Збіг слова на початку назви чи всієї фрази в назві важить більше
+    phrase = " ".join(tokens)
+    title_bonus = Case(
+        When(search_title__startswith=phrase, then=Value(4)),
+        When(search_title__contains=phrase, then=Value(2)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    if long_tokens:
+        against = _fulltext_query(long_tokens)
+        queryset = queryset.annotate(
+            _document_match=RawSQL(
+                f"MATCH ({table}.{qn('search_document')}) AGAINST (%s IN BOOLEAN MODE)", (against,),
+                output_field=FloatField(),
+            ),
+            _title_match=RawSQL(
+                f"MATCH ({table}.{qn('search_title')}) AGAINST (%s IN BOOLEAN MODE)", (against,),
+                output_field=FloatField(),
+            ),
+        ).filter(_document_match__gt=0)
+        rank = ExpressionWrapper(
+            F("_document_match") + F("_title_match") * 2 + title_bonus, output_field=FloatField()
+        )
+    else:
+        title_hits = [
+            Case(
+                When(search_title__contains=token, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+            for token in tokens
+        ]
+        rank = sum(title_hits[1:], title_hits[0]) + title_bonus
+    return queryset.annotate(search_rank=rank).order_by("-search_rank", "theme")
+
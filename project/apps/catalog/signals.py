@@ -0,0 +1,188 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.users.models import CustomUser
+from .models import (
+    Department, Faculty, FileComment, Group, OnlyStudent, OnlyTeacher, Request, RequestFile, Semestr,
+    Slot, Specialty, Stream, StudentTheme, TeacherTheme,
+)
+from .services import (
+    academic_context, autocomplete_index, catalog_snapshot, profile_tabs, semestr_policy, theme_search,
+)
+
+
+@receiver(post_save, sender=Slot)
+@receiver(post_delete, sender=Slot)
+def invalidate_catalog_on_slot_change(sender, instance, **kwargs):
+    catalog_snapshot.invalidate_streams([instance.stream_id_id])
+
+
+@receiver(post_save, sender=Request)
+@receiver(post_delete, sender=Request)
+def invalidate_catalog_on_request_change(sender, instance, **kwargs):
+    if not instance.slot_id:
+        return
+    try:
+        stream_id = instance.slot.stream_id_id
+    except Slot.DoesNotExist:
+        stream_id = None
+    catalog_snapshot.invalidate_streams([stream_id])
+
+
+@receiver(post_save, sender=OnlyTeacher)
+def invalidate_catalog_on_teacher_save(sender, instance, created, **kwargs):
+    catalog_snapshot.invalidate_teachers([instance.pk], membership_changed=created)
+
+
+@receiver(post_delete, sender=OnlyTeacher)
+def invalidate_catalog_on_teacher_delete(sender, instance, **kwargs):
+    catalog_snapshot.invalidate_teachers([instance.pk], membership_changed=True)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_catalog_on_teacher_user_save(sender, instance, created, **kwargs):
+    # Ім'я та фото викладача зберігаються в CustomUser
+    if not created and instance.role == "Викладач":
+        catalog_snapshot.invalidate_teachers([instance.pk])
+
+
+@receiver(post_save, sender=CustomUser)
+def rebuild_theme_search_on_teacher_rename(sender, instance, created, update_fields=None, **kwargs):
+    # ПІБ викладача входить у пошуковий документ його тем
+    if created or instance.role != "Викладач":
+        return
+    if update_fields is not None and not {"first_name", "last_name", "patronymic"} & set(update_fields):
+        return
+    theme_search.rebuild(teacher_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Department)
+def invalidate_catalog_on_department_change(sender, instance, **kwargs):
+    teacher_ids = list(
+        OnlyTeacher.objects.filter(department=instance).values_list("pk", flat=True)
+    )
+    catalog_snapshot.invalidate_teachers(teacher_ids)
+
+
+@receiver(post_save, sender=Stream)
+@receiver(post_delete, sender=Stream)
+def invalidate_catalog_on_stream_change(sender, instance, **kwargs):
+    catalog_snapshot.invalidate_stream_code(instance.stream_code)
+    catalog_snapshot.invalidate_streams([instance.pk])
+
+
+@receiver(post_save, sender=Semestr)
+@receiver(post_delete, sender=Semestr)
+def invalidate_semestr_policy(sender, instance, **kwargs):
+    semestr_policy.invalidate()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_academic_context_on_user_change(sender, instance, **kwargs):
+    academic_context.forget(instance)
+    academic_context.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=OnlyStudent)
+@receiver(post_delete, sender=OnlyStudent)
+@receiver(post_save, sender=OnlyTeacher)
+@receiver(post_delete, sender=OnlyTeacher)
+def invalidate_academic_context_on_profile_change(sender, instance, **kwargs):
+    # Кафедра береться з профілю; користувач профілю міг бути вже завантажений у цьому запиті
+    academic_context.forget(instance._state.fields_cache.get("student_id")
+                            or instance._state.fields_cache.get("teacher_id"))
+    academic_context.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Request)
+@receiver(post_delete, sender=Request)
+def invalidate_academic_context_on_request_change(sender, instance, **kwargs):
+    # Кафедра студента без профільної кафедри визначається за активним запитом
+    academic_context.forget(instance._state.fields_cache.get("student_id"))
+    academic_context.invalidate(instance.student_id_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Stream)
+@receiver(post_delete, sender=Stream)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+@receiver(post_save, sender=Specialty)
+@receiver(post_delete, sender=Specialty)
+def invalidate_academic_contexts(sender, instance, **kwargs):
+    academic_context.invalidate_all()
+
+
+@receiver(post_save, sender=OnlyTeacher)
+@receiver(post_delete, sender=OnlyTeacher)
+def refresh_autocomplete_on_teacher_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete_index.mark_changed, autocomplete_index.TEACHER, instance.pk))
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_autocomplete_on_teacher_rename(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.role != "Викладач":
+        return
+    if update_fields is not None and not {"first_name", "last_name", "patronymic"} & set(update_fields):
+        return
+    transaction.on_commit(partial(autocomplete_index.mark_changed, autocomplete_index.TEACHER, instance.pk))
+
+
+@receiver(post_save, sender=TeacherTheme)
+@receiver(post_delete, sender=TeacherTheme)
+def refresh_autocomplete_on_theme_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete_index.mark_changed, autocomplete_index.THEME, instance.pk))
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def refresh_autocomplete_on_department_change(sender, instance, **kwargs):
+    # Назва кафедри є в описі кожного викладача кафедри
+    transaction.on_commit(partial(autocomplete_index.mark_changed, autocomplete_index.ALL))
+
+
+@receiver(post_save, sender=Request)
+@receiver(post_delete, sender=Request)
+def invalidate_profile_tabs_on_request_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(profile_tabs.invalidate_requests, [instance]))
+
+
+@receiver(post_save, sender=RequestFile)
+@receiver(post_delete, sender=RequestFile)
+@receiver(post_save, sender=StudentTheme)
+@receiver(post_delete, sender=StudentTheme)
+def invalidate_profile_tabs_on_request_part_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(profile_tabs.invalidate_request_ids, request_ids=[instance.request_id]))
+
+
+@receiver(post_save, sender=RequestFile)
+def sync_archive_flag_on_file_save(sender, instance, created, **kwargs):
+    # Новий неархівний файл не змінює прапорця
+    if instance.is_archived or not created:
+        Request.sync_archived_files([instance.request_id])
+
+
+@receiver(post_delete, sender=RequestFile)
+def sync_archive_flag_on_file_delete(sender, instance, **kwargs):
+    if instance.is_archived:
+        Request.sync_archived_files([instance.request_id])
+
+
+@receiver(post_save, sender=FileComment)
+@receiver(post_delete, sender=FileComment)
+def invalidate_profile_tabs_on_comment_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(profile_tabs.invalidate_request_ids, file_ids=[instance.file_id]))
+
+
+@receiver(post_save, sender=Semestr)
+def invalidate_profile_tabs_on_semestr_change(sender, instance, **kwargs):
+    # Семестрові блокування змінюють запити масовим UPDATE без сигналів
+    transaction.on_commit(profile_tabs.invalidate_all)
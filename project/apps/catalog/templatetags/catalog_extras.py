@@ -2,8 +2,7 @@ from django import template
 from django.db.models import Model
 from django.utils.safestring import mark_safe
 import json
-from django.templatetags.static import static
-from django.core.files.storage import default_storage
+from apps.users.services.avatar import default_avatar_url, get_avatar_url
 
 register = template.Library()
 
@@ -87,12 +86,7 @@ def filter_status(requests, status):
 @register.simple_tag
 def get_profile_picture_url(user):
     """
-    Returns the appropriate URL for a user's profile picture, either from Cloudinary or the default avatar.
+    Returns the URL of a user's profile picture or the default avatar.
+    Resolved URLs are cached per user (see apps.users.services.avatar), storage is never asked whether the file exists.
     """
-    if user and hasattr(user, 'profile_picture') and user.profile_picture:
-        try:
-            if default_storage.exists(user.profile_picture.name):
-                return default_storage.url(user.profile_picture.name)
-        except Exception as e:
-            print(f"Error getting profile picture URL for user {user.id}: {str(e)}")
-    return static('images/default-avatar.jpg')
+    return get_avatar_url(user) if user else default_avatar_url()
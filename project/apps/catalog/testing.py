@@ -0,0 +1,54 @@
+"""
+Спільні фікстури тестів каталогу та інших застосунків (apps.users тощо).
+
+Окремий модуль, а не tests.py: імпорт тестового модуля іншого застосунку
+тягне за собою і його TestCase-класи.
+"""
+from django.contrib.auth import get_user_model
+
+from apps.catalog.models import Department, Faculty, OnlyTeacher, Request, Slot, Specialty, Stream
+
+User = get_user_model()
+
+
+class CatalogFixtureMixin:
+    def create_catalog(self):
+        self.faculty, _ = Faculty.objects.get_or_create(
+            name='Тестовий факультет', defaults={'short_name': 'test'}
+        )
+        self.specialty, _ = Specialty.objects.get_or_create(
+            code='126', faculty=self.faculty, education_level='bachelor',
+            defaults={'name': 'Тестова спеціальність'}
+        )
+        self.stream, _ = Stream.objects.get_or_create(
+            stream_code='ФЕС-2', defaults={'specialty': self.specialty}
+        )
+        self.department, _ = Department.objects.get_or_create(
+            department_name='Кафедра тестування', defaults={'short_name': 'КТЕСТ', 'faculty': self.faculty}
+        )
+        self.teacher_user = User.objects.create_user(
+            email='teacher@test.com', first_name='Іван', last_name='Викладач', role='Викладач'
+        )
+        self.teacher = OnlyTeacher.objects.get(teacher_id=self.teacher_user)
+        self.teacher.department = self.department
+        self.teacher.save()
+        self.slot = Slot.objects.create(teacher_id=self.teacher, stream_id=self.stream, quota=2)
+        self.student_user = User.objects.create_user(
+            email='student@test.com', first_name='Тест', last_name='Студент',
+            role='Студент', academic_group='ФЕС-21'
+        )
+
+    def create_students(self, count):
+        return [
+            User.objects.create_user(
+                email=f'student{i}@test.com', first_name=f'Студент{i}', last_name='Тестовий',
+                role='Студент', academic_group='ФЕС-21'
+            )
+            for i in range(count)
+        ]
+
+    def create_pending_request(self, student):
+        return Request.objects.create(
+            student_id=student, teacher_id=self.teacher, slot=self.slot,
+            request_status='Очікує', motivation_text='Мотивація'
+        )
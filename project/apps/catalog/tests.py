@@ -1,3 +1,1156 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from threading import Barrier, Thread
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.catalog.models import (
+    FileComment, Group, OnlyTeacher, Request, RequestFile, Semestr, Slot, StudentTheme, TeacherTheme,
+)
+from apps.catalog.services import (
+    academic_context, autocomplete_index, cache_versions, catalog_snapshot, comment_tree, profile_dashboard,
+    profile_tabs, request_transitions, semestr_policy, theme_search,
+)
+from apps.catalog.testing import CatalogFixtureMixin
+from apps.notifications.models import Message
+
+User = get_user_model()
+
+
+class TeachersListSnapshotTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.client.force_login(self.student_user)
+        self.url = reverse('teachers_list')
+
+    def test_returns_free_slots_for_student_stream(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['teacher']['teacher_id']['department'], 'Кафедра тестування')
+        self.assertEqual(
+            data[0]['free_slots'],
+            [{'stream_id': {'stream_code': 'ФЕС-2'}, 'get_available_slots': 2}],
+        )
+        self.assertTrue(data[0]['is_matched'])
+
+    def test_unchanged_catalog_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_slot_change_invalidates_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        self.slot.quota = 5
+        self.slot.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['free_slots'][0]['get_available_slots'], 5)
+
+    def test_department_rename_rebuilds_teacher_card(self):
+        self.client.get(self.url)
+        self.department.department_name = 'Кафедра перейменована'
+        self.department.save()
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data[0]['teacher']['teacher_id']['department'], 'Кафедра перейменована')
+
+    def test_each_invalidation_writes_a_new_version(self):
+        # Версія не інкрементується, а записується заново
+        versions = {catalog_snapshot.get_version()}
+        with mock.patch.object(cache, 'incr') as incr:
+            for _ in range(3):
+                catalog_snapshot.invalidate_streams([])
+                versions.add(catalog_snapshot.get_version())
+        incr.assert_not_called()
+        self.assertEqual(len(versions), 4)
+
+    def test_warm_snapshot_does_not_touch_catalog_tables(self):
+        self.client.get(self.url)
+        # Сесія, користувач і два запити по Request; академічний контекст, слоти й викладачі — з кешу
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+
+class AcademicContextTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+
+    def test_parse_academic_group(self):
+        self.assertEqual(academic_context.parse_academic_group('ФЕС-33'), (3, False, 'ФЕС-3'))
+        self.assertEqual(academic_context.parse_academic_group('ФЕП-24ВПК'), (2, False, 'ФЕП-2ВПК'))
+        self.assertEqual(academic_context.parse_academic_group('ФЕІ-11м'), (1, True, 'ФЕІ-1м'))
+        self.assertEqual(academic_context.parse_academic_group(''), (None, False, None))
+
+    def test_context_is_cached_between_requests(self):
+        context = self.student_user.get_academic_context()
+        self.assertEqual(context.stream_id, self.stream.pk)
+        self.assertEqual(context.faculty, Group.objects.get(group_code='ФЕС-21').stream.specialty.faculty)
+
+        user = User.objects.get(pk=self.student_user.pk)
+        with self.assertNumQueries(0):
+            user.get_department()
+            user.get_faculty()
+            user.get_department_short_name()
+
+    def test_active_request_updates_department(self):
+        self.assertIsNone(self.student_user.get_department())
+        Request.objects.create(
+            student_id=self.student_user, teacher_id=self.teacher, slot=self.slot,
+            request_status='Активний', motivation_text='Мотивація'
+        )
+        user = User.objects.get(pk=self.student_user.pk)
+        self.assertEqual(user.get_department_short_name(), 'КТЕСТ')
+
+    def test_bulk_approval_updates_department(self):
+        req = self.create_pending_request(self.student_user)
+        self.assertIsNone(User.objects.get(pk=self.student_user.pk).get_department())
+        with self.captureOnCommitCallbacks(execute=True):
+            request_transitions.bulk_transition(self.teacher, [{'id': req.pk, 'action': 'approve'}])
+        user = User.objects.get(pk=self.student_user.pk)
+        self.assertEqual(user.get_department_short_name(), 'КТЕСТ')
+
+    def test_group_change_recomputes_context(self):
+        self.student_user.get_academic_context()
+        self.student_user.academic_group = 'ФЕЇ-31'
+        self.student_user.save()
+
+        context = User.objects.get(pk=self.student_user.pk).get_academic_context()
+        self.assertEqual((context.course, context.stream_code, context.stream_id), (None, 'ФЕЇ-3', None))
+
+    def test_stream_change_invalidates_all_contexts(self):
+        self.assertEqual(self.student_user.get_academic_context().stream_id, self.stream.pk)
+
+        self.stream.delete()
+        user = User.objects.get(pk=self.student_user.pk)
+        self.assertIsNone(user.get_academic_context().stream_id)
+
+    def test_themes_api_uses_student_stream(self):
+        theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Тема потоку')
+        theme.streams.add(self.stream)
+        TeacherTheme.objects.create(teacher_id=self.teacher, theme='Тема без потоку')
+        self.client.force_login(self.student_user)
+
+        data = self.client.get(reverse('themes_api')).json()
+        self.assertEqual([item['theme'] for item in data], ['Тема потоку'])
+
+
+class ThemeSearchTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.client.force_login(self.student_user)
+
+    def create_theme(self, theme, description=''):
+        theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme=theme, theme_description=description)
+        theme.streams.add(self.stream)
+        return theme
+
+    def test_fold(self):
+        self.assertEqual(theme_search.fold('Ґрунтові  ОБ’ЄКТИ, й т.д.'), 'грунтові обекти и т д')
+
+    def test_document_is_maintained_on_save_and_teacher_rename(self):
+        theme = self.create_theme('Нейронні мережі', 'Глибоке навчання')
+        self.assertEqual(theme.search_title, 'неиронні мережі')
+        self.assertEqual(theme.search_document, 'неиронні мережі глибоке навчання іван викладач')
+
+        self.teacher_user.last_name = 'Петренко'
+        self.teacher_user.save()
+        theme.refresh_from_db()
+        self.assertTrue(theme.search_document.endswith('іван петренко'))
+
+    def test_find_by_title_tolerates_duplicate_keys(self):
+        deleted = self.create_theme('Нейронні мережі')
+        deleted.is_deleted = True
+        deleted.save()
+        kept = self.create_theme('НЕЙРОННІ  мережі')
+        self.create_theme('нейронні мережі')
+
+        self.assertEqual(TeacherTheme.find_by_title(self.teacher, ' нейронні мережі'), kept)
+        self.assertIsNone(TeacherTheme.find_by_title(self.teacher, 'Оптика'))
+
+    def test_themes_api_ranks_title_matches_first(self):
+        self.create_theme('Аналіз даних', 'Методи кластеризації')
+        self.create_theme('Кластеризація графів')
+        self.create_theme('Оптика')
+
+        data = self.client.get(reverse('themes_api'), {'q': 'КЛАСТЕР'}).json()
+        self.assertEqual([item['theme'] for item in data], ['Кластеризація графів', 'Аналіз даних'])
+
+    def test_search_folds_ukrainian_letters_and_teacher_names(self):
+        self.create_theme("Ґрунтові об'єкти")
+        qs = TeacherTheme.objects.all()
+        self.assertEqual(theme_search.search(qs, 'грунтові обєкти').count(), 1)
+        self.assertEqual(theme_search.search(qs, 'іван ґрунт').count(), 1)
+        self.assertEqual(theme_search.search(qs, 'ґрунт оптика').count(), 0)
+
+    def test_autocomplete_returns_matching_themes(self):
+        self.create_theme('Квантові обчислення')
+        data = self.client.get(reverse('autocomplete'), {'q': 'квант'}).json()
+        self.assertIn('📚 Квантові обчислення', [item['label'] for item in data])
+
+
+class ThemeKeyTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Оптичні сенсори')
+
+    def test_key_ignores_case_and_whitespace(self):
+        self.assertEqual(self.theme.theme_key, theme_search.theme_key('  оптичні   СЕНСОРИ '))
+        self.assertNotEqual(self.theme.theme_key, theme_search.theme_key('Оптичні сенсори 2'))
+
+    def test_key_follows_rename(self):
+        self.theme.theme = 'Нова назва'
+        self.theme.save(update_fields=['theme'])
+        self.theme.refresh_from_db()
+        self.assertEqual(self.theme.theme_key, theme_search.theme_key('нова назва'))
+
+    def test_theme_teachers_uses_key(self):
+        other_user = User.objects.create_user(
+            email='other@test.com', first_name='Олена', last_name='Друга', role='Викладач'
+        )
+        TeacherTheme.objects.create(teacher_id_id=other_user.pk, theme='ОПТИЧНІ  сенсори')
+        TeacherTheme.objects.create(teacher_id_id=other_user.pk, theme='Інша тема')
+        self.client.force_login(self.student_user)
+
+        url = reverse('theme_teachers', args=[self.theme.pk])
+        with CaptureQueriesContext(connection) as queries:
+            teacher_ids = self.client.get(url).json()
+        self.assertEqual(sorted(teacher_ids), sorted([self.teacher.pk, other_user.pk]))
+        self.assertTrue(any('theme_key' in query['sql'] for query in queries.captured_queries))
+
+    def test_update_rejects_duplicate_name_in_other_case(self):
+        other = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Інша тема')
+        self.client.force_login(self.teacher_user)
+
+        response = self.client.post(
+            reverse('update_teacher_theme', args=[other.pk]),
+            data=json.dumps({'theme': 'оптичні СЕНСОРИ', 'description': ''}),
+            content_type='application/json',
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 400)
+        other.refresh_from_db()
+        self.assertEqual(other.theme, 'Інша тема')
+
+
+class AutocompleteIndexTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete_index.reset()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Оптичні сенсори')
+
+    def labels(self, query):
+        return [item['label'] for item in autocomplete_index.search(query)]
+
+    def test_warm_index_answers_without_database(self):
+        autocomplete_index.get_index()
+        with self.assertNumQueries(0):
+            results = autocomplete_index.search('вик')
+        self.assertEqual(results, [{
+            'type': 'teacher', 'id': self.teacher.pk, 'label': '👨‍🏫 Іван Викладач',
+            'description': 'Викладач • Кафедра тестування', 'url': '#',
+        }])
+
+    def test_every_query_word_is_a_prefix(self):
+        self.assertEqual(self.labels('сенс опт'), ['📚 Оптичні сенсори'])
+        self.assertEqual(self.labels('ІВАН ВИКЛ'), ['👨‍🏫 Іван Викладач'])
+        self.assertEqual(self.labels('енсори'), [])
+        self.assertEqual(self.labels('о'), [])
+
+    def test_teacher_rename_is_applied_incrementally(self):
+        autocomplete_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher_user.first_name = 'Ганна'
+            self.teacher_user.save()
+
+        # Викладач і теми лише цього викладача, без повної перебудови
+        with self.assertNumQueries(2), mock.patch.object(autocomplete_index, 'build') as build:
+            autocomplete_index.get_index()
+        build.assert_not_called()
+        self.assertEqual(self.labels('ганна'), ['👨‍🏫 Ганна Викладач'])
+        self.assertEqual(autocomplete_index.search('оптичні')[0]['description'], 'Викладач: Ганна Викладач')
+
+    def test_deactivated_theme_is_removed(self):
+        autocomplete_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theme.deactivate()
+        self.assertEqual(self.labels('оптичні'), [])
+
+
+class AutocompleteIndexSharedCacheTestCase(CatalogFixtureMixin, TestCase):
+    """Індекси двох процесів, що синхронізуються лише через спільний кеш (settings.CACHES)."""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete_index.reset()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Оптичні сенсори')
+
+    def switch_process(self, state):
+        """Підставляє стан індексу іншого процесу; повертає стан поточного."""
+        current = autocomplete_index._index, autocomplete_index._index_version
+        autocomplete_index._index, autocomplete_index._index_version = state
+        return current
+
+    def test_change_in_other_process_reaches_warm_index(self):
+        autocomplete_index.get_index()
+        first = self.switch_process((None, None))
+
+        # Другий процес має власний індекс і обробляє збереження
+        autocomplete_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher_user.first_name = 'Ганна'
+            self.teacher_user.save()
+        self.switch_process(first)
+
+        with mock.patch.object(autocomplete_index, 'build') as build:
+            self.assertEqual(
+                [item['label'] for item in autocomplete_index.search('ганна')], ['👨‍🏫 Ганна Викладач'],
+            )
+        build.assert_not_called()
+
+    def test_concurrent_changes_do_not_share_a_version(self):
+        autocomplete_index.get_index()
+        version = autocomplete_index.get_version()
+        # Інший процес уже зайняв наступну версію, а incr цього процесу прочитав стару
+        cache.add(autocomplete_index.CHANGE_KEY.format(version + 1), (autocomplete_index.THEME, self.theme.pk))
+        cache.set(autocomplete_index.VERSION_KEY, version)
+        autocomplete_index.mark_changed(autocomplete_index.TEACHER, self.teacher.pk)
+        self.assertEqual(autocomplete_index.get_version(), version + 2)
+        self.assertEqual(
+            cache.get(autocomplete_index.CHANGE_KEY.format(version + 2)),
+            (autocomplete_index.TEACHER, self.teacher.pk),
+        )
+
+
+class SlotReservationTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+
+    def test_reserve_is_single_conditional_update(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.slot.reserve())
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 1)
+
+    def test_reserve_fails_when_slot_is_full(self):
+        self.assertTrue(self.slot.reserve())
+        self.assertTrue(self.slot.reserve())
+        self.assertFalse(self.slot.reserve())
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 2)
+
+    def test_request_status_changes_move_counter(self):
+        req = self.create_pending_request(self.student_user)
+        req.request_status = 'Активний'
+        req.save()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 1)
+
+        req.request_status = 'Завершено'
+        req.save()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 0)
+
+    def test_approve_over_quota_raises_and_keeps_status(self):
+        requests = [self.create_pending_request(s) for s in self.create_students(3)]
+        for req in requests[:2]:
+            req.request_status = 'Активний'
+            req.save()
+
+        requests[2].request_status = 'Активний'
+        with self.assertRaises(ValidationError):
+            requests[2].save()
+        requests[2].refresh_from_db()
+        self.assertEqual(requests[2].request_status, 'Очікує')
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 2)
+
+    def test_approval_touches_slot_with_one_update(self):
+        req = self.create_pending_request(self.student_user)
+        req = Request.objects.get(pk=req.pk)
+        req.request_status = 'Активний'
+        with CaptureQueriesContext(connection) as ctx:
+            req.save()
+        # Раніше: повторний SELECT запиту, COUNT активних запитів слоту і повне збереження слоту.
+        # Тепер: завантаження self.slot (stream потрібен для інвалідації каталогу) і умовний UPDATE
+        slot_queries = [q['sql'] for q in ctx.captured_queries if 'catalog_slot' in q['sql']]
+        self.assertEqual([sql.split()[0] for sql in slot_queries], ['SELECT', 'UPDATE'])
+        self.assertIn('"occupied" < ', slot_queries[1])
+        self.assertFalse([
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "catalog_request"' in q['sql']
+        ])
+
+    def test_reconcile_fixes_drift_with_single_group_by(self):
+        req = self.create_pending_request(self.student_user)
+        req.request_status = 'Активний'
+        req.save()
+        Slot.objects.filter(pk=self.slot.pk).update(occupied=0)
+
+        # SELECT ... FOR UPDATE, GROUP BY по активних запитах та bulk_update (+ SAVEPOINT/RELEASE)
+        with self.assertNumQueries(5):
+            self.assertEqual(Slot.reconcile_occupied(), 1)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 1)
+
+    def test_reconcile_command(self):
+        Slot.objects.filter(pk=self.slot.pk).update(occupied=2)
+        call_command('reconcile_slot_occupancy', stdout=open('/dev/null', 'w'))
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 0)
+
+
+class SlotReservationConcurrencyTestCase(CatalogFixtureMixin, TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+
+    def test_parallel_approvals_never_oversubscribe(self):
+        request_ids = [self.create_pending_request(s).pk for s in self.create_students(self.THREADS)]
+        barrier = Barrier(self.THREADS)
+        approved, slot_full, errors = [], [], []
+
+        def approve(request_id):
+            try:
+                req = Request.objects.get(pk=request_id)
+                req.request_status = 'Активний'
+                barrier.wait()
+                req.save()
+                approved.append(request_id)
+            except ValidationError:
+                slot_full.append(request_id)
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [Thread(target=approve, args=(pk,)) for pk in request_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(approved), self.slot.quota)
+        self.assertEqual(len(slot_full), self.THREADS - self.slot.quota)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, self.slot.quota)
+        self.assertEqual(
+            set(Request.objects.filter(slot=self.slot, request_status='Активний').values_list('pk', flat=True)),
+            set(approved),
+        )
+
+
+class TeacherThemeClaimTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Тема')
+
+    def test_claim_is_single_conditional_update(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.theme.claim())
+        self.assertFalse(TeacherTheme.objects.get(pk=self.theme.pk).claim())
+
+    def test_deleted_theme_cannot_be_claimed(self):
+        TeacherTheme.objects.filter(pk=self.theme.pk).update(is_deleted=True)
+        self.assertFalse(self.theme.claim())
+
+    def test_release_many_is_single_update(self):
+        other = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Інша', is_occupied=True)
+        self.theme.claim()
+        with self.assertNumQueries(1):
+            self.assertEqual(TeacherTheme.release_many([self.theme.pk, other.pk, None]), 2)
+        self.assertFalse(TeacherTheme.objects.filter(is_occupied=True).exists())
+
+    def test_rejecting_request_releases_theme(self):
+        self.theme.claim()
+        req = self.create_pending_request(self.student_user)
+        req.teacher_theme = self.theme
+        req.save()
+
+        req.request_status = 'Відхилено'
+        req.save()
+        self.theme.refresh_from_db()
+        self.assertFalse(self.theme.is_occupied)
+
+
+class TeacherThemeClaimConcurrencyTestCase(CatalogFixtureMixin, TransactionTestCase):
+    THREADS = 16
+
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Популярна тема')
+
+    def test_only_one_thread_wins_the_theme(self):
+        barrier = Barrier(self.THREADS)
+        results, errors = [], []
+
+        def claim():
+            try:
+                theme = TeacherTheme.objects.get(pk=self.theme.pk)
+                barrier.wait()
+                results.append(theme.claim())
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [Thread(target=claim) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Рівно один виклик зайняв тему, решта отримали «вже зайнята» (False), а не помилку
+        self.assertEqual(errors, [])
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(results.count(False), self.THREADS - 1)
+        self.theme.refresh_from_db()
+        self.assertTrue(self.theme.is_occupied)
+
+
+class ApproveRequestWithThemeTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Тема')
+        self.req = self.create_pending_request(self.student_user)
+        other_teacher_user = User.objects.create_user(
+            email='teacher2@test.com', first_name='Петро', last_name='Викладач', role='Викладач'
+        )
+        other_teacher = OnlyTeacher.objects.get(teacher_id=other_teacher_user)
+        other_slot = Slot.objects.create(teacher_id=other_teacher, stream_id=self.stream, quota=2)
+        self.other_req = Request.objects.create(
+            student_id=self.student_user, teacher_id=other_teacher, slot=other_slot,
+            request_status='Очікує', motivation_text='Мотивація'
+        )
+        self.client.force_login(self.teacher_user)
+        self.url = reverse('approve_request_with_theme', args=[self.req.pk])
+
+    def approve(self, theme_id):
+        return self.client.post(
+            self.url, json.dumps({'theme_id': theme_id}), content_type='application/json',
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def test_approval_cancels_other_pending_requests(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.approve(f'teacher_{self.theme.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cancelled_count'], 1)
+        self.other_req.refresh_from_db()
+        self.assertEqual(self.other_req.request_status, 'Відхилено')
+
+    def test_approval_into_full_slot_changes_nothing(self):
+        for req in [self.create_pending_request(s) for s in self.create_students(2)]:
+            req.request_status = 'Активний'
+            req.save()
+        messages = Message.objects.count()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.approve(f'teacher_{self.theme.pk}')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+        self.assertEqual(callbacks, [])
+        self.assertEqual(Message.objects.count(), messages)
+        self.req.refresh_from_db()
+        self.other_req.refresh_from_db()
+        self.theme.refresh_from_db()
+        self.assertEqual(self.req.request_status, 'Очікує')
+        self.assertEqual(self.other_req.request_status, 'Очікує')
+        self.assertFalse(self.theme.is_occupied)
+
+    def test_unknown_theme_rolls_back(self):
+        response = self.approve('bogus')
+        self.assertEqual(response.status_code, 400)
+        self.other_req.refresh_from_db()
+        self.assertEqual(self.other_req.request_status, 'Очікує')
+
+
+class RequestOriginalStateTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.req = self.create_pending_request(self.student_user)
+
+    def test_loaded_request_tracks_changes(self):
+        req = Request.objects.get(pk=self.req.pk)
+        self.assertEqual(req.get_changed_fields(), {})
+        req.request_status = 'Відхилено'
+        self.assertEqual(req.get_changed_fields(), {'request_status': ('Очікує', 'Відхилено')})
+
+    def test_snapshot_is_refreshed_after_save(self):
+        req = Request.objects.get(pk=self.req.pk)
+        req.request_status = 'Активний'
+        req.save()
+        self.assertFalse(req.has_changed('request_status'))
+
+    def test_status_change_does_not_reselect_request(self):
+        req = Request.objects.select_related(
+            'student_id', 'teacher_id__teacher_id', 'teacher_id__department', 'slot'
+        ).get(pk=self.req.pk)
+        req.request_status = 'Активний'
+        with CaptureQueriesContext(connection) as ctx:
+            req.save()
+        # Один UPDATE рядка з умовою на старий статус (захист переходу), без SELECT
+        request_queries = [q['sql'] for q in ctx.captured_queries if '"catalog_request"' in q['sql']]
+        self.assertEqual([sql.split()[0] for sql in request_queries], ['UPDATE'])
+        self.assertIn('"request_status" = ', request_queries[0].split('WHERE')[1])
+
+    def test_concurrent_transitions_release_slot_once(self):
+        # Друге місце слоту зайняте іншим студентом: подвійне звільнення було б помітне
+        for req in (self.req, self.create_pending_request(self.create_students(1)[0])):
+            req = Request.objects.get(pk=req.pk)
+            req.request_status = 'Активний'
+            req.save()
+        first, second = Request.objects.get(pk=self.req.pk), Request.objects.get(pk=self.req.pk)
+
+        first.request_status = 'Завершено'
+        first.save()
+        second.request_status = 'Відхилено'
+        with self.assertRaises(ValidationError):
+            second.save()
+
+        self.assertEqual(Request.objects.get(pk=self.req.pk).request_status, 'Завершено')
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 1)
+
+
+class SemestrPolicyCacheTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        semestr_policy.invalidate()
+        self.create_catalog()
+        self.academic_year = '2030/31'
+        self.semestr = Semestr.objects.create(
+            department=self.department, academic_year=self.academic_year, semestr=1,
+            lock_student_requests_date=timezone.localdate() - timedelta(days=1),
+        )
+
+    def tearDown(self):
+        semestr_policy.invalidate()
+
+    def test_policy_is_read_once(self):
+        with self.assertNumQueries(1):
+            policy = semestr_policy.get_policy(self.department.pk, self.academic_year, 1)
+            semestr_policy.get_policy(self.department.pk, self.academic_year, 1)
+        self.assertFalse(policy.can_student_create_request)
+        self.assertFalse(policy.can_complete_requests)
+
+    def test_missing_semestr_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(semestr_policy.get_policy(self.department.pk, '2031/32', 1))
+            self.assertIsNone(semestr_policy.get_policy(self.department.pk, '2031/32', 1))
+
+    def test_save_and_delete_invalidate(self):
+        semestr_policy.get_policy(self.department.pk, self.academic_year, 1)
+        self.semestr.lock_student_requests_date = None
+        self.semestr.save()
+        self.assertTrue(
+            semestr_policy.get_policy(self.department.pk, self.academic_year, 1).can_student_create_request
+        )
+
+        self.semestr.delete()
+        self.assertIsNone(semestr_policy.get_policy(self.department.pk, self.academic_year, 1))
+
+    def test_invalidation_in_another_process_is_seen(self):
+        semestr_policy.get_policy(self.department.pk, self.academic_year, 1)
+        Semestr.objects.filter(pk=self.semestr.pk).update(lock_student_requests_date=None)
+        # Інший процес записав нову версію; локальний словник цього процесу не чіпали
+        cache_versions.bump(semestr_policy.VERSION_KEY)
+        self.assertTrue(
+            semestr_policy.get_policy(self.department.pk, self.academic_year, 1).can_student_create_request
+        )
+
+    def test_policy_is_frozen_and_recomputed_for_another_day(self):
+        policy = semestr_policy.get_policy(self.department.pk, self.academic_year, 1)
+        with self.assertRaises(AttributeError):
+            policy.can_student_create_request = True
+        earlier = policy.for_day(timezone.localdate() - timedelta(days=2))
+        self.assertTrue(earlier.can_student_create_request)
+
+
+class BulkTransitionTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+
+    def transition(self, actions):
+        with self.captureOnCommitCallbacks(execute=True):
+            return request_transitions.bulk_transition(self.teacher, actions)
+
+    def test_approve_and_reject_in_one_batch(self):
+        students = self.create_students(3)
+        reqs = [self.create_pending_request(s) for s in students]
+        result = self.transition([
+            {'id': reqs[0].pk, 'action': 'approve'},
+            {'id': reqs[1].pk, 'action': 'reject', 'reason': 'Немає часу'},
+            {'id': 999999, 'action': 'approve'},
+        ])
+
+        self.assertEqual(result['approved'], [reqs[0].pk])
+        self.assertEqual(result['rejected'], [reqs[1].pk])
+        self.assertIn('999999', result['errors'])
+        self.assertEqual(Request.objects.get(pk=reqs[1].pk).rejected_reason, 'Немає часу')
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 1)
+        self.assertEqual(Message.objects.filter(related_request__in=reqs[:2]).count(), 2)
+
+    def test_approvals_respect_quota(self):
+        reqs = [self.create_pending_request(s) for s in self.create_students(3)]
+        result = self.transition([{'id': req.pk, 'action': 'approve'} for req in reqs])
+
+        self.assertEqual(len(result['approved']), 2)
+        self.assertEqual(len(result['errors']), 1)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 2)
+        self.assertEqual(Request.objects.filter(request_status='Активний').count(), 2)
+
+    def test_approval_cancels_other_pending_and_releases_themes(self):
+        theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Тема', is_occupied=True)
+        chosen = self.create_pending_request(self.student_user)
+        other = self.create_pending_request(self.student_user)
+        Request.objects.filter(pk=other.pk).update(teacher_theme=theme)
+
+        result = self.transition([{'id': chosen.pk, 'action': 'approve'}])
+
+        self.assertEqual(result['cancelled'], [other.pk])
+        self.assertEqual(Request.objects.get(pk=other.pk).request_status, 'Відхилено')
+        theme.refresh_from_db()
+        self.assertFalse(theme.is_occupied)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(count, offset):
+            students = [
+                User.objects.create_user(
+                    email=f'bulk{offset + i}@test.com', first_name='Б', last_name='Студент',
+                    role='Студент', academic_group='ФЕС-21'
+                )
+                for i in range(count)
+            ]
+            reqs = [self.create_pending_request(s) for s in students]
+            with CaptureQueriesContext(connection) as ctx:
+                self.transition([{'id': req.pk, 'action': 'reject'} for req in reqs])
+            return len(ctx.captured_queries)
+
+        self.assertEqual(run(2, 0), run(8, 100))
+
+
+class ProfileRequestsMixin(CatalogFixtureMixin):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.slot.quota = 50
+        self.slot.save()
+        self.offset = 0
+
+    def add_requests(self, count, status='Активний'):
+        students = [
+            User.objects.create_user(
+                email=f'dash{self.offset + i}@test.com', first_name='Д', last_name='Студент',
+                role='Студент', academic_group='ФЕС-21'
+            )
+            for i in range(count)
+        ]
+        self.offset += count
+        reqs = [
+            Request.objects.create(
+                student_id=student, teacher_id=self.teacher, slot=self.slot,
+                request_status=status, motivation_text='Мотивація',
+                completion_date=timezone.now() if status == 'Завершено' else None,
+            )
+            for student in students
+        ]
+        files = RequestFile.objects.bulk_create([
+            RequestFile(request=req, file=f'request_files/{req.pk}.pdf', uploaded_by=req.student_id)
+            for req in reqs
+        ])
+        parents = FileComment.objects.bulk_create([
+            FileComment(file=f, author=self.teacher_user, text='Зауваження') for f in files
+        ])
+        FileComment.objects.bulk_create([
+            FileComment(file=c.file, author=c.file.uploaded_by, text='Відповідь', parent=c) for c in parents
+        ])
+        return reqs
+
+
+class ProfileDashboardTestCase(ProfileRequestsMixin, TestCase):
+    def render_tabs(self):
+        with CaptureQueriesContext(connection) as ctx:
+            for tab in ('active', 'requests', 'archive'):
+                # Вимірюється завантаження вкладки, а не кеш
+                profile_tabs.invalidate_users([self.teacher_user.pk])
+                response = self.client.get(
+                    reverse('load_profile_tab', args=[tab]), HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+                )
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_partitions_requests_by_status(self):
+        active = self.add_requests(2)
+        pending = self.add_requests(1, status='Очікує')
+        completed = self.add_requests(2, status='Завершено')
+        archived_file = completed[0].files.get()
+        archived_file.is_archived = True
+        archived_file.save()
+
+        dashboard = profile_dashboard.load_dashboard(self.teacher_user)
+
+        self.assertEqual(dashboard.active, active)
+        self.assertEqual(dashboard.pending, pending)
+        self.assertEqual(dashboard.accepted, active + completed)
+        self.assertEqual(dashboard.archived_with_files, completed[:1])
+        self.assertEqual(set(dashboard.active_request_files), {str(req.pk) for req in active})
+        self.assertEqual(
+            profile_dashboard.load_dashboard(active[0].student_id).requests, [active[0]]
+        )
+
+    def test_dashboard_query_count_is_constant(self):
+        self.add_requests(1)
+        with self.assertNumQueries(4):
+            dashboard = profile_dashboard.load_dashboard(self.teacher_user)
+        with self.assertNumQueries(0):
+            for files in dashboard.active_request_files.values():
+                for comment in files[0].comments.all():
+                    str(comment.author)
+                    if comment.parent:
+                        str(comment.parent.author)
+
+        self.add_requests(6)
+        with self.assertNumQueries(4):
+            profile_dashboard.load_dashboard(self.teacher_user)
+
+    def test_profile_tabs_do_not_grow_with_request_count(self):
+        self.client.force_login(self.teacher_user)
+        self.add_requests(1)
+        self.add_requests(1, status='Завершено')
+        # Перший прохід прогріває кеші (сесія, контекст, семестри)
+        self.render_tabs()
+        few = self.render_tabs()
+
+        self.add_requests(5)
+        self.add_requests(5, status='Завершено')
+        self.assertEqual(self.render_tabs(), few)
+
+
+class ProfileTabsTestCase(ProfileRequestsMixin, TestCase):
+    def get_tab(self, tab, url_name='load_profile_tab', **params):
+        return self.client.get(
+            reverse(url_name, args=[tab]), params, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+    def test_keyset_pages_cover_all_requests_newest_first(self):
+        reqs = self.add_requests(5)
+        # Однакова дата в частини запитів: порядок визначає id
+        same_date = timezone.now()
+        Request.objects.filter(pk__in=[r.pk for r in reqs[:3]]).update(request_date=same_date)
+        expected = list(
+            Request.objects.filter(pk__in=[r.pk for r in reqs])
+            .order_by('-request_date', '-pk').values_list('pk', flat=True)
+        )
+
+        seen, cursor = [], None
+        while True:
+            page = profile_tabs.load_tab(self.teacher_user, 'active', cursor, page_size=2)
+            seen += [r.pk for r in page.context['active_requests']]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_requests_tab_is_not_split_into_pages(self):
+        pending = self.add_requests(1, status='Очікує')
+        self.add_requests(3, status='Завершено')
+        page = profile_tabs.load_tab(self.teacher_user, 'requests', page_size=2)
+        # Спільна сторінка з 2 запитів містила б лише новіші завершені
+        self.assertEqual(page.context['pending_requests'], pending)
+        self.assertEqual(len(page.context['accepted_requests']), 3)
+        self.assertIsNone(page.next_cursor)
+
+    def test_tabs_are_paginated_only_on_request(self):
+        self.client.force_login(self.teacher_user)
+        self.add_requests(3)
+
+        data = self.get_tab('active').json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(len(profile_tabs.load_tab(self.teacher_user, 'active').context['active_requests']), 3)
+
+        data = self.get_tab('active', page_size=2).json()
+        self.assertIsNotNone(data['next_cursor'])
+        self.assertEqual(self.get_tab('active', page_size=0).status_code, 400)
+        self.assertEqual(self.get_tab('active', page_size='x').status_code, 400)
+
+    def test_tabs_load_only_what_their_template_needs(self):
+        self.add_requests(1)
+        self.add_requests(1, status='Завершено')
+        # Запити й тематики студента, без файлів і коментарів
+        with self.assertNumQueries(2):
+            profile_tabs.TABS['requests'].loader(self.teacher_user, None, 20)
+        self.add_requests(5, status='Очікує')
+        with self.assertNumQueries(2):
+            profile_tabs.TABS['requests'].loader(self.teacher_user, None, 20)
+        # Запити, тематики, файли, коментарі
+        with self.assertNumQueries(4):
+            profile_tabs.TABS['active'].loader(self.teacher_user, None, 20)
+
+    def test_cached_page_is_invalidated_by_new_comment(self):
+        req = self.add_requests(1)[0]
+        profile_tabs.load_tab(self.teacher_user, 'active')
+        with self.assertNumQueries(0):
+            profile_tabs.load_tab(self.teacher_user, 'active')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FileComment.objects.create(file=req.files.first(), author=self.teacher_user, text='Нове')
+
+        page = profile_tabs.load_tab(self.teacher_user, 'active')
+        files = page.context['active_request_files'][str(req.pk)]
+        self.assertIn('Нове', [c.text for c in files[0].comments.all()])
+
+    def test_bulk_transition_invalidates_student_and_teacher_tabs(self):
+        req = self.add_requests(1, status='Очікує')[0]
+        profile_tabs.load_tab(self.teacher_user, 'requests')
+        profile_tabs.load_tab(req.student_id, 'requests')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request_transitions.bulk_transition(self.teacher, [{'id': req.pk, 'action': 'reject'}])
+
+        teacher_page = profile_tabs.load_tab(self.teacher_user, 'requests')
+        self.assertEqual(teacher_page.context['rejected_requests'], [req])
+        self.assertTrue(profile_tabs.load_tab(req.student_id, 'requests').context['has_rejected'])
+
+    def test_endpoints_return_cursor_and_reject_bad_input(self):
+        self.client.force_login(self.teacher_user)
+        self.add_requests(3)
+
+        data = self.get_tab('active').json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(self.get_tab('requests', 'load_tab_content').status_code, 200)
+        self.assertEqual(self.get_tab('active', cursor='не курсор').status_code, 400)
+        self.assertEqual(self.get_tab('unknown').status_code, 404)
+
+    def test_student_requests_tab_lists_sent_requests(self):
+        req = self.add_requests(1, status='Очікує')[0]
+        self.client.force_login(req.student_id)
+        html = self.get_tab('requests').json()['html']
+        self.assertIn('Мотивація', html)
+
+
+class CommentTreeTestCase(ProfileRequestsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.req = self.add_requests(1)[0]
+        self.file = self.req.files.get()
+        # add_requests створює коментар викладача і відповідь студента
+        self.root, self.reply = self.file.comments.order_by('pk')
+
+    def comment(self, text, parent=None, file=None):
+        return FileComment.objects.create(
+            file=file or self.file, author=self.teacher_user, text=text, parent=parent
+        )
+
+    def test_builds_nested_tree_in_one_query(self):
+        nested = self.comment('Третій рівень', parent=self.reply)
+        second_root = self.comment('Окремий коментар')
+
+        files = list(RequestFile.objects.filter(pk=self.file.pk))
+        with self.assertNumQueries(1):
+            [file] = comment_tree.attach(files)
+        with self.assertNumQueries(0):
+            roots = file.comment_tree
+            self.assertEqual([n.comment for n in roots], [self.root, second_root])
+            self.assertEqual(
+                [(n.comment, n.depth) for n in roots[0].walk()],
+                [(self.root, 0), (self.reply, 1), (nested, 2)],
+            )
+            self.assertEqual(file.comments.count(), 4)
+            self.assertEqual(list(roots[0].comment.children.all()), [self.reply])
+            self.assertEqual(roots[0].replies[0].replies[0].comment.parent.author, self.req.student_id)
+
+    def test_archived_details_query_count_does_not_grow_with_comments(self):
+        self.req.request_status = 'Завершено'
+        self.req.completion_date = timezone.now()
+        self.req.save()
+        RequestFile.objects.filter(pk=self.file.pk).update(is_archived=True)
+        self.client.force_login(self.teacher_user)
+        url = reverse('archived_request_details', args=[self.req.pk])
+
+        def fetch():
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+            return data, len(ctx.captured_queries)
+
+        data, few = fetch()
+        self.assertEqual(data['files'][0]['comments'][1]['parent_id'], self.root.pk)
+        for i in range(5):
+            self.comment(f'Відповідь {i}', parent=self.reply)
+        data, many = fetch()
+        self.assertEqual(len(data['files'][0]['comments']), 7)
+        self.assertEqual(many, few)
+
+    def test_thread_fragment_cache_follows_comment_changes(self):
+        def render():
+            [file] = comment_tree.attach([RequestFile.objects.get(pk=self.file.pk)])
+            return render_to_string(
+                'catalog/partials/comment_thread.html', {'file': file, 'user': self.teacher_user}
+            )
+
+        self.assertIn('Зауваження', render())
+        FileComment.objects.filter(pk=self.root.pk).update(
+            text='Виправлене зауваження', updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.assertIn('Виправлене зауваження', render())
+        self.reply.delete()
+        self.assertNotIn('Відповідь', render())
+
+
+class ArchivedFilesFlagTestCase(ProfileRequestsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.req = self.add_requests(1, status='Завершено')[0]
+        self.file = self.req.files.get()
+
+    def flag(self):
+        return Request.objects.values_list('has_archived_files', flat=True).get(pk=self.req.pk)
+
+    def test_file_signals_maintain_flag(self):
+        self.assertFalse(self.flag())
+        self.file.is_archived = True
+        self.file.save()
+        self.assertTrue(self.flag())
+        self.file.delete()
+        self.assertFalse(self.flag())
+
+    def test_sync_after_bulk_update(self):
+        RequestFile.objects.filter(pk=self.file.pk).update(is_archived=True)
+        self.assertFalse(self.flag())
+        self.assertEqual(Request.sync_archived_files([self.req.pk, None]), 1)
+        self.assertTrue(self.flag())
+
+    def test_archive_tab_uses_flag(self):
+        other = self.add_requests(1, status='Завершено')[0]
+        Request.objects.filter(pk=other.pk).update(has_archived_files=True)
+        page = profile_tabs.load_tab(self.teacher_user, 'archive')
+        self.assertEqual(page.context['archived_requests'], [other])
+
+
+class RequestTransitionViewsTestCase(ProfileRequestsMixin, TestCase):
+    """Перехід, який інший запит уже виконав, повертає 400 з причиною і нічого не змінює."""
+
+    def setUp(self):
+        super().setUp()
+        self.req = self.add_requests(1)[0]
+        self.file = self.req.files.get()
+        self.client.force_login(self.teacher_user)
+
+    def change_status_meanwhile(self, status):
+        return lambda req: Request.objects.filter(pk=req.pk).update(request_status=status)
+
+    def test_complete_after_concurrent_cancel_keeps_files(self):
+        with mock.patch('apps.users.views.assert_can_complete', self.change_status_meanwhile('Скасовано')):
+            response = self.client.post(
+                f'/users/complete_request/{self.req.pk}/',
+                {'grade': '90', 'selected_files': json.dumps([self.file.pk])},
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Статус запиту вже змінено. Оновіть сторінку.')
+        self.file.refresh_from_db()
+        self.assertFalse(self.file.is_archived)
+
+    def test_cancel_after_concurrent_completion_reports_conflict(self):
+        with mock.patch(
+            'apps.catalog.semestr_rules.assert_can_cancel_request', self.change_status_meanwhile('Завершено'),
+        ):
+            response = self.client.post(reverse('cancel_request', args=[self.req.pk]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Статус запиту вже змінено. Оновіть сторінку.')
+        self.assertEqual(Request.objects.get(pk=self.req.pk).request_status, 'Завершено')
+
+
+class StudentRequestEditTestCase(ProfileRequestsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.req = self.add_requests(1, status='Очікує')[0]
+        self.own_theme = StudentTheme.objects.create(
+            request=self.req, student_id=self.req.student_id, theme='Власна тема'
+        )
+        self.client.force_login(self.req.student_id)
+
+    def edit(self, teacher_theme_id):
+        return self.client.post(reverse('edit_student_request', args=[self.req.pk]), {
+            'motivation': 'Нова мотивація', 'new_themes': ['Ще одна тема'], 'teacher_theme_id': teacher_theme_id,
+        })
+
+    def assert_unchanged(self):
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.motivation_text, 'Мотивація')
+        self.assertEqual(
+            list(StudentTheme.objects.filter(request=self.req).values_list('theme', flat=True)), ['Власна тема']
+        )
+
+    def test_missing_teacher_theme_changes_nothing(self):
+        response = self.edit('999999')
+        self.assertEqual(response.status_code, 400)
+        self.assert_unchanged()
+
+    def test_occupied_teacher_theme_changes_nothing(self):
+        theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Зайнята тема', is_occupied=True)
+        response = self.edit(str(theme.pk))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Ця тема вже зайнята іншим студентом.')
+        self.assert_unchanged()
+
+
+class ThemeBenchmarkCommandTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Справжня тема')
+
+    def test_benchmarks_clean_up_only_synthetic_rows(self):
+        for command, args in (
+            ('benchmark_theme_search', ['--themes', '30', '--teachers', '3', '--repeat', '1']),
+            ('benchmark_theme_key', ['--themes', '30', '--lookups', '5']),
+            ('benchmark_autocomplete', ['--themes', '30', '--teachers', '3', '--queries', '5']),
+        ):
+            with self.subTest(command):
+                call_command(command, *args, stdout=StringIO())
+                self.assertEqual(list(TeacherTheme.objects.all()), [self.theme])
+                self.assertFalse(User.objects.filter(email__endswith='@benchmark.invalid').exists())
+
+    def test_live_database_requires_explicit_flag(self):
+        with mock.patch('apps.catalog.management.commands._benchmark.is_test_database', return_value=False):
+            with self.assertRaises(CommandError):
+                call_command('benchmark_theme_key', '--themes', '10', stdout=StringIO())
+            self.assertFalse(User.objects.filter(email__endswith='@benchmark.invalid').exists())
+
+            call_command(
+                'benchmark_theme_key', '--themes', '10', '--lookups', '2', '--allow-live-db', stdout=StringIO()
+            )
+        self.assertEqual(list(TeacherTheme.objects.all()), [self.theme])
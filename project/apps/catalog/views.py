@@ -1,5 +1,4 @@
 import logging
-import re
 import json
 from urllib import request
 
@@ -11,12 +10,13 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Max, Q
+from django.db.models import F, Max, Q
 from django.http import (
     FileResponse,
     HttpResponseBadRequest,
     HttpResponseForbidden,
     HttpResponseNotFound,
+    HttpResponseNotModified,
     HttpResponseServerError,
     JsonResponse,
 )
@@ -25,18 +25,19 @@ from django.template.loader import render_to_string
 from django.templatetags.static import static
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, FormView, ListView, TemplateView
 
 from .forms import FileCommentForm, FilteringSearchingForm, RequestFileForm, RequestForm
+from .services import autocomplete_index, catalog_snapshot, comment_tree, profile_tabs, theme_search
 from .models import (
     FileComment,
     OnlyTeacher,
     Request,
     RequestFile,
     Slot,
-    Stream,
     StudentTheme,
     TeacherTheme,
     Announcement
@@ -117,7 +118,9 @@ class TeachersListView(LoginRequiredMixin, ListView):
         
         For authenticated students, slots are filtered by the student's academic group.
         Each teacher entry includes personal information and availability data.
-        
+        Teacher cards and free slots come from the cached catalog snapshot; the
+        response carries an ETag, and an unchanged catalog returns 304.
+
         Args:
             request (HttpRequest): The HTTP request object.
             *args: Variable length argument list.
@@ -151,123 +154,68 @@ class TeachersListView(LoginRequiredMixin, ListView):
                 ]
         """
         try:
-            teachers = OnlyTeacher.objects.select_related("teacher_id").all()
-            slots = Slot.filter_by_available_slots()
-            data = []
+            user_stream = None
+            department_id = None
             is_matched = False
             has_active = False
             already_requested_set = set()
 
             if request.user.is_authenticated and request.user.role == "Студент":
                 user = request.user
-                has_active = (
-                    True
-                    if Request.objects.filter(
-                        student_id=user, request_status="Активний"
-                    ).exists()
-                    else False
-                )
-                
-                # --- Фільтрація за кафедрою для 3+ курсу ---
-                # Витягуємо курс з academic_group (наприклад, ФЕС-33 -> 3)
-                course = None
-                is_master = "М" in user.academic_group.upper()
-                if user.academic_group:
-                    # Оновлений регулярний вираз для обробки ВПК груп
-                    match = re.match(r"^ФЕ[СМЛПІ]-(\d+)(ВПК)?", user.academic_group)
-                    if match:
-                        course_str = match.group(1)
-                        if len(course_str) > 1:
-                            course = int(course_str[0])
-                        else:
-                            course = int(course_str)
-                
-                # Оновлена, більш точна умова фільтрації
-                user_department = user.get_department()
-                if user_department and ((course and course >= 3) or is_master):
-                    teachers = teachers.filter(department=user_department)
+                has_active = Request.objects.filter(
+                    student_id=user, request_status="Активний"
+                ).exists()
                 
-                teacher_ids = [t.pk for t in teachers]
-                # ---
-
-                teacher_ids = [t.pk for t in teachers]
-                already_requested_qs = Request.objects.filter(
-                    student_id=user, teacher_id__in=teacher_ids, request_status="Очікує"
-                ).values_list("teacher_id", flat=True)
-                already_requested_set = set(already_requested_qs)
-                # Оновлений регулярний вираз для обробки ВПК груп
-                match = re.match(r"([А-ЯІЇЄҐ]+)-(\d+)(ВПК)?", user.academic_group)
-                if match:
-                    faculty = match.group(1)
-                    course = match.group(2)
-                    vpk = match.group(3) if match.group(3) else ''
-                    
-                    # Для ВПК груп також використовуємо тільки першу цифру курсу
-                    if vpk:
-                        # ВПК група: використовуємо тільки першу цифру курсу (напр. ФЕП-24ВПК -> ФЕП-2ВПК)
-                        if len(course) > 1:
-                            course = course[0]
-                        user_stream = faculty + '-' + course + vpk + ('м' if is_master else '')
-                    else:
-                        # Звичайна група: використовуємо тільки першу цифру курсу
-                        if len(course) > 1:
-                            course = course[0]
-                        user_stream = faculty + '-' + course + ('м' if is_master else '')
-
-                    # Фільтруємо по коду потоку та освітньому ступеню, але дозволяємо None значення
-                    slots = slots.filter(stream_id__stream_code__iexact=user_stream)
-
-                    is_matched = True
-
-            for teacher in teachers:
-                free_slots = slots.filter(teacher_id=teacher)
-                already_requested = teacher.pk in already_requested_set
-                if teacher.teacher_id.patronymic:
-                    patronymic = teacher.teacher_id.patronymic
-                    full_name = f"{teacher.teacher_id.last_name} {teacher.teacher_id.first_name} {patronymic}"
-                else:
-                    full_name = f"{teacher.teacher_id.last_name} {teacher.teacher_id.first_name}"
-
-                # Handle profile picture URL safely
-                try:
-                    photo_url = get_profile_picture_url(teacher.teacher_id)
-                except Exception as e:
-                    print(f"Error getting profile picture URL: {str(e)}")
-                    photo_url = static("images/default-avatar.jpg")
+                # Курс, потік і кафедра студента (кешуються, див. services.academic_context)
+                academic = user.get_academic_context()
+                if academic.filters_by_department:
+                    department_id = academic.department_id
+
+                already_requested_set = set(
+                    Request.objects.filter(
+                        student_id=user, request_status="Очікує"
+                    ).values_list("teacher_id", flat=True)
+                )
+                user_stream = academic.stream_code
+                is_matched = academic.is_matched
+
+            snapshot = catalog_snapshot.get_snapshot(user_stream)
+            etag = catalog_snapshot.make_etag(
+                snapshot,
+                user_stream,
+                department_id,
+                has_active,
+                sorted(already_requested_set),
+            )
+            if etag in request.headers.get("If-None-Match", ""):
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
 
+            data = []
+            for card in snapshot.cards:
+                if department_id and card["department_id"] != department_id:
+                    continue
                 data.append(
                     {
                         "has_active": has_active,
                         "teacher": {
-                            "id": teacher.pk,
-                            "academic_level": teacher.academic_level,
-                            "photo": photo_url,
-                            "url": teacher.get_absolute_url(),
-                            "already_requested": already_requested,
-                            "teacher_id": {
-                                "id": teacher.teacher_id.id,
-                                "first_name": teacher.teacher_id.first_name,
-                                "last_name": teacher.teacher_id.last_name,
-                                "department": teacher.teacher_id.get_department_name(),
-                                "department_short_name":
-                                    teacher.teacher_id.get_department_short_name(),
-                                "full_name": full_name,
-                            },
+                            "id": card["id"],
+                            "academic_level": card["academic_level"],
+                            "photo": card["photo"],
+                            "url": card["url"],
+                            "already_requested": card["id"] in already_requested_set,
+                            "teacher_id": card["teacher_id"],
                         },
-                        "free_slots": [
-                            {
-                                "stream_id": {
-                                    "stream_code": slot.stream_id.stream_code
-                                },
-                                "get_available_slots": slot.quota - slot.occupied,
-                        }
-                        for slot in free_slots
-                    ],
+                        "free_slots": snapshot.free_slots.get(card["id"], []),
                         "is_matched": is_matched,
                     }
                 )
 
-            return JsonResponse(data, safe=False)
+            response = JsonResponse(data, safe=False)
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
         except Exception as e:
             import traceback
 
@@ -328,37 +276,13 @@ class TeacherModalView(
         
         # Fetch available slots for this teacher.
         slots = Slot.filter_by_available_slots().filter(teacher_id=teacher)
-        print(f"All available slots for teacher {teacher}: {slots.count()}")
         is_matched = False
         
         # Filter slots by user's academic group if the user is a student.
-        user = self.request.user
-        # Безпечна обробка відсутнього academic_group
-        user_academic_group = getattr(user, "academic_group", "") or ""
-        is_master = "М" in user_academic_group.upper()
-        # Оновлений регулярний вираз для обробки ВПК груп
-        match = re.match(r"([А-ЯІЇЄҐ]+)-(\d+)(ВПК)?", user_academic_group)
-        if match:
-            faculty = match.group(1)
-            course = match.group(2)
-            vpk = match.group(3) if match.group(3) else ''
-            
-            # Для ВПК груп також використовуємо тільки першу цифру курсу
-            if vpk:
-                # ВПК група: використовуємо тільки першу цифру курсу (напр. ФЕП-24ВПК -> ФЕП-2ВПК)
-                if len(course) > 1:
-                    course = course[0]
-                user_stream = faculty + '-' + course + vpk + ('м' if is_master else '')
-            else:
-                # Звичайна група: використовуємо тільки першу цифру курсу
-                if len(course) > 1:
-                    course = course[0]
-                user_stream = faculty + '-' + course + ('м' if is_master else '')
-            print(f"User stream: {user_stream}")
-            # Фільтруємо по коду потоку та освітньому ступеню, але дозволяємо None значення
-            
-            slots = slots.filter(stream_id__stream_code__iexact=user_stream)
-            print(f"Available slots for stream {user_stream}: {slots.count()}")
+        academic = self.request.user.get_academic_context()
+        if academic.is_matched:
+            # Потоку з таким кодом немає — вільних місць для студента теж немає
+            slots = slots.filter(stream_id=academic.stream_id) if academic.stream_id else slots.none()
             is_matched = True
         
         context["free_slots"] = slots
@@ -389,25 +313,22 @@ class TeacherModalView(
             req = form.save(commit=False)
             self.assign_request_fields(form)
             
-            # Get and validate the teacher theme if selected
-            teacher_theme_text = form.cleaned_data.get("teacher_themes")
-            if teacher_theme_text:
-                try:
-                    teacher_theme = TeacherTheme.objects.get(
-                        theme=teacher_theme_text, teacher_id=self.get_object()
-                    )
-                    if not teacher_theme.is_occupied and not teacher_theme.is_deleted:
+            # Claim the teacher theme and save the request together,
+            # so a failed save does not leave the theme occupied
+            with transaction.atomic():
+                teacher_theme_text = form.cleaned_data.get("teacher_themes")
+                if teacher_theme_text:
+                    teacher_theme = TeacherTheme.find_by_title(self.get_object(), teacher_theme_text)
+                    if teacher_theme is None:
+                        raise ValidationError("Обрана тема не існує")
+                    if teacher_theme.claim():
                         req.teacher_theme = teacher_theme
-                        teacher_theme.is_occupied = True
-                        teacher_theme.save()
                         print(f"Teacher theme assigned: {teacher_theme.theme}")
                     else:
                         raise ValidationError("Обрана тема вже зайнята")
-                except TeacherTheme.DoesNotExist:
-                    raise ValidationError("Обрана тема не існує")
-            
-            # Save the request after theme assignment
-            req.save()
+
+                # Save the request after theme assignment
+                req.save()
             print(f"Request created with ID: {req.id}")
 
             # Save student themes
@@ -456,11 +377,9 @@ class TeacherModalView(
         form.instance.teacher_id = self.get_object()
         form.instance.request_status = "Очікує"
         
-        user_academic_group = getattr(self.request.user, "academic_group", "") or ""
-        is_master = "М" in user_academic_group.upper()
-        student_stream_code = form.instance.extract_stream_from_academic_group() + (
-            "м" if is_master else ""
-        )
+        academic = self.request.user.get_academic_context()
+        is_master = academic.is_master
+        student_stream_code = academic.stream_code
         curse = student_stream_code.split("-")[1] if student_stream_code else None
 
         if curse and curse == "4":
@@ -471,36 +390,29 @@ class TeacherModalView(
             form.instance.work_type = "Курсова"
         
         if student_stream_code:
-            try:
-                # Get a single Stream object instead of a QuerySet
-                stream = Stream.objects.get(stream_code=student_stream_code)
-                    
-                # Get all slots for this teacher and stream
-                available_slots = Slot.objects.filter(
-                    teacher_id=form.instance.teacher_id, stream_id=stream
-                )
-                
-                # Find first slot that has space
-                available_slot = None
-                for slot in available_slots:
-                    if slot.occupied < slot.quota:
-                        available_slot = slot
-                        break
-                
-                if available_slot:
-                    form.instance.slot = available_slot
-                else:
-                    raise ValidationError(
-                        f"На жаль, вільних місць для {stream.stream_code} нема :("
-                    )
-            except Stream.DoesNotExist:
+            if not academic.stream_id:
                 raise ValidationError(f"Потік не знайдено: {student_stream_code}")
 
+            # First slot of this teacher and stream that still has space
+            available_slot = Slot.objects.filter(
+                teacher_id=form.instance.teacher_id,
+                stream_id=academic.stream_id,
+                occupied__lt=F("quota"),
+            ).order_by("pk").first()
+
+            if available_slot:
+                form.instance.slot = available_slot
+            else:
+                raise ValidationError(
+                    f"На жаль, вільних місць для {student_stream_code} нема :("
+                )
+
 
 # AcceptRequestView видалено - використовується approve_request_with_theme з users/views.py
 
 
 class CompleteRequestView(View):
+    @method_decorator(transaction.atomic)
     def post(self, request, pk):
         req = get_object_or_404(Request, pk=pk)
         if (
@@ -540,7 +452,12 @@ class CompleteRequestView(View):
                 req.request_status = "Завершено"
                 req.completion_date = timezone.now()
                 req.grade = request.POST.get("grade")
-                req.save()
+                req.has_archived_files = updated_files > 0
+                try:
+                    req.save()
+                except ValidationError as e:
+                    transaction.set_rollback(True)
+                    return JsonResponse({"success": False, "error": " ".join(e.messages)}, status=400)
             else:
                 logger.error("[COMPLETE DEBUG] No files selected")
                 return JsonResponse({
@@ -548,10 +465,8 @@ class CompleteRequestView(View):
                     "error": "Необхідно обрати хоча б один файл для збереження в архіві"
                 })
 
-            # Theme will be freed automatically in the model when status changes to 'Завершено'
+            # Theme and slot are freed automatically in the model when status changes to 'Завершено'
 
-            if req.slot:
-                req.slot.get_available_slots()
             messages.success(request, "Роботу завершено")
             return JsonResponse({"success": True})
         return JsonResponse({"success": False}, status=403)
@@ -587,49 +502,36 @@ def request_files_for_completion(request, request_id):
 
 @login_required
 def archived_request_details(request, request_id):
-    logger = logging.getLogger("django")
-    logger.error(
-        f'[ARCHIVE DEBUG] request.user.id={request.user.id}, request.user.role={getattr(request.user, "role", None)}'
-    )
     try:
         req = (
             Request.objects.select_related(
                 "student_id", "teacher_id__teacher_id", "teacher_theme"
             )
-            .prefetch_related("files__comments__author")
             .get(id=request_id, request_status="Завершено")
         )
-        logger.error(
-            f'[ARCHIVE DEBUG] req.student_id.id={getattr(req.student_id, "id", None)}, req.teacher_id.teacher_id.id={getattr(req.teacher_id.teacher_id, "id", None)}'
-        )
         # Check access permissions
         if request.user.role == "Студент" and req.student_id != request.user:
-            logger.error(
-                f"[ARCHIVE DEBUG] 403: student_id mismatch (req.student_id={req.student_id.id}, user={request.user.id})"
-            )
+            logger.debug(f"Archived request {req.id}: student {request.user.id} is not the owner")
             return JsonResponse({"error": "Forbidden"}, status=403)
         if (
             request.user.role == "Викладач"
             and req.teacher_id.teacher_id != request.user
         ):
-            logger.error(
-                f"[ARCHIVE DEBUG] 403: teacher_id mismatch (req.teacher_id.teacher_id={req.teacher_id.teacher_id.id}, user={request.user.id})"
-            )
+            logger.debug(f"Archived request {req.id}: teacher {request.user.id} is not the supervisor")
             return JsonResponse({"error": "Forbidden"}, status=403)
         files_data = []
-        all_files = req.files.all()
-        archived_files = req.files.filter(is_archived=True)
-        logger.error(f"[ARCHIVE DEBUG] Request ID: {req.id}")
-        logger.error(f"[ARCHIVE DEBUG] Total files: {all_files.count()}, Archived files: {archived_files.count()}")
-        logger.error(f"[ARCHIVE DEBUG] All files: {[f.id for f in all_files]}")
-        logger.error(f"[ARCHIVE DEBUG] Archived files: {[f.id for f in archived_files]}")
-        
+        # Коментарі всіх архівних файлів — одним запитом (comment_tree)
+        archived_files = comment_tree.attach(
+            req.files.filter(is_archived=True).select_related("uploaded_by")
+        )
+
         for file in archived_files:
-            logger.error(f"[ARCHIVE DEBUG] Processing archived file: ID {file.id}, name {file.get_filename()}")
             comments_data = []
             for comment in file.comments.all():
                 comments_data.append(
                     {
+                        "id": comment.id,
+                        "parent_id": comment.parent_id,
                         "author": comment.author.get_full_name(),
                         "text": comment.text,
                         "created_at": comment.created_at.strftime("%d.%m.%Y %H:%M"),
@@ -647,9 +549,7 @@ def archived_request_details(request, request_id):
                     "comments": comments_data,
                 }
             )
-        
-        logger.error(f"[ARCHIVE DEBUG] Final files_data length: {len(files_data)}")
-        
+
         response_data = {
             "student": {
                 "name": req.student_id.get_full_name(),
@@ -669,106 +569,29 @@ def archived_request_details(request, request_id):
         return JsonResponse(response_data)
 
     except Request.DoesNotExist:
-        logger.error(f"[ARCHIVE DEBUG] 404: Request.DoesNotExist for id={request_id}")
         return JsonResponse({"error": "Request not found"}, status=404)
     except Exception as e:
-        logger.error(f"[ARCHIVE DEBUG] 500: {str(e)}")
+        logger.error(f"Error loading archived request {request_id}: {str(e)}")
         return JsonResponse({"error": "An unexpected error occurred"}, status=500)
 
 
-def get_requests_data(request):
-    if request.user.role == "Викладач":
-        pending_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(teacher_id__teacher_id=request.user, request_status="Очікує")
-        )
-        active_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(teacher_id__teacher_id=request.user, request_status="Активний")
-        )
-        archived_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(
-            teacher_id__teacher_id=request.user,
-                request_status="Завершено",
-                files__is_archived=True
-            ).distinct()
-        )
-    else:  # Student
-        pending_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(student_id=request.user, request_status="Очікує")
-        )
-        active_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(student_id=request.user, request_status="Активний")
-        )
-        archived_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(
-            student_id=request.user,
-                request_status="Завершено",
-                files__is_archived=True
-            ).distinct()
-        )
-    
-    print(f"Found pending requests: {pending_requests.count()}")
-    print(f"Found active requests: {active_requests.count()}")
-    print(f"Found archived requests: {archived_requests.count()}")
-    
-    # Get files for active requests
-    active_request_files = {}
-    for request_obj in active_requests:
-        files = RequestFile.objects.filter(request=request_obj).select_related(
-            "uploaded_by"
-        )
-        active_request_files[str(request_obj.id)] = list(
-            files
-        )  # Convert QuerySet to list and use string key
-    
-    return {
-        "pending_requests": pending_requests,
-        "active_requests": active_requests,
-        "archived_requests": archived_requests,
-        "active_request_files": active_request_files,
-    }
-
-
 def load_tab_content(request, tab_name):
+    if tab_name not in profile_tabs.TABS:
+        return JsonResponse({"error": "Unknown tab"}, status=404)
     try:
-        data = get_requests_data(request)
-        
-        data.update(
-            {
-                "user": request.user,
-                "request": request,
-            }
+        page = profile_tabs.load_tab(
+            request.user, tab_name, request.GET.get("cursor"),
+            profile_tabs.parse_page_size(request.GET.get("page_size")),
         )
-
-        template_name = f"profile/{tab_name}.html"
-        html = render_to_string(template_name, data, request=request)
-        return JsonResponse({"html": html})
+    except profile_tabs.InvalidPage as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+    context = {"user": request.user, "user_profile": request.user, **page.context}
+    html = render_to_string(page.template, context, request=request)
+    return JsonResponse({"html": html, "next_cursor": page.next_cursor})
+
 
 def reject_request(request, request_id):
     if request.method == "POST":
@@ -1184,38 +1007,8 @@ class AutocompleteView(LoginRequiredMixin, View):
             return JsonResponse(results, safe=False)
         
         try:
-            # Пошук викладачів (тільки по іменах, без кафедр)
-            teachers = OnlyTeacher.objects.select_related("teacher_id").filter(
-                Q(teacher_id__first_name__icontains=query) |
-                Q(teacher_id__last_name__icontains=query) |
-                Q(teacher_id__patronymic__icontains=query)
-            )[:5]
-            
-            for teacher in teachers:
-                results.append({
-                    "type": "teacher",
-                    "id": teacher.pk,
-                    "label": f"👨‍🏫 {teacher.teacher_id.first_name} {teacher.teacher_id.last_name}",
-                    "description": f"{teacher.academic_level} • {teacher.teacher_id.get_department_name()}",
-                    "url": "#"  # Не потрібен URL, фільтрування буде на тій же сторінці
-                })
-            
-            # Пошук тем
-            themes = TeacherTheme.objects.select_related("teacher_id__teacher_id").filter(
-                Q(theme__icontains=query) | Q(theme_description__icontains=query),
-                is_active=True,
-                is_deleted=False
-            )[:5]
-            
-            for theme in themes:
-                results.append({
-                    "type": "theme", 
-                    "id": theme.pk,
-                    "label": f"📚 {theme.theme}",
-                    "description": f"Викладач: {theme.teacher_id.teacher_id.first_name} {theme.teacher_id.teacher_id.last_name}",
-                    "url": "#"  # Не потрібен URL, фільтрування буде на тій же сторінці
-                })
-                
+            # Викладачі за ПІБ і активні теми за назвою — з індексу в пам'яті, без запитів до БД
+            results = autocomplete_index.search(query)
         except Exception as e:
             logger.error(f"Error in autocomplete search: {str(e)}")
             return JsonResponse({"error": "Помилка пошуку"}, status=500)
@@ -1250,45 +1043,14 @@ class ThemesAPIView(LoginRequiredMixin, View):
                 teachers = OnlyTeacher.objects.select_related('teacher_id').all()
                 
                 # Фільтр кафедри для 3+ курсу або магістрів (аналогічно TeachersListView)
-                course = None
-                is_master = 'М' in user.academic_group.upper() if getattr(user, 'academic_group', '') else False
-                if getattr(user, 'academic_group', None):
-                    # Оновлений регулярний вираз для обробки ВПК груп
-                    match = re.match(r"^ФЕ[СМЛПІ]-(\d+)(ВПК)?", user.academic_group)
-                    if match:
-                        course_str = match.group(1)
-                        # Для ВПК груп: ФЕП-24ВПК -> курс 2, ФЕП-14ВПК -> курс 1
-                        if len(course_str) > 1:
-                            course = int(course_str[0])
-                        else:
-                            course = int(course_str)
-                user_department = user.get_department()
-                if user_department and ((course and course >= 3) or is_master):
-                    teachers = teachers.filter(department=user_department)
+                academic = user.get_academic_context()
+                if academic.filters_by_department:
+                    teachers = teachers.filter(department_id=academic.department_id)
                 
-                # Витягуємо потік студента
+                # Вільні слоти у потоці студента
                 slots = Slot.filter_by_available_slots()
-                is_matched = False
-                # Оновлений регулярний вираз для обробки ВПК груп
-                match = re.match(r"([А-ЯІЇЄҐ]+)-(\d+)(ВПК)?", getattr(user, 'academic_group', '') )
-                if match:
-                    faculty = match.group(1)
-                    course = match.group(2)
-                    vpk = match.group(3) if match.group(3) else ''
-                    
-                    # Для ВПК груп також використовуємо тільки першу цифру курсу
-                    if vpk:
-                        # ВПК група: використовуємо тільки першу цифру курсу (напр. ФЕП-24ВПК -> ФЕП-2ВПК)
-                        if len(course) > 1:
-                            course = course[0]
-                        user_stream = faculty + '-' + course + vpk + ('м' if is_master else '')
-                    else:
-                        # Звичайна група: використовуємо тільки першу цифру курсу
-                        if len(course) > 1:
-                            course = course[0]
-                        user_stream = faculty + '-' + course + ('м' if is_master else '')
-                    slots = slots.filter(stream_id__stream_code__iexact=user_stream)
-                    is_matched = True
+                if academic.is_matched:
+                    slots = slots.filter(stream_id=academic.stream_id) if academic.stream_id else slots.none()
                 
                 # Залишаємо лише викладачів з вільними слотами у відповідному потоці
                 teacher_ids_with_slots = slots.values_list('teacher_id', flat=True).distinct()
@@ -1296,22 +1058,14 @@ class ThemesAPIView(LoginRequiredMixin, View):
                 themes_qs = themes_qs.filter(teacher_id__in=allowed_teacher_ids)
                 
                 # Додаткова фільтрація тем по потоку студента
-                if is_matched:
-                    # Отримуємо потік студента
-                    user_stream_obj = Stream.objects.get(stream_code__iexact=user_stream)
-                    # Фільтруємо теми, які прив'язані до потоку студента
-                    themes_qs = themes_qs.filter(streams=user_stream_obj)
+                if academic.is_matched:
+                    themes_qs = themes_qs.filter(streams=academic.stream_id) if academic.stream_id else themes_qs.none()
             
-            # Пошуковий запит
+            # Пошуковий запит: назва, опис і ПІБ викладача з пошукового документа теми
             if query:
-                themes_qs = themes_qs.filter(
-                    Q(theme__icontains=query) |
-                    Q(theme_description__icontains=query) |
-                    Q(teacher_id__teacher_id__first_name__icontains=query) |
-                    Q(teacher_id__teacher_id__last_name__icontains=query)
-                )
-            
-            themes_qs = themes_qs.order_by('theme')
+                themes_qs = theme_search.search(themes_qs, query)
+            else:
+                themes_qs = themes_qs.order_by('theme')
             
             themes_data = []
             for theme in themes_qs:
@@ -1364,16 +1118,16 @@ class ThemeTeachersView(LoginRequiredMixin, View):
                 is_deleted=False
             )
             
-            # Знаходимо всіх викладачів з такою ж темою
-            similar_themes = TeacherTheme.objects.select_related('teacher_id').filter(
-                theme__iexact=theme.theme,
-                is_active=True,
-                is_deleted=False
+            # Знаходимо всіх викладачів з такою ж темою (за індексованим ключем назви)
+            teacher_ids = list(
+                TeacherTheme.objects.filter(
+                    theme_key=theme.theme_key,
+                    is_active=True,
+                    is_deleted=False,
+                    teacher_id__isnull=False,
+                ).order_by().values_list('teacher_id', flat=True)
             )
             
-            # Повертаємо список ID викладачів
-            teacher_ids = [t.teacher_id.pk for t in similar_themes]
-            
             return JsonResponse(teacher_ids, safe=False)
             
         except Exception as e:
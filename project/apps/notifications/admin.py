@@ -1,3 +1,20 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    @admin.action(description='Повторити надсилання зараз')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutgoingEmail.STATUS_SENT).update(
+            status=OutgoingEmail.STATUS_PENDING, next_attempt_at=timezone.now(), attempts=0
+        )
+        self.message_user(request, f'Повторно поставлено в чергу: {updated}')
@@ -0,0 +1,259 @@
+"""
+Channel layer на основі наявної бази даних (MySQL) для кількох ASGI-воркерів.
+
+InMemoryChannelLayer доставляє group_send лише клієнтам свого процесу.
+Цей layer зберігає членство в групах і повідомлення для чужих процесів
+у таблицях ChannelLayerGroup/ChannelLayerMessage:
+
+* повідомлення каналу свого процесу доставляються одразу через asyncio.Queue,
+  без звернення до БД;
+* повідомлення для каналу іншого процесу записуються в ChannelLayerMessage;
+  кожен процес одним запитом за префіксом забирає всі повідомлення своїх
+  каналів кожні poll_interval секунд;
+* group_send_many() розсилає пакет повідомлень по багатьох групах одним
+  SELECT членства та одним INSERT;
+* членство в групі має строк group_expiry і продовжується повторним group_add;
+* прострочені повідомлення та членства періодично видаляються.
+
+Налаштування:
+    CHANNEL_LAYERS = {"default": {
+        "BACKEND": "apps.notifications.channel_layer.DatabaseChannelLayer",
+        "CONFIG": {"poll_interval": 0.05, "expiry": 60, "group_expiry": 86400},
+    }}
+"""
+import asyncio
+import json
+import logging
+import random
+import string
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.db import InterfaceError, OperationalError, connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _db(thread_sensitive=True):
+    """
+    sync_to_async для ORM-викликів layer-а.
+
+    На відміну від channels.db.database_sync_to_async не закриває з'єднання
+    після кожного виклику: інакше опитування кожні poll_interval щоразу
+    перепідключалося б, а group_send із синхронного view рвав би його з'єднання.
+    Зламане з'єднання закривається після помилки. send/group_* виконуються
+    в потоці викликача, щоб бачити його транзакцію; фонове опитування —
+    в окремому пулі потоків.
+    """
+    def decorator(func):
+        def inner(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except (OperationalError, InterfaceError):
+                if not connection.in_atomic_block:
+                    connection.close()
+                raise
+        return sync_to_async(inner, thread_sensitive=thread_sensitive)
+    return decorator
+
+
+class DatabaseChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush", "group_send_many"]
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 poll_interval=0.05, cleanup_every=200, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.cleanup_every = cleanup_every
+        # Префікс, за яким процес впізнає свої канали ("specific.<client_prefix>!<id>")
+        self.client_prefix = uuid.uuid4().hex
+        self.channels = {}
+        self._poller = None
+
+    # --- Допоміжне ---
+
+    def _is_local(self, channel):
+        return channel in self.channels
+
+    def _deliver_local(self, channel, message):
+        queue = self.channels[channel]
+        if queue.qsize() >= self.get_capacity(channel):
+            raise ChannelFull(channel)
+        queue.put_nowait(message)
+
+    def _ensure_poller(self):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def _poll(self):
+        """Забирає з БД повідомлення для всіх каналів цього процесу одним запитом за префіксом."""
+        polls = 0
+        while self.channels:
+            try:
+                rows = await self._fetch_own_messages()
+                for channel, message in rows:
+                    if self._is_local(channel):
+                        try:
+                            self._deliver_local(channel, message)
+                        except ChannelFull:
+                            logger.warning(f"Channel {channel} is full, dropping message")
+                polls += 1
+                if polls % self.cleanup_every == 0:
+                    await self._cleanup()
+            except Exception as e:
+                logger.error(f"Channel layer poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    @_db(thread_sensitive=False)
+    def _fetch_own_messages(self):
+        from django.db import transaction
+        from django.db.models import Q
+        from .models import ChannelLayerMessage
+
+        # Канали цього процесу впізнаються за префіксом; іменовані канали (без "!") — за списком
+        own = Q(channel__startswith=f"specific.{self.client_prefix}!")
+        named = [channel for channel in list(self.channels) if "!" not in channel]
+        if named:
+            own |= Q(channel__in=named)
+        with transaction.atomic():
+            rows = list(
+                ChannelLayerMessage.objects.filter(own, expires_at__gt=timezone.now())
+                .order_by('id').values_list('id', 'channel', 'body')
+            )
+            if rows:
+                ChannelLayerMessage.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        return [(channel, json.loads(body)) for _, channel, body in rows]
+
+    @_db()
+    def _store_messages(self, channel_messages):
+        from .models import ChannelLayerMessage
+
+        expires_at = timezone.now() + timedelta(seconds=self.expiry)
+        ChannelLayerMessage.objects.bulk_create([
+            ChannelLayerMessage(channel=channel, body=json.dumps(message), expires_at=expires_at)
+            for channel, message in channel_messages
+        ])
+
+    @_db(thread_sensitive=False)
+    def _cleanup(self):
+        from .models import ChannelLayerGroup, ChannelLayerMessage
+
+        now = timezone.now()
+        ChannelLayerMessage.objects.filter(expires_at__lte=now).delete()
+        ChannelLayerGroup.objects.filter(expires_at__lte=now).delete()
+
+    # --- Channel layer API ---
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        assert "__asgi_channel__" not in message
+
+        if self._is_local(channel):
+            self._deliver_local(channel, message)
+        else:
+            await self._store_messages([(channel, message)])
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if channel not in self.channels:
+            self.channels[channel] = asyncio.Queue()
+        self._ensure_poller()
+        queue = self.channels[channel]
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            # Споживач від'єднався — прибираємо його порожню чергу
+            if queue.empty():
+                self.channels.pop(channel, None)
+            raise
+
+    async def new_channel(self, prefix="specific"):
+        random_id = "".join(random.choice(string.ascii_letters) for _ in range(12))
+        channel = f"{prefix}.{self.client_prefix}!{random_id}"
+        self.channels[channel] = asyncio.Queue()
+        return channel
+
+    async def flush(self):
+        from .models import ChannelLayerGroup, ChannelLayerMessage
+
+        self.channels = {}
+        await _db()(ChannelLayerMessage.objects.all().delete)()
+        await _db()(ChannelLayerGroup.objects.all().delete)()
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    # --- Groups extension ---
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._group_add(group, channel)
+
+    @_db()
+    def _group_add(self, group, channel):
+        from .models import ChannelLayerGroup
+
+        ChannelLayerGroup.objects.update_or_create(
+            group=group, channel=channel,
+            defaults={'expires_at': timezone.now() + timedelta(seconds=self.group_expiry)},
+        )
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._group_discard(group, channel)
+
+    @_db()
+    def _group_discard(self, group, channel):
+        from .models import ChannelLayerGroup
+
+        ChannelLayerGroup.objects.filter(group=group, channel=channel).delete()
+
+    async def group_send(self, group, message):
+        await self.group_send_many([(group, message)])
+
+    async def group_send_many(self, group_messages):
+        """
+        Надсилає пакет повідомлень [(group, message), ...] одним SELECT членства
+        та одним INSERT для каналів інших процесів, незалежно від кількості груп.
+        """
+        for group, message in group_messages:
+            assert isinstance(message, dict), "Message is not a dict"
+            self.require_valid_group_name(group)
+        if not group_messages:
+            return
+
+        members = await self._group_channels({group for group, _ in group_messages})
+        remote = []
+        for group, message in group_messages:
+            for channel in members.get(group, ()):
+                if self._is_local(channel):
+                    try:
+                        self._deliver_local(channel, message)
+                    except ChannelFull:
+                        pass
+                else:
+                    remote.append((channel, message))
+        if remote:
+            await self._store_messages(remote)
+
+    @_db()
+    def _group_channels(self, groups):
+        from .models import ChannelLayerGroup
+
+        members = {}
+        rows = ChannelLayerGroup.objects.filter(
+            group__in=groups, expires_at__gt=timezone.now()
+        ).values_list('group', 'channel')
+        for group, channel in rows:
+            members.setdefault(group, []).append(channel)
+        return members
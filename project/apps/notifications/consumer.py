@@ -1,50 +1,93 @@
+import asyncio
+import contextlib
+import json
+
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.template.loader import get_template
-from asgiref.sync import sync_to_async
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Події одному сокету протягом цього вікна (секунди) надсилаються одним кадром
+COALESCE_WINDOW = 0.2
+
+
 class NotificationsConsumer(AsyncWebsocketConsumer):
+    """
+    Надсилає сповіщення компактним JSON без рендеру шаблонів у event loop:
+    {"type": "notifications", "items": [{"notification", "time", "status"?}], "unread_count"?}.
+    Розмітку будує notification.js. Події, що прийшли в межах COALESCE_WINDOW,
+    об'єднуються в один кадр.
+    """
+    coalesce_window = COALESCE_WINDOW
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = []
+        self._pending_count = None
+        self._flush_handle = None
+        # Посилання на запущений flush: без нього задачу може зібрати GC,
+        # а disconnect не мав би що скасувати
+        self._flush_task = None
+
     async def connect(self):
         self.user = self.scope['user']
         if self.user.is_authenticated:
             self.group_name = f'user_{self.user.id}'
             logger.info(f"User {self.user.id} connecting to group {self.group_name}")
-            
+
             await self.channel_layer.group_add(
                 self.group_name,
                 self.channel_name
             )
-            await self.accept() 
+            await self.accept()
             logger.info(f"User connected successfully")
         else:
             logger.warning(f"Unauthenticated connection attempt rejected")
             await self.close()
-        
+
     async def disconnect(self, close_code):
         logger.info(f"User disconnecting with code {close_code}")
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
         if hasattr(self, 'group_name'):
             await self.channel_layer.group_discard(
                 self.group_name,
                 self.channel_name
             )
-         
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.coalesce_window, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Надсилає накопичені події одним кадром."""
+        self._flush_handle = None
+        if not self._pending and self._pending_count is None:
+            return
+        frame = {'type': 'notifications', 'items': self._pending}
+        if self._pending_count is not None:
+            frame['unread_count'] = self._pending_count
+        self._pending, self._pending_count = [], None
+        await self.send(text_data=json.dumps(frame, ensure_ascii=False))
+
     async def send_notification(self, event):
-        # Choose template based on notification type if provided
-        template_name = 'notifications/notification.html'
-        context = {
-            'notification': event['notification'],
-            'time': event['time'] 
-        }
-        
-        # Add additional context if available
+        item = {'notification': event['notification'], 'time': event['time']}
         if 'status' in event:
-            context['status'] = event['status']
-        
-        # Render appropriate template
-        html = await sync_to_async(get_template(template_name).render)(context)
-        await self.send(text_data=html)
-
+            item['status'] = event['status']
+        self._pending.append(item)
+        self._schedule_flush()
 
-        
\ No newline at end of file
+    async def unread_count(self, event):
+        # Новий лічильник непрочитаних після mark_read в іншій вкладці; важливе лише останнє значення
+        self._pending_count = event['count']
+        self._schedule_flush()
@@ -1,14 +1,20 @@
-from apps.notifications.models import Message
+from functools import cache
+
+from apps.notifications.services.unread_counter import get_unread_count
+
 
 def user_messages(request):
-    """Context processor to provide messages in all templates"""
+    """
+    Лічильник непрочитаних повідомлень для шапки.
+
+    Значення ліниві й беруться з кешу, тож сторінки без шапки та повторні
+    рендери не роблять запитів; сам список повідомлень шапка завантажує
+    через MessageListView лише при відкритті.
+    """
     if request.user.is_authenticated:
-        messages = Message.objects.filter(recipient=request.user).order_by('-created_at')
-        unread = Message.objects.filter(recipient=request.user, is_read=False).exists()
-        unread_count = messages.filter(is_read=False).count()
+        unread_count = cache(lambda: get_unread_count(request.user.pk))
         return {
-            'message_list': messages,
-            'unread': unread,
-            'unread_count': unread_count
+            'unread': lambda: unread_count() > 0,
+            'unread_count': unread_count,
         }
-    return {'message_list': [], 'unread': False}   
\ No newline at end of file
+    return {'unread': False, 'unread_count': 0}
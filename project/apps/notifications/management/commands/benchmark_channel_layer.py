@@ -0,0 +1,89 @@
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker(group, ready, results, messages, timeout):
+    """Окремий процес з власним layer-ом: підписується на групу й міряє затримку доставки."""
+    import django
+    django.setup()
+    from channels.layers import get_channel_layer
+
+    async def run():
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(group, channel)
+        ready.put(True)
+        received = 0
+        try:
+            while received < messages:
+                message = await asyncio.wait_for(layer.receive(channel), timeout)
+                results.put(time.time() - message['sent_at'])
+                received += 1
+        except asyncio.TimeoutError:
+            for _ in range(messages - received):
+                results.put(None)
+        finally:
+            await layer.group_discard(group, channel)
+            await layer.close()
+
+    asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = 'Вимірює затримку розсилки group_send між кількома процесами (p50/p95/max)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Кількість процесів-отримувачів')
+        parser.add_argument('--messages', type=int, default=20, help='Кількість group_send')
+        parser.add_argument('--interval', type=float, default=0.1, help='Пауза між group_send (секунди)')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Максимальне очікування одного повідомлення')
+
+    def handle(self, *args, **options):
+        from channels.layers import get_channel_layer
+
+        group = f"benchmark_{int(time.time())}"
+        workers, messages = options['workers'], options['messages']
+        # Дочірні процеси не повинні успадкувати відкриті з'єднання з БД
+        connections.close_all()
+
+        ctx = multiprocessing.get_context('spawn')
+        ready, results = ctx.Queue(), ctx.Queue()
+        processes = [
+            ctx.Process(target=_worker, args=(group, ready, results, messages, options['timeout']))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get(timeout=60)
+
+        layer = get_channel_layer()
+        for i in range(messages):
+            async_to_sync(layer.group_send)(group, {'type': 'benchmark', 'n': i, 'sent_at': time.time()})
+            time.sleep(options['interval'])
+
+        latencies, lost = [], 0
+        for _ in range(workers * messages):
+            value = results.get(timeout=options['timeout'] + 60)
+            if value is None:
+                lost += 1
+            else:
+                latencies.append(value * 1000)
+        for process in processes:
+            process.join()
+
+        if not latencies:
+            self.stdout.write(self.style.ERROR("Жодне повідомлення не доставлено"))
+            return
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"Процесів: {workers}, доставлено: {len(latencies)}, втрачено: {lost}; "
+            f"p50={statistics.median(latencies):.1f} мс, p95={p95:.1f} мс, max={latencies[-1]:.1f} мс"
+        ))
@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from apps.notifications.consumer import NotificationsConsumer
+
+# Розмітка, яку раніше рендерив кожен сокет (для порівняння)
+LEGACY_TEMPLATE = Template(
+    '<div class="notification" role="alert" hx-swap-oob="afterbegin:#notification-list">'
+    '<a href="/profile/"><p class="notification-text"><strong>Увага!</strong> {{ notification }}</p></a>'
+    '<div class="notification-time">{{ time }}</div></div>'
+)
+
+
+class LegacyConsumer(NotificationsConsumer):
+    """Попередня поведінка: рендер шаблону через sync_to_async на кожну подію кожного сокета."""
+
+    async def send_notification(self, event):
+        html = await sync_to_async(LEGACY_TEMPLATE.render)(Context(event))
+        await self.send(text_data=html)
+
+
+class Command(BaseCommand):
+    help = (
+        'Навантажувальний тест websocket-сповіщень: N сокетів отримують пакет подій; '
+        'порівнює блокування event loop і кількість кадрів для старого (render) та JSON режимів'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=2000, help='Кількість сокетів')
+        parser.add_argument('--events', type=int, default=5, help='Подій на сокет (пакетна зміна статусів)')
+
+    def handle(self, *args, **options):
+        for label, consumer_class in (('render', LegacyConsumer), ('json', NotificationsConsumer)):
+            stats = asyncio.run(self.run(consumer_class, options['sockets'], options['events']))
+            self.stdout.write(
+                f"{label:>6}: {stats['elapsed']:.0f} мс, кадрів {stats['frames']}, "
+                f"затримка event loop p50={stats['lag_p50']:.1f} мс max={stats['lag_max']:.1f} мс"
+            )
+
+    async def run(self, consumer_class, sockets, events):
+        frames = 0
+
+        async def base_send(message):
+            nonlocal frames
+            frames += 1
+
+        consumers = []
+        for _ in range(sockets):
+            consumer = consumer_class()
+            consumer.base_send = base_send
+            consumers.append(consumer)
+
+        # Монітор: наскільки пізніше запланованого прокидається корутина зі sleep(5 мс)
+        lags, running = [], True
+
+        async def monitor():
+            while running:
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append((time.perf_counter() - started - 0.005) * 1000)
+
+        monitor_task = asyncio.create_task(monitor())
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            consumer.send_notification({'type': 'send_notification', 'notification': f'Подія {i}', 'time': '01.01.2025 10:00'})
+            for consumer in consumers
+            for i in range(events)
+        ))
+        expected = sockets * events if consumer_class is LegacyConsumer else sockets
+        while frames < expected:
+            await asyncio.sleep(0.01)
+        elapsed = (time.perf_counter() - started) * 1000
+        running = False
+        await monitor_task
+        return {
+            'elapsed': elapsed,
+            'frames': frames,
+            'lag_p50': statistics.median(lags) if lags else 0,
+            'lag_max': max(lags) if lags else 0,
+        }
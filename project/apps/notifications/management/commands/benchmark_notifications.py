@@ -0,0 +1,140 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from apps.notifications.models import Message
+from apps.notifications.services import message_retention, unread_counter
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'benchmark.invalid'
+
+
+@contextmanager
+def explicit_created_at():
+    """Вимикає auto_now_add, щоб bulk_create зберіг created_at, заданий для пакета."""
+    field = Message._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Наповнює таблицю повідомлень синтетичними даними (за замовчуванням 1M рядків) '
+        'і вимірює лічильник непрочитаних, сторінку списку, mark-read та очищення'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Кількість повідомлень')
+        parser.add_argument('--users', type=int, default=2000, help='Кількість отримувачів')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Розмір пакета вставки')
+        parser.add_argument('--keep', action='store_true', help='Не видаляти синтетичні дані після заміру')
+        parser.add_argument('--explain', action='store_true', help='Показати плани запитів')
+
+    def handle(self, *args, **options):
+        users = self.create_users(options['users'])
+        try:
+            self.fill(users, options['rows'], options['batch_size'])
+            self.measure(users, options['explain'])
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def create_users(self, count):
+        self.stdout.write(f"Створення {count} користувачів...")
+        User.objects.bulk_create(
+            [
+                User(email=f"bench-msg-{i}@{EMAIL_DOMAIN}", first_name='Bench', last_name=str(i), password='!')
+                for i in range(count)
+            ],
+            ignore_conflicts=True,
+        )
+        return list(User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").values_list('pk', flat=True))
+
+    def fill(self, users, rows, batch_size):
+        self.stdout.write(f"Вставка {rows} повідомлень...")
+        started = time.perf_counter()
+        now = timezone.now()
+        batches = max(1, rows // batch_size)
+        inserted = 0
+        with explicit_created_at():
+            for batch in range(batches):
+                size = min(batch_size, rows - inserted)
+                # Кожен пакет отримує свою дату: від ~2 років тому до сьогодні
+                created_at = now - timedelta(days=730 * (batches - 1 - batch) / max(batches - 1, 1))
+                old = (now - created_at).days > 30
+                Message.objects.bulk_create([
+                    Message(
+                        message_text='[benchmark]',
+                        recipient_id=random.choice(users),
+                        sender_id=random.choice(users),
+                        is_read=old or random.random() < 0.7,
+                        created_at=created_at,
+                    )
+                    for _ in range(size)
+                ])
+                inserted += size
+        self.stdout.write(f"  {inserted} рядків за {time.perf_counter() - started:.1f} с")
+        # Оновлена статистика, щоб планувальник враховував нові індекси
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f"ANALYZE TABLE {Message._meta.db_table}")
+            elif connection.vendor in ('sqlite', 'postgresql'):
+                cursor.execute(f"ANALYZE {Message._meta.db_table}")
+
+    def timed(self, label, func, explain_qs=None, explain=False):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"{label}: {elapsed:.1f} мс ({result})")
+        if explain and explain_qs is not None:
+            self.stdout.write(explain_qs.explain())
+        return result
+
+    def measure(self, users, explain):
+        hot_user = (
+            Message.objects.filter(recipient_id__in=users, is_read=False)
+            .values('recipient_id').order_by('recipient_id').first()
+        )['recipient_id']
+        unread_counter.invalidate(hot_user)
+
+        self.timed(
+            'COUNT непрочитаних (холодний кеш)',
+            lambda: unread_counter.get_unread_count(hot_user),
+            Message.objects.filter(recipient_id=hot_user, is_read=False).order_by(), explain,
+        )
+        self.timed('COUNT непрочитаних (кеш)', lambda: unread_counter.get_unread_count(hot_user))
+        page_qs = Message.objects.filter(recipient_id=hot_user).order_by('-created_at', '-pk')[:20]
+        self.timed('Перша сторінка списку', lambda: len(list(page_qs)), page_qs, explain)
+        self.timed('Позначити всі прочитаними', lambda: unread_counter.mark_read(hot_user)[0])
+
+        # Очищення лише серед синтетичних отримувачів: реальні повідомлення не видаляються
+        cutoff = timezone.now() - timedelta(days=180)
+        synthetic = Message.objects.filter(recipient_id__in=users)
+        purge_qs = synthetic.filter(is_read=True, created_at__lt=cutoff).order_by('created_at', 'pk')[:1000]
+        self.timed(
+            'Очищення: один пакет з 1000',
+            lambda: message_retention.purge_read_messages(cutoff, chunk_size=1000, max_chunks=1, messages=synthetic),
+            purge_qs, explain,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Backend: {connection.vendor}"))
+
+    def cleanup(self):
+        self.stdout.write("Видалення синтетичних даних...")
+        while True:
+            ids = list(
+                Message.objects.filter(message_text='[benchmark]').values_list('pk', flat=True)[:10_000]
+            )
+            if not ids:
+                break
+            Message.objects.filter(pk__in=ids).delete()
+        User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
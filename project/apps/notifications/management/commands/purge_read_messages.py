@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.notifications.models import Message
+from apps.notifications.services import message_retention
+
+
+class Command(BaseCommand):
+    help = 'Видаляє (за потреби архівує) прочитані повідомлення, старші за вказаний вік, пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=180, help='Мінімальний вік повідомлення в днях')
+        parser.add_argument(
+            '--chunk-size', type=int, default=message_retention.CHUNK_SIZE,
+            help='Кількість рядків, що видаляються однією транзакцією',
+        )
+        parser.add_argument('--pause', type=float, default=0, help='Пауза між пакетами (секунди)')
+        parser.add_argument('--archive', help='Файл JSON Lines, куди дописуються видалені повідомлення')
+        parser.add_argument('--dry-run', action='store_true', help='Лише порахувати повідомлення до видалення')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--days і --chunk-size мають бути додатними')
+        older_than = timezone.now() - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            count = Message.objects.filter(is_read=True, created_at__lt=older_than).count()
+            self.stdout.write(f"До видалення: {count} повідомлень, старших за {options['days']} днів")
+            return
+
+        archive = open(options['archive'], 'a', encoding='utf-8') if options['archive'] else None
+        try:
+            deleted = message_retention.purge_read_messages(
+                older_than,
+                chunk_size=options['chunk_size'],
+                archive=archive,
+                pause=options['pause'],
+            )
+        finally:
+            if archive is not None:
+                archive.close()
+        self.stdout.write(self.style.SUCCESS(f"Видалено {deleted} прочитаних повідомлень"))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.services import email_outbox
+
+
+class Command(BaseCommand):
+    help = 'Надсилає листи з черги (outbox) пакетами через одне SMTP-з\'єднання'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=email_outbox.BATCH_SIZE,
+            help='Кількість листів в одному пакеті',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Працювати постійно, перевіряючи чергу кожні --interval секунд',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Пауза між перевірками черги в режимі --loop (секунди)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = email_outbox.drain(batch_size=options['batch_size'])
+            if any(stats.values()):
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Надіслано: {stats['sent']}, повтор: {stats['retried']}, dead: {stats['dead']}"
+                    )
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0044_populate_short_name'),
+        ('notifications', '0005_channel_layer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'is_read', 'created_at'], name='msg_recipient_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['is_read', 'created_at'], name='msg_read_created_idx'),
+        ),
+    ]
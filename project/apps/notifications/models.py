@@ -1,5 +1,6 @@
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 
 class Message(models.Model):
     message_text = models.TextField()
@@ -12,6 +13,12 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Лічильник непрочитаних і список повідомлень користувача
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='msg_recipient_read_idx'),
+            # Очищення старих прочитаних повідомлень (purge_read_messages)
+            models.Index(fields=['is_read', 'created_at'], name='msg_read_created_idx'),
+        ]
     
     def get_absolute_url(self):
         return reverse("mark_as_read", kwargs={"pk": self.pk})
@@ -19,3 +26,69 @@ class Message(models.Model):
         
     def __str__(self):
         return self.message_text + f" sended by ({self.sender.first_name} {self.sender.last_name})"
+
+
+class OutgoingEmail(models.Model):
+    """
+    Черга вихідних листів (outbox). Листи зберігаються вже відрендереними
+    і надсилаються командою send_outbox_emails пакетами через одне з'єднання.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Очікує надсилання'),
+        (STATUS_SENT, 'Надіслано'),
+        (STATUS_DEAD, 'Не вдалося надіслати'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_message = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+        verbose_name = "Вихідний лист"
+        verbose_name_plural = "Вихідні листи"
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)} ({self.status})"
+
+
+class ChannelLayerMessage(models.Model):
+    """Повідомлення channel layer, що чекає на отримувача в іншому процесі (див. channel_layer.py)."""
+    channel = models.CharField(max_length=100)
+    body = models.TextField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', 'id'], name='chlayer_msg_channel_idx'),
+            models.Index(fields=['expires_at'], name='chlayer_msg_expires_idx'),
+        ]
+
+
+class ChannelLayerGroup(models.Model):
+    """Членство каналу в групі channel layer; записи старші за group_expiry ігноруються."""
+    group = models.CharField(max_length=100)
+    channel = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'channel'], name='uniq_chlayer_group_channel'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='chlayer_group_expires_idx'),
+        ]
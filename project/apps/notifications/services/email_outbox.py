@@ -0,0 +1,142 @@
+"""
+Черга вихідних листів.
+
+queue_email()/queue_emails() зберігають відрендерені листи в OutgoingEmail
+у поточній транзакції — якщо вона відкотиться, лист не піде. send_pending()
+забирає пакет листів, час яких настав, і надсилає їх через одне SMTP-з'єднання
+(get_connection().send_messages). Невдалі листи повторюються з експоненційною
+затримкою, а після MAX_ATTEMPTS позначаються як "dead".
+"""
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notifications.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+
+
+def queue_email(subject, body, from_email, recipient_list, html_message=None):
+    """Ставить один лист у чергу. Повертає OutgoingEmail або None, якщо отримувачів немає."""
+    emails = queue_emails([(subject, body, from_email, recipient_list, html_message)])
+    return emails[0] if emails else None
+
+
+def queue_emails(emails):
+    """Ставить у чергу пакет листів (subject, body, from_email, recipient_list, html_message) одним INSERT."""
+    rows = [
+        OutgoingEmail(
+            subject=subject[:255],
+            body=body or '',
+            html_message=html_message or '',
+            from_email=from_email or '',
+            recipients=[r for r in recipient_list if r],
+        )
+        for subject, body, from_email, recipient_list, html_message in emails
+        if any(recipient_list)
+    ]
+    return OutgoingEmail.objects.bulk_create(rows) if rows else []
+
+
+def backoff_delay(attempts):
+    """Затримка перед наступною спробою: 1, 2, 4, ... хвилин, не більше BACKOFF_MAX_SECONDS."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _build_message(outgoing, connection):
+    message = EmailMultiAlternatives(
+        subject=outgoing.subject,
+        body=outgoing.body,
+        from_email=outgoing.from_email or None,
+        to=outgoing.recipients,
+        connection=connection,
+    )
+    if outgoing.html_message:
+        message.attach_alternative(outgoing.html_message, "text/html")
+    return message
+
+
+def _claim_batch(batch_size):
+    """Забирає пакет листів, час яких настав. SKIP LOCKED дозволяє запускати кілька воркерів."""
+    qs = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.STATUS_PENDING, next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at', 'pk')
+    if db_connection.features.has_select_for_update_skip_locked:
+        qs = qs.select_for_update(skip_locked=True)
+    return list(qs[:batch_size])
+
+
+def send_pending(batch_size=BATCH_SIZE, connection=None):
+    """
+    Надсилає один пакет листів. Повертає {"sent": n, "retried": n, "dead": n}.
+    """
+    stats = {'sent': 0, 'retried': 0, 'dead': 0}
+    with transaction.atomic():
+        batch = _claim_batch(batch_size)
+        if not batch:
+            return stats
+
+        connection = connection or get_connection()
+        sent, failed = [], []
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error(f"Could not open email connection: {e}")
+            failed = [(outgoing, e) for outgoing in batch]
+        else:
+            try:
+                for outgoing in batch:
+                    try:
+                        # Кожен лист окремо, щоб помилка одного не зупиняла пакет
+                        if connection.send_messages([_build_message(outgoing, connection)]):
+                            sent.append(outgoing)
+                        else:
+                            failed.append((outgoing, RuntimeError("Backend did not send the message")))
+                    except Exception as e:
+                        failed.append((outgoing, e))
+            finally:
+                connection.close()
+
+        now = timezone.now()
+        for outgoing in sent:
+            outgoing.status = OutgoingEmail.STATUS_SENT
+            outgoing.attempts += 1
+            outgoing.sent_at = now
+            outgoing.last_error = ''
+        for outgoing, error in failed:
+            outgoing.attempts += 1
+            outgoing.last_error = str(error)[:2000]
+            if outgoing.attempts >= MAX_ATTEMPTS:
+                outgoing.status = OutgoingEmail.STATUS_DEAD
+                stats['dead'] += 1
+                logger.error(f"Email {outgoing.pk} dead-lettered after {outgoing.attempts} attempts: {error}")
+            else:
+                outgoing.next_attempt_at = now + backoff_delay(outgoing.attempts)
+                stats['retried'] += 1
+        stats['sent'] = len(sent)
+
+        OutgoingEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'sent_at', 'last_error', 'next_attempt_at']
+        )
+    logger.info(f"Outbox batch: {stats}")
+    return stats
+
+
+def drain(batch_size=BATCH_SIZE, connection=None):
+    """Надсилає пакети, доки в черзі є листи, час яких настав."""
+    totals = {'sent': 0, 'retried': 0, 'dead': 0}
+    while True:
+        stats = send_pending(batch_size, connection)
+        for key, value in stats.items():
+            totals[key] += value
+        if not any(stats.values()):
+            return totals
@@ -0,0 +1,58 @@
+"""
+Очищення старих прочитаних повідомлень.
+
+Повідомлення видаляються пакетами по chunk_size рядків (окрема коротка
+транзакція на пакет), тож таблиця не блокується надовго навіть на мільйонах
+рядків. Вибірка йде за індексом (is_read, created_at). За потреби перед
+видаленням пакет дописується в JSON Lines архів.
+"""
+import json
+import logging
+import time
+
+from django.db import transaction
+
+from apps.notifications.models import Message
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+ARCHIVE_FIELDS = ('id', 'message_text', 'recipient_id', 'sender_id', 'created_at', 'status', 'related_request_id')
+
+
+def _archive(rows, archive):
+    for row in rows:
+        row = dict(row, created_at=row['created_at'].isoformat())
+        archive.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def purge_read_messages(older_than, chunk_size=CHUNK_SIZE, archive=None, pause=0, max_chunks=None, messages=None):
+    """
+    Видаляє прочитані повідомлення, створені раніше за older_than (datetime).
+    archive — відкритий текстовий файл для JSON Lines копії. pause — пауза між
+    пакетами (секунди), щоб не навантажувати БД. messages — queryset, яким
+    обмежується вибірка (за замовчуванням усі повідомлення). Повертає кількість
+    видалених рядків.
+    """
+    messages = Message.objects.all() if messages is None else messages
+    deleted = chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        with transaction.atomic():
+            ids = list(
+                messages.filter(is_read=True, created_at__lt=older_than)
+                .order_by('created_at', 'pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            if archive is not None:
+                _archive(Message.objects.filter(pk__in=ids).order_by('pk').values(*ARCHIVE_FIELDS), archive)
+            Message.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        chunks += 1
+        logger.info(f"Purged {len(ids)} read messages (total {deleted})")
+        if len(ids) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
@@ -0,0 +1,123 @@
+"""
+Сповіщення студентів про зміну статусу запиту.
+
+Одиночна зміна статусу (pre_save сигнал) і пакетні переходи
+(apps.catalog.services.request_transitions) будують повідомлення однаково;
+пакет зберігає всі Message і листи в черзі (outbox) двома INSERT-ами
+та надсилає одне websocket-повідомлення на отримувача.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from apps.notifications.models import Message
+from apps.notifications.services import unread_counter
+from apps.notifications.services.email_outbox import queue_emails
+from apps.notifications.utils import get_group_name, get_now_str
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = 'advisor.finder@lnu.edu.ua'
+
+
+def build_status_change_notification(req, time=None):
+    """
+    Готує повідомлення для студента про новий статус запиту.
+    Повертає dict або None, якщо для цього статусу сповіщення не надсилається.
+    """
+    if req.request_status in ('Завершено', 'Відхилено студентом') or not req.student_id_id:
+        return None
+
+    student_user = req.student_id
+    teacher_user = req.teacher_id.teacher_id
+    if req.request_status == "Відхилено":
+        status_text = "відхилив"
+    elif req.request_status == "Скасовано":
+        status_text = "скасував"
+    else:
+        status_text = "прийняв"
+    teacher_name = f"{teacher_user.first_name} {teacher_user.last_name}"
+    emoji = "✅" if status_text == "прийняв" else "❌"
+    time = time or get_now_str()
+    if status_text != 'скасував':
+        notification = f"{teacher_name} відповів на ваш запит"
+    else:
+        notification = f"{teacher_name} скасував ваш запит"
+    context = {
+        'teacher_name': teacher_name,
+        'status_text': status_text,
+        'rejected_reason': req.rejected_reason if status_text in ("відхилив", "скасував") else None,
+        'profile_url': f"{settings.BASE_URL}{reverse('profile')}",
+        'catalog_url': f"{settings.BASE_URL}{reverse('teachers_catalog')}",
+        'time': time,
+    }
+    return {
+        'request': req,
+        'recipient': student_user,
+        'sender': teacher_user,
+        'status_text': status_text,
+        'message': f"{teacher_name} {status_text} ваш запит! {emoji}",
+        'notification': notification,
+        'time': time,
+        'subject': f'Увага! Нове повідомлення від викладача {teacher_name}',
+        'html_message': render_to_string('notifications/request_status_changed.html', context),
+    }
+
+
+def notify_status_changed(requests):
+    """
+    Пакетно сповіщає студентів про зміну статусу запитів.
+    Запити мають бути завантажені з select_related('student_id', 'teacher_id__teacher_id').
+    """
+    time = get_now_str()
+    payloads = [p for p in (build_status_change_notification(req, time) for req in requests) if p]
+    if not payloads:
+        return 0
+
+    Message.objects.bulk_create([
+        Message(
+            message_text=p['message'],
+            recipient=p['recipient'],
+            sender=p['sender'],
+            status=p['status_text'],
+            related_request=p['request'],
+        )
+        for p in payloads
+    ])
+    # bulk_create не надсилає post_save, тож лічильники скидаються явно
+    recipient_ids = {p['recipient'].pk for p in payloads}
+    transaction.on_commit(lambda: unread_counter.invalidate_many(recipient_ids))
+
+    queue_emails([
+        (p['subject'], '', FROM_EMAIL, [p['recipient'].email], p['html_message'])
+        for p in payloads
+        if p['recipient'].email
+    ])
+
+    # Одне websocket-повідомлення на отримувача, навіть якщо змінилось кілька його запитів
+    notified = {}
+    for p in payloads:
+        notified.setdefault(p['recipient'].pk, p)
+    group_messages = [
+        (get_group_name(recipient_id), {
+            "type": "send_notification",
+            "notification": p['notification'],
+            'time': time,
+        })
+        for recipient_id, p in notified.items()
+    ]
+    channel_layer = get_channel_layer()
+    try:
+        if hasattr(channel_layer, 'group_send_many'):
+            async_to_sync(channel_layer.group_send_many)(group_messages)
+        else:
+            for group, message in group_messages:
+                async_to_sync(channel_layer.group_send)(group, message)
+    except Exception as e:
+        logger.error(f"Failed to send websocket notifications: {str(e)}")
+    return len(payloads)
@@ -0,0 +1,82 @@
+"""
+Кешований лічильник непрочитаних повідомлень користувача.
+
+Шапка сайту показує лише кількість непрочитаних, тому звичайний рендер
+сторінки бере число з кешу без запиту COUNT. Після коміту створення чи
+видалення Message (сигнал або пакетне сповіщення) і після позначення
+прочитаним (mark_read — одним UPDATE, з надсиланням нового значення через
+websocket) лічильник скидається, і наступне читання перераховує число одним
+COUNT за індексом (recipient, is_read). Лічильник не змінюється інкрементом:
+перераховане число коректне за будь-якого порядку змін з різних процесів.
+
+Скидання записує нову версію користувача (cache_versions), а число зберігається
+під ключем з версією, прочитаною до COUNT. Якщо скидання відбулося між COUNT і
+записом, застаріле число лягає під стару версію і вже не читається.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+
+from apps.catalog.services import cache_versions
+from apps.notifications.models import Message
+from apps.notifications.utils import get_group_name
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 10 * 60
+VERSION_KEY = "notifications:unread:version:{}"
+UNREAD_KEY = "notifications:unread:{}:{}"
+
+
+def _version_key(user_id):
+    return VERSION_KEY.format(user_id)
+
+
+def get_unread_count(user_id):
+    """Кількість непрочитаних повідомлень користувача (з кешу або одним COUNT)."""
+    key = UNREAD_KEY.format(user_id, cache_versions.get(_version_key(user_id)))
+    count = cache.get(key)
+    if count is None:
+        count = Message.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.set(key, count, CACHE_TIMEOUT)
+    return count
+
+
+def invalidate(user_id):
+    """Скидає лічильник: наступне читання перерахує його з БД."""
+    cache_versions.bump(_version_key(user_id))
+
+
+def invalidate_many(user_ids):
+    """Скидає лічильники кількох користувачів (два звернення до кешу)."""
+    cache_versions.bump_existing(_version_key(user_id) for user_id in set(user_ids))
+
+
+def mark_read(user_id, message_ids=None):
+    """
+    Позначає прочитаними всі (message_ids=None) або вибрані повідомлення
+    користувача одним UPDATE. Повертає (кількість позначених, нове значення лічильника).
+    """
+    qs = Message.objects.filter(recipient_id=user_id, is_read=False)
+    if message_ids is not None:
+        qs = qs.filter(pk__in=message_ids)
+    updated = qs.update(is_read=True)
+    if updated:
+        invalidate(user_id)
+    count = get_unread_count(user_id)
+    if updated:
+        push_count(user_id, count)
+    return updated, count
+
+
+def push_count(user_id, count):
+    """Надсилає новий лічильник у відкриті вкладки користувача (інші вкладки оновлюють бейдж)."""
+    try:
+        async_to_sync(get_channel_layer().group_send)(get_group_name(user_id), {
+            "type": "unread_count",
+            "count": count,
+        })
+    except Exception as e:
+        logger.error(f"Failed to push unread counter to {user_id}: {str(e)}")
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from apps.catalog.models import Request, RequestFile, FileComment
 from channels.layers import get_channel_layer
@@ -6,7 +6,10 @@ from asgiref.sync import async_to_sync
 from django.db import transaction
 from .models import Message
 from django.template.loader import render_to_string
-from .utils import send_email_in_thread, get_group_name, get_now_str
+from .utils import get_group_name, get_now_str
+from .services import unread_counter
+from .services.email_outbox import queue_email
+from .services.request_notifications import FROM_EMAIL, build_status_change_notification
 from django.urls import reverse
 from django.conf import settings
 import logging
@@ -63,7 +66,7 @@ def send_notification_on_request(sender, instance, created, **kwargs):
                     "notification": notification,
                     'time': time,
                 }
-                send_email_in_thread(
+                queue_email(
                     f'Новий запит від студента {student_name}',
                     '',
                     'vasylhlova24@gmail.com',
@@ -135,7 +138,7 @@ def send_notification_on_file_upload(sender, instance, created, **kwargs):
                     "notification": notification,
                     'time': time,
                 }
-                send_email_in_thread(
+                queue_email(
                     f'{uploader_name} завантажив новий файл до роботи!',
                     '',
                     'advisor.finder@lnu.edu.ua',
@@ -150,96 +153,67 @@ def send_notification_on_file_upload(sender, instance, created, **kwargs):
         except Exception as e:
             logger.error(f"Failed to send file upload notification: {str(e)}")
 
-@receiver(pre_save, sender=Request)
-def send_notification_on_request_status_changed(sender, instance, **kwargs):
+@receiver(post_save, sender=Request)
+def send_notification_on_request_status_changed(sender, instance, created, **kwargs):
     """
     Handles notification when the status of a request changes (except 'Завершено').
+    Runs after the guarded UPDATE of Request.save, which still compares with the loaded state.
 
     Args:
         sender: The model class.
         instance: The actual instance being saved.
+        created: Boolean; True if a new record was created.
         **kwargs: Additional keyword arguments.
     """
     logger.info(f"Checking if request status was changed: {instance.pk}")
-    try:
-        old_instance = sender.objects.get(pk=instance.pk)
-    except sender.DoesNotExist:
+    if created or not instance.has_changed('request_status'):
         return
 
-    if old_instance.request_status != instance.request_status and instance.request_status != 'Завершено' and instance.request_status != 'Відхилено студентом':
-        try:
+    try:
+        payload = build_status_change_notification(instance)
+        if payload:
             channel_layer = get_channel_layer()
-            student_user = instance.student_id
-            teacher_user = instance.teacher_id.teacher_id
-            if instance.request_status == "Відхилено":
-                status_text = "відхилив"
-            elif instance.request_status == "Скасовано":
-                status_text = "скасував"
-            else:
-                status_text = "прийняв"
-            teacher_name = f"{teacher_user.first_name} {teacher_user.last_name}"
-            emoji = "✅" if status_text == "прийняв" else "❌"
-            message = f"{teacher_name} {status_text} ваш запит! {emoji}"
-            rejected_reason = instance.rejected_reason if status_text == "відхилив" or status_text == "скасував" else None
-            time = get_now_str()
-            if status_text != 'скасував':
-                notification = f"{teacher_name} відповів на ваш запит"
-            else:
-                notification = f"{teacher_name} скасував ваш запит"
-            profile_url = f"{settings.BASE_URL}{reverse('profile')}"
-            catalog_url = f"{settings.BASE_URL}{reverse('teachers_catalog')}"
-            context = {
-                'teacher_name': teacher_name,
-                'status_text': status_text,
-                'rejected_reason': rejected_reason,
-                'profile_url': profile_url,
-                'catalog_url': catalog_url,
-                'time': time
-            }
-            html_message = render_to_string('notifications/request_status_changed.html', context)
-            send_email_in_thread(
-                f'Увага! Нове повідомлення від викладача {teacher_name}',
+            student_user = payload['recipient']
+            queue_email(
+                payload['subject'],
                 '',
-                'advisor.finder@lnu.edu.ua',
+                FROM_EMAIL,
                 [student_user.email],
-                html_message
+                payload['html_message']
             )
             Message.objects.create(
-                message_text=message,
+                message_text=payload['message'],
                 recipient=student_user,
-                sender=teacher_user,
-                created_at=time,
-                status=status_text,
+                sender=payload['sender'],
+                created_at=payload['time'],
+                status=payload['status_text'],
                 related_request=instance
             )
             event = {
                 "type": "send_notification",
-                "notification": notification,
-                'time': time
+                "notification": payload['notification'],
+                'time': payload['time']
             }
             group_name = get_group_name(student_user.pk)
             logger.info(f"Sending notification to student group: {group_name}")
-            async_to_sync(channel_layer.group_send)(group_name, event)
-        except Exception as e:
-            logger.error(f"Failed to send student notification: {str(e)}")
+            # Після коміту: збереження запиту ще може відкотитися (немає вільних місць у слоті)
+            transaction.on_commit(lambda: async_to_sync(channel_layer.group_send)(group_name, event))
+    except Exception as e:
+        logger.error(f"Failed to send student notification: {str(e)}")
 
-@receiver(pre_save, sender=Request)
-def send_notification_on_work_status_changed(sender, instance, **kwargs):
+@receiver(post_save, sender=Request)
+def send_notification_on_work_status_changed(sender, instance, created, **kwargs):
     """
     Handles notification when the grade of a request changes.
 
     Args:
         sender: The model class.
         instance: The actual instance being saved.
+        created: Boolean; True if a new record was created.
         **kwargs: Additional keyword arguments.
     """
     logger.info(f"Checking if work status was changed: {instance.pk}")
-    try:
-        old_instance = sender.objects.get(pk=instance.pk)
-    except sender.DoesNotExist:
-        return
-
-    if old_instance.grade != instance.grade:
+    if not created and instance.has_changed('grade'):
         try:
             channel_layer = get_channel_layer()
             student_user = instance.student_id
@@ -257,7 +231,7 @@ def send_notification_on_work_status_changed(sender, instance, **kwargs):
                 'time': time
             }
             html_message = render_to_string('notifications/work_status_changed.html', context)
-            send_email_in_thread(
+            queue_email(
                 f'Увага! Нове повідомлення від викладача {teacher_name}',
                 '',
                 'advisor.finder@lnu.edu.ua',
@@ -278,7 +252,7 @@ def send_notification_on_work_status_changed(sender, instance, **kwargs):
             }
             group_name = get_group_name(student_user.pk)
             logger.info(f"Sending notification to student group: {group_name}")
-            async_to_sync(channel_layer.group_send)(group_name, event)
+            transaction.on_commit(lambda: async_to_sync(channel_layer.group_send)(group_name, event))
         except Exception as e:
             logger.error(f"Failed to send student notification: {str(e)}")
 
@@ -335,4 +309,17 @@ def send_notification_on_comment(sender, instance, created, **kwargs):
 
             transaction.on_commit(create_message)
         except Exception as e:
-            logger.error(f"Failed to send notification: {str(e)}")
\ No newline at end of file
+            logger.error(f"Failed to send notification: {str(e)}")
+
+
+@receiver(post_save, sender=Message)
+def count_new_unread_message(sender, instance, created, **kwargs):
+    """Скидає кешований лічильник непрочитаних після коміту нового повідомлення."""
+    if created and not instance.is_read:
+        transaction.on_commit(lambda: unread_counter.invalidate(instance.recipient_id))
+
+
+@receiver(post_delete, sender=Message)
+def uncount_deleted_unread_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        transaction.on_commit(lambda: unread_counter.invalidate(instance.recipient_id))
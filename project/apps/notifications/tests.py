@@ -1,3 +1,366 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.notifications.channel_layer import DatabaseChannelLayer
+from apps.notifications.consumer import NotificationsConsumer
+from apps.notifications.models import ChannelLayerGroup, ChannelLayerMessage, Message, OutgoingEmail
+from apps.notifications.services import email_outbox, message_retention, unread_counter
+
+User = get_user_model()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Локальна заміна SMTP, яка відмовляє на адреси з 'fail'."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if any('fail' in address for address in message.to):
+                raise ConnectionError('SMTP unavailable')
+        mail.outbox.extend(email_messages)
+        return len(email_messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTestCase(TestCase):
+    def test_queue_and_send_batch(self):
+        email_outbox.queue_emails([
+            ('Тема 1', '', 'from@test.com', ['a@test.com'], '<p>1</p>'),
+            ('Тема 2', '', 'from@test.com', ['b@test.com'], None),
+            ('Без адреси', '', 'from@test.com', [''], None),
+        ])
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+
+        stats = email_outbox.send_pending()
+        self.assertEqual(stats, {'sent': 2, 'retried': 0, 'dead': 0})
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutgoingEmail.objects.exclude(status=OutgoingEmail.STATUS_SENT).exists())
+
+    def test_future_emails_are_not_sent(self):
+        email = email_outbox.queue_email('Пізніше', '', 'from@test.com', ['a@test.com'])
+        OutgoingEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(email_outbox.send_pending(), {'sent': 0, 'retried': 0, 'dead': 0})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_command_drains_queue(self):
+        email_outbox.queue_email('Тема', '', 'from@test.com', ['a@test.com'])
+        call_command('send_outbox_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(EMAIL_BACKEND='apps.notifications.tests.FailingEmailBackend')
+class EmailOutboxRetryTestCase(TestCase):
+    def test_failed_email_is_retried_with_backoff(self):
+        email_outbox.queue_email('Добрий', '', 'from@test.com', ['ok@test.com'])
+        bad = email_outbox.queue_email('Поганий', '', 'from@test.com', ['fail@test.com'])
+
+        stats = email_outbox.send_pending()
+        self.assertEqual(stats, {'sent': 1, 'retried': 1, 'dead': 0})
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, OutgoingEmail.STATUS_PENDING)
+        self.assertEqual(bad.attempts, 1)
+        self.assertIn('SMTP unavailable', bad.last_error)
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+
+    def test_email_is_dead_lettered_after_max_attempts(self):
+        bad = email_outbox.queue_email('Поганий', '', 'from@test.com', ['fail@test.com'])
+        for _ in range(email_outbox.MAX_ATTEMPTS):
+            OutgoingEmail.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+            email_outbox.send_pending()
+
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, OutgoingEmail.STATUS_DEAD)
+        self.assertEqual(bad.attempts, email_outbox.MAX_ATTEMPTS)
+
+    def test_backoff_grows_and_is_capped(self):
+        self.assertEqual(email_outbox.backoff_delay(1), timedelta(minutes=1))
+        self.assertEqual(email_outbox.backoff_delay(3), timedelta(minutes=4))
+        self.assertEqual(email_outbox.backoff_delay(30), timedelta(seconds=email_outbox.BACKOFF_MAX_SECONDS))
+
+
+class DatabaseChannelLayerTestCase(TransactionTestCase):
+    """Два екземпляри layer-а імітують два ASGI-процеси зі спільною БД."""
+
+    def run_async(self, coro):
+        return async_to_sync(lambda: coro)()
+
+    def test_local_group_send_does_not_touch_message_table(self):
+        async def scenario():
+            layer = DatabaseChannelLayer(poll_interval=0.01)
+            channel = await layer.new_channel()
+            await layer.group_add('user_1', channel)
+            await layer.group_send('user_1', {'type': 'send_notification', 'n': 1})
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            await layer.close()
+            return message
+
+        self.assertEqual(self.run_async(scenario()), {'type': 'send_notification', 'n': 1})
+        self.assertFalse(ChannelLayerMessage.objects.exists())
+
+    def test_group_send_reaches_other_process(self):
+        async def scenario():
+            sender = DatabaseChannelLayer(poll_interval=0.01)
+            receiver = DatabaseChannelLayer(poll_interval=0.01)
+            channel = await receiver.new_channel()
+            await receiver.group_add('user_2', channel)
+            await sender.group_send_many([
+                ('user_2', {'type': 'send_notification', 'n': 1}),
+                ('user_3', {'type': 'send_notification', 'n': 2}),
+            ])
+            message = await asyncio.wait_for(receiver.receive(channel), 2)
+            await receiver.close()
+            return message
+
+        self.assertEqual(self.run_async(scenario()), {'type': 'send_notification', 'n': 1})
+        self.assertFalse(ChannelLayerMessage.objects.exists())
+
+    def test_expired_membership_is_skipped(self):
+        async def scenario():
+            layer = DatabaseChannelLayer(group_expiry=60)
+            channel = await layer.new_channel()
+            await layer.group_add('user_4', channel)
+            await asyncio.to_thread(
+                lambda: ChannelLayerGroup.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+            )
+            await layer.group_send('user_4', {'type': 'send_notification'})
+            return layer.channels[channel].qsize()
+
+        self.assertEqual(self.run_async(scenario()), 0)
+
+
+class UnreadCounterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = User.objects.create_user(
+            email='sender@test.com', first_name='В', last_name='Викладач', role='Викладач'
+        )
+        self.user = User.objects.create_user(
+            email='reader@test.com', first_name='С', last_name='Студент', role='Студент', academic_group='ФЕС-21'
+        )
+
+    def create_message(self, text='Повідомлення'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(message_text=text, recipient=self.user, sender=self.sender)
+
+    def test_counter_is_cached_and_follows_new_messages(self):
+        self.create_message()
+        self.assertEqual(unread_counter.get_unread_count(self.user.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_counter.get_unread_count(self.user.pk), 1)
+        self.create_message()
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_counter.get_unread_count(self.user.pk), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_counter.get_unread_count(self.user.pk), 2)
+
+    def test_invalidation_during_count_is_not_lost(self):
+        self.create_message()
+        real_count = QuerySet.count
+        counted = []
+
+        def count_then_new_message(qs):
+            result = real_count(qs)
+            if not counted:
+                counted.append(result)
+                # COUNT уже виконано, коли інший запит комітить нове повідомлення
+                self.create_message()
+            return result
+
+        with mock.patch.object(QuerySet, 'count', count_then_new_message):
+            self.assertEqual(unread_counter.get_unread_count(self.user.pk), 1)
+        self.assertEqual(unread_counter.get_unread_count(self.user.pk), 2)
+
+    def test_mark_as_read_decrements_counter_once(self):
+        message = self.create_message()
+        self.create_message()
+        unread_counter.get_unread_count(self.user.pk)
+        self.client.force_login(self.user)
+
+        url = reverse('mark_as_read', args=[message.pk])
+        self.assertEqual(self.client.post(url).json()['unread_count'], 1)
+        self.assertEqual(self.client.post(url).json()['unread_count'], 1)
+        self.assertEqual(self.client.post(reverse('mark_as_read', args=[999999])).status_code, 404)
+
+    def test_page_render_makes_no_notification_queries(self):
+        self.create_message()
+        unread_counter.get_unread_count(self.user.pk)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        notification_queries = [q['sql'] for q in ctx.captured_queries if 'notifications_message' in q['sql']]
+        self.assertEqual(notification_queries, [])
+
+    def test_message_list_is_paginated(self):
+        for i in range(25):
+            self.create_message(f'Повідомлення {i}')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('get_notifications'))
+        self.assertEqual(len(response.context['message_list']), 20)
+        self.assertContains(response, 'load-more-messages')
+        response = self.client.get(reverse('get_notifications'), {'page': 2, 'layout': 'mobile'})
+        self.assertEqual(len(response.context['message_list']), 5)
+        self.assertContains(response, 'mobile-message-item')
+
+    def test_mark_many_as_read_is_single_update(self):
+        first = self.create_message()
+        second = self.create_message()
+        self.create_message()
+        self.assertEqual(unread_counter.get_unread_count(self.user.pk), 3)
+        self.client.force_login(self.user)
+
+        url = reverse('mark_many_as_read')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, json.dumps({'ids': [first.pk, second.pk]}), content_type='application/json')
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(response.json()['unread_count'], 1)
+        updates = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('UPDATE') and 'notifications_message' in q['sql']
+        ]
+        self.assertEqual(len(updates), 1)
+
+        response = self.client.post(url, json.dumps({'all': True}), content_type='application/json')
+        self.assertEqual(response.json(), {'status': 'success', 'updated': 1, 'unread_count': 0})
+        self.assertEqual(self.client.post(url, '{"ids": "x"}', content_type='application/json').status_code, 400)
+
+
+class MessageRetentionTestCase(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            email='old-sender@test.com', first_name='В', last_name='Викладач', role='Викладач'
+        )
+        self.user = User.objects.create_user(
+            email='old-reader@test.com', first_name='С', last_name='Студент', role='Студент', academic_group='ФЕС-21'
+        )
+        Message.objects.bulk_create([
+            Message(message_text=f'Старе {i}', recipient=self.user, sender=self.sender, is_read=i % 3 != 0)
+            for i in range(9)
+        ])
+        Message.objects.update(created_at=timezone.now() - timedelta(days=400))
+        Message.objects.create(message_text='Нове', recipient=self.user, sender=self.sender, is_read=True)
+
+    def test_purge_deletes_only_old_read_messages_in_chunks(self):
+        with tempfile.NamedTemporaryFile('w+', suffix='.jsonl', delete=False, encoding='utf-8') as archive:
+            deleted = message_retention.purge_read_messages(
+                timezone.now() - timedelta(days=180), chunk_size=4, archive=archive
+            )
+        try:
+            with open(archive.name, encoding='utf-8') as f:
+                archived = [json.loads(line) for line in f]
+        finally:
+            os.unlink(archive.name)
+
+        self.assertEqual(deleted, 6)
+        self.assertEqual(len(archived), 6)
+        self.assertEqual(Message.objects.filter(is_read=False).count(), 3)
+        self.assertTrue(Message.objects.filter(message_text='Нове').exists())
+
+    def test_purge_can_be_limited_to_recipients(self):
+        other = User.objects.create_user(
+            email='other-reader@test.com', first_name='І', last_name='Студент', role='Студент', academic_group='ФЕС-21'
+        )
+        deleted = message_retention.purge_read_messages(
+            timezone.now() - timedelta(days=180), messages=Message.objects.filter(recipient=other)
+        )
+        self.assertEqual(deleted, 0)
+        self.assertEqual(Message.objects.count(), 10)
+
+    def test_benchmark_keeps_real_messages(self):
+        call_command(
+            'benchmark_notifications', '--rows', '100', '--users', '3', '--batch-size', '10', '--keep', stdout=StringIO()
+        )
+        self.assertEqual(Message.objects.exclude(message_text='[benchmark]').count(), 10)
+        # Пакети старші за 180 днів очищено, молодші зберегли свої дати
+        benchmark = Message.objects.filter(message_text='[benchmark]')
+        self.assertTrue(benchmark.filter(created_at__lt=timezone.now() - timedelta(days=30)).exists())
+        self.assertTrue(Message._meta.get_field('created_at').auto_now_add)
+
+    def test_command_dry_run_and_purge(self):
+        out = StringIO()
+        call_command('purge_read_messages', '--days', '180', '--dry-run', stdout=out)
+        self.assertIn('6', out.getvalue())
+        self.assertEqual(Message.objects.count(), 10)
+
+        call_command('purge_read_messages', '--days', '180', '--chunk-size', '5', stdout=StringIO())
+        self.assertEqual(Message.objects.count(), 4)
+
+
+class NotificationsConsumerTestCase(TestCase):
+    def test_burst_is_coalesced_into_one_json_frame(self):
+        frames = []
+
+        async def base_send(message):
+            frames.append(json.loads(message['text']))
+
+        async def scenario():
+            consumer = NotificationsConsumer()
+            consumer.base_send = base_send
+            consumer.coalesce_window = 0.01
+            for i in range(3):
+                await consumer.send_notification({'notification': f'Подія {i}', 'time': '10:00'})
+            await consumer.unread_count({'count': 5})
+            await consumer.unread_count({'count': 4})
+            await asyncio.sleep(0.05)
+
+        async_to_sync(scenario)()
+        self.assertEqual(frames, [{
+            'type': 'notifications',
+            'items': [{'notification': f'Подія {i}', 'time': '10:00'} for i in range(3)],
+            'unread_count': 4,
+        }])
+
+    def test_disconnect_cancels_running_flush(self):
+        started = []
+
+        async def base_send(message):
+            started.append(message)
+            await asyncio.Event().wait()
+
+        async def scenario():
+            consumer = NotificationsConsumer()
+            consumer.base_send = base_send
+            consumer.coalesce_window = 0.01
+            await consumer.send_notification({'notification': 'Подія', 'time': '10:00'})
+            await asyncio.sleep(0.05)
+            task = consumer._flush_task
+            await asyncio.wait_for(consumer.disconnect(1000), timeout=1)
+            return task
+
+        task = async_to_sync(scenario)()
+        self.assertEqual(len(started), 1)
+        self.assertTrue(task.cancelled())
+
+    def test_disconnect_within_window_sends_nothing(self):
+        frames = []
+
+        async def base_send(message):
+            frames.append(message)
+
+        async def scenario():
+            consumer = NotificationsConsumer()
+            consumer.base_send = base_send
+            consumer.coalesce_window = 0.01
+            await consumer.send_notification({'notification': 'Подія', 'time': '10:00'})
+            await consumer.disconnect(1000)
+            await asyncio.sleep(0.05)
+
+        async_to_sync(scenario)()
+        self.assertEqual(frames, [])
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import MessageListView, MarkAsReadView
+from .views import MessageListView, MarkAsReadView, MarkManyAsReadView
 
 urlpatterns = [
     path('get_messages/', MessageListView.as_view(), name='get_notifications'),
+    path('read/', MarkManyAsReadView.as_view(), name='mark_many_as_read'),
     path('read/<int:message_id>/', MarkAsReadView.as_view(), name='mark_as_read'),  
-]
\ No newline at end of file
+]
@@ -1,38 +1,73 @@
+import json
+
 from django.views.generic import ListView, View
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from .models import Message
+from .services import unread_counter
 
+MAX_MARK_READ_IDS = 500
 
 
-class MessageListView(LoginRequiredMixin,ListView):
+class MessageListView(LoginRequiredMixin, ListView):
+    """
+    Сторінка повідомлень для випадаючого списку в шапці.
+    Завантажується notification.js лише при відкритті списку; ?layout=mobile
+    рендерить елементи для мобільного оверлею.
+    """
     model = Message
-    template_name = 'header.html'
-    context_object_name = 'message_list'    
+    template_name = 'notifications/message_list.html'
+    context_object_name = 'message_list'
+    paginate_by = 20
+
     def get_queryset(self):
-        return Message.objects.filter(recipient=self.request.user).order_by('-created_at')
-    
+        return (
+            Message.objects.filter(recipient=self.request.user)
+            .select_related('related_request')
+            .order_by('-created_at', '-pk')
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['message_list'] = self.get_queryset()
-        unread_messages = context['message_list'].filter(is_read=False)
-        context['unread_count'] = unread_messages.count()
-        context['unread'] = context['unread_count'] > 0
+        context['mobile'] = self.request.GET.get('layout') == 'mobile'
         return context
-        
 
 
 @method_decorator(csrf_exempt, name='dispatch') 
-class MarkAsReadView(View):
+class MarkAsReadView(LoginRequiredMixin, View):
     def post(self, request, message_id):
-        message = get_object_or_404(Message, id=message_id, recipient=request.user)
-        if not message.is_read:
-            message.is_read = True
-            message.save(update_fields=['is_read'])
-        return JsonResponse({"status": "success", "is_read": message.is_read})
-        
-        
-         
\ No newline at end of file
+        # Умовний UPDATE: лічильник зменшується лише якщо повідомлення справді було непрочитаним
+        updated, count = unread_counter.mark_read(request.user.pk, [message_id])
+        if not updated and not Message.objects.filter(id=message_id, recipient=request.user).exists():
+            return JsonResponse({"status": "error", "message": "Повідомлення не знайдено"}, status=404)
+        return JsonResponse({"status": "success", "is_read": True, "unread_count": count})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MarkManyAsReadView(LoginRequiredMixin, View):
+    """
+    Позначає прочитаними вибрані ({"ids": [...]}) або всі ({"all": true})
+    повідомлення користувача одним UPDATE.
+    """
+    def post(self, request):
+        try:
+            data = json.loads(request.body or '{}')
+        except json.JSONDecodeError:
+            return JsonResponse({"status": "error", "message": "Некоректний JSON"}, status=400)
+
+        if data.get('all'):
+            ids = None
+        else:
+            ids = data.get('ids')
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return JsonResponse({"status": "error", "message": "Очікується список ids"}, status=400)
+            if len(ids) > MAX_MARK_READ_IDS:
+                return JsonResponse(
+                    {"status": "error", "message": f"Не більше {MAX_MARK_READ_IDS} повідомлень за раз"},
+                    status=400,
+                )
+
+        updated, count = unread_counter.mark_read(request.user.pk, ids)
+        return JsonResponse({"status": "success", "updated": updated, "unread_count": count})
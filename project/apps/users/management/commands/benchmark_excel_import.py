@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from openpyxl import Workbook
+
+from apps.users.admin import ALLOWED_DEPARTMENTS
+from apps.users.models import StudentExcelMapping
+from apps.users.services import excel_import
+from apps.users.services.excel_reader import ExcelReader
+
+GROUP_PREFIX = 'BENCH-'
+FIRST_NAMES = ['Олена', 'Іван', 'Ганна', 'Петро', 'Юлія', 'Тарас', 'Ірина', 'Богдан']
+LAST_NAMES = ['Петренко', 'Коваль', 'Шевчук', 'Бондар', 'Ткаченко', 'Мельник', 'Кравець', 'Олійник']
+COLUMNS = ['Прізвище', 'Ім\'я', 'По-батькові', 'Кафедра', 'Група']
+
+
+def _rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _read_pandas(path):
+    import pandas as pd
+
+    return len(pd.read_excel(path, engine='openpyxl'))
+
+
+def _read_streaming(path):
+    rows = 0
+    with ExcelReader(path) as reader:
+        fields = excel_import.resolve_columns(reader.columns, COLUMNS)
+        for chunk in reader.chunks(fields):
+            rows += len(chunk)
+    return rows
+
+
+def _import_streaming(path):
+    with ExcelReader(path) as reader:
+        return excel_import.import_students(reader, ALLOWED_DEPARTMENTS).success_count
+
+
+def _measure(target, path, queue):
+    # Окремий процес: пік RSS (ru_maxrss) рахується від стану на старті
+    baseline = _rss_mb()
+    started = time.perf_counter()
+    rows = target(path)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((rows, elapsed, peak - baseline))
+
+
+class Command(BaseCommand):
+    help = (
+        'Порівнює читання Excel-файлу імпорту через pd.read_excel і потоковий ExcelReader: '
+        'час і приріст пікового RSS на синтетичній книзі'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Кількість рядків у книзі')
+        parser.add_argument(
+            '--import', dest='run_import', action='store_true',
+            help='Також виконати повний імпорт студентів з потокового читання (дані видаляються після заміру)',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'students.xlsx')
+            started = time.perf_counter()
+            self.fill(path, options['rows'])
+            size = os.path.getsize(path) / 1024 / 1024
+            self.stdout.write(
+                f"Книга: {options['rows']} рядків, {size:.1f} МБ, створено за {time.perf_counter() - started:.1f} с"
+            )
+
+            self.run('pd.read_excel (до змін)', _read_pandas, path)
+            self.run('ExcelReader', _read_streaming, path)
+            if options['run_import']:
+                try:
+                    self.run('Імпорт студентів (ExcelReader + upsert)', _import_streaming, path)
+                finally:
+                    StudentExcelMapping.objects.filter(group__startswith=GROUP_PREFIX).delete()
+
+    def fill(self, path, count):
+        # write_only не тримає рядки книги в пам'яті
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(COLUMNS)
+        for i in range(count):
+            sheet.append([
+                f"{random.choice(LAST_NAMES)}{i}", random.choice(FIRST_NAMES), 'Іванович',
+                random.choice(ALLOWED_DEPARTMENTS[:6]), f"{GROUP_PREFIX}{i % 40}",
+            ])
+        workbook.save(path)
+
+    def run(self, label, target, path):
+        # Дочірній процес відкриє власне з'єднання з БД
+        connections.close_all()
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_measure, args=(target, path, queue))
+        process.start()
+        rows, elapsed, rss = queue.get()
+        process.join()
+        self.stdout.write(f"{label}: {rows} рядків, {elapsed:.2f} с, приріст пікового RSS {rss:.1f} МБ")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.users.services import import_jobs
+
+
+class Command(BaseCommand):
+    help = 'Виконує фонові завдання імпорту Excel-файлів з черги (ImportJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Працювати постійно, перевіряючи чергу кожні --interval секунд',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Пауза між перевірками черги в режимі --loop (секунди)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = import_jobs.run_pending()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f"Виконано завдань імпорту: {count}"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
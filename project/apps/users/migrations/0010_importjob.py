@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_studentexcelmapping_studentrequestmapping'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('teachers', 'Викладачі'), ('students', 'Студенти'), ('themes', 'Теми викладачів')], max_length=10, verbose_name='Тип імпорту')),
+                ('status', models.CharField(choices=[('queued', 'У черзі'), ('running', 'Виконується'), ('done', 'Завершено'), ('failed', 'Помилка')], default='queued', max_length=10, verbose_name='Статус')),
+                ('file', models.FileField(blank=True, upload_to='import_jobs/', verbose_name='Файл')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='Назва файлу')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='Рядків у файлі')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Оброблено рядків')),
+                ('success_count', models.PositiveIntegerField(default=0, verbose_name='Успішно')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Помилок')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Перші помилки')),
+                ('message', models.TextField(blank=True, verbose_name='Результат')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Хто завантажив')),
+            ],
+            options={
+                'verbose_name': 'Завдання імпорту',
+                'verbose_name_plural': 'Завдання імпорту',
+                'ordering': ['-created_at', '-pk'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx')],
+            },
+        ),
+    ]
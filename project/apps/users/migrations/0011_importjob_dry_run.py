@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='dry_run',
+            field=models.BooleanField(default=False, verbose_name='Попередній перегляд'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='plan',
+            field=models.JSONField(blank=True, null=True, verbose_name='План імпорту'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='summary',
+            field=models.JSONField(blank=True, default=list, verbose_name='Зведення змін'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'У черзі'), ('running', 'Виконується'), ('preview', 'Очікує підтвердження'), ('done', 'Завершено'), ('failed', 'Помилка')], default='queued', max_length=10, verbose_name='Статус'),
+        ),
+    ]
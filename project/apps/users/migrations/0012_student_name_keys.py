@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:33
+
+from django.db import migrations, models
+
+
+def _populate(model, fields, key_field, key):
+    batch = []
+    for obj in model.objects.only('id', *fields).iterator(chunk_size=1000):
+        setattr(obj, key_field, key(obj))
+        batch.append(obj)
+        if len(batch) >= 1000:
+            model.objects.bulk_update(batch, [key_field])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, [key_field])
+
+
+def populate_name_keys(apps, schema_editor):
+    from apps.users.services.student_names import name_key
+
+    _populate(
+        apps.get_model('users', 'StudentExcelMapping'), ['last_name', 'first_name'], 'name_key',
+        lambda mapping: name_key(f"{mapping.last_name} {mapping.first_name}"),
+    )
+    _populate(
+        apps.get_model('users', 'StudentRequestMapping'), ['student_name'], 'student_key',
+        lambda mapping: name_key(mapping.student_name),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_importjob_dry_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentexcelmapping',
+            name='name_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='studentrequestmapping',
+            name='student_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='studentexcelmapping',
+            index=models.Index(fields=['name_key', 'group'], name='excel_mapping_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentrequestmapping',
+            index=models.Index(fields=['student_key'], name='request_mapping_student_idx'),
+        ),
+    ]
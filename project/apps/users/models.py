@@ -99,18 +99,28 @@ class CustomUser(AbstractUser):
         return None
 
 
+    def get_academic_context(self):
+        """
+        Курс, потік, кафедра та факультет користувача (кешується,
+        див. apps.catalog.services.academic_context).
+        """
+        from apps.catalog.services.academic_context import get_academic_context
+        return get_academic_context(self)
+
     def get_faculty(self):
-        try:
-            from apps.catalog.models import Group
-            group = Group.objects.get(group_code=self.academic_group)
-            return group.stream.specialty.faculty
-        except Exception:
-            return None  
+        return self.get_academic_context().faculty
 
     def get_department(self):
         """
         Повертає Department об'єкт через профіль (нова система)
         """
+        return self.get_academic_context().department
+
+    def resolve_department(self):
+        """
+        Визначає кафедру запитами до БД, без кешу: через профіль,
+        а для студентів — через активний запит.
+        """
         profile = self.get_profile()
         if profile and hasattr(profile, 'department') and profile.department:
             return profile.department
@@ -134,7 +144,8 @@ class CustomUser(AbstractUser):
         return department.department_name if department else None
     
     def get_department_short_name(self):
-        return self.get_department().short_name if self.get_department() else None
+        department = self.get_department()
+        return department.short_name if department else None
 
 
 # @receiver(pre_save, sender=CustomUser)
@@ -168,6 +179,8 @@ class StudentExcelMapping(models.Model):
     patronymic = models.CharField(max_length=100, blank=True, verbose_name="По-батькові")
     department = models.CharField(max_length=200, verbose_name="Кафедра")
     group = models.CharField(max_length=50, verbose_name="Група")
+    # Нормалізовані «прізвище ім'я» для точного пошуку (див. services.student_names)
+    name_key = models.CharField(max_length=200, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -175,10 +188,21 @@ class StudentExcelMapping(models.Model):
         verbose_name = "Мапінг студентів Excel"
         verbose_name_plural = "Мапінги студентів Excel"
         unique_together = ['last_name', 'first_name', 'patronymic', 'group']
+        indexes = [
+            models.Index(fields=['name_key', 'group'], name='excel_mapping_name_key_idx'),
+        ]
 
     def __str__(self):
         return f"{self.last_name} {self.first_name} {self.patronymic} - {self.group}"
 
+    def save(self, *args, **kwargs):
+        from .services import student_names
+        self.name_key = student_names.name_key(f"{self.last_name} {self.first_name}")
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         return f"{self.last_name} {self.first_name} {self.patronymic}".strip()
@@ -193,6 +217,8 @@ class StudentRequestMapping(models.Model):
     theme = models.CharField(max_length=500, verbose_name="Тема")
     theme_description = models.TextField(blank=True, verbose_name="Опис теми")
     student_name = models.CharField(max_length=200, verbose_name="Студент")
+    # Нормалізовані перші два слова імені студента (див. services.student_names)
+    student_key = models.CharField(max_length=200, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -200,10 +226,21 @@ class StudentRequestMapping(models.Model):
         verbose_name = "Мапінг запитів студентів"
         verbose_name_plural = "Мапінги запитів студентів"
         unique_together = ['teacher_email', 'stream', 'student_name']
+        indexes = [
+            models.Index(fields=['student_key'], name='request_mapping_student_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student_name} - {self.theme[:50]}..."
 
+    def save(self, *args, **kwargs):
+        from .services import student_names
+        self.student_key = student_names.name_key(self.student_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'student_key'}
+        super().save(*args, **kwargs)
+
     @property
     def teacher_name(self):
         try:
@@ -212,3 +249,77 @@ class StudentRequestMapping(models.Model):
         except CustomUser.DoesNotExist:
             return self.teacher_email
 
+
+
+class ImportJob(models.Model):
+    """
+    Фоновий імпорт Excel-файлу з адмінки. Файл зберігається разом із
+    завданням, а обробляє його команда run_import_jobs; сторінка імпорту
+    опитує стан завдання (див. services/import_jobs.py).
+    """
+    KIND_TEACHERS = 'teachers'
+    KIND_STUDENTS = 'students'
+    KIND_THEMES = 'themes'
+    KIND_CHOICES = [
+        (KIND_TEACHERS, 'Викладачі'),
+        (KIND_STUDENTS, 'Студенти'),
+        (KIND_THEMES, 'Теми викладачів'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_PREVIEW = 'preview'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'У черзі'),
+        (STATUS_RUNNING, 'Виконується'),
+        (STATUS_PREVIEW, 'Очікує підтвердження'),
+        (STATUS_DONE, 'Завершено'),
+        (STATUS_FAILED, 'Помилка'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Тип імпорту")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name="Статус")
+    file = models.FileField(upload_to='import_jobs/', blank=True, verbose_name="Файл")
+    file_name = models.CharField(max_length=255, blank=True, verbose_name="Назва файлу")
+    # Dry-run: спершу лише зведення змін, запис — після підтвердження
+    dry_run = models.BooleanField(default=False, verbose_name="Попередній перегляд")
+    # Перевірений план (ImportPlan.as_json()); застосовується без повторного читання файлу
+    plan = models.JSONField(null=True, blank=True, verbose_name="План імпорту")
+    summary = models.JSONField(default=list, blank=True, verbose_name="Зведення змін")
+    created_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs',
+        verbose_name="Хто завантажив",
+    )
+    # Оцінка з розміру аркуша; None, якщо файл його не містить
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name="Рядків у файлі")
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name="Оброблено рядків")
+    success_count = models.PositiveIntegerField(default=0, verbose_name="Успішно")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Помилок")
+    errors = models.JSONField(default=list, blank=True, verbose_name="Перші помилки")
+    message = models.TextField(blank=True, verbose_name="Результат")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Оновлюється після кожного пакета: завислі завдання повертаються в чергу
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-pk']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx'),
+        ]
+        verbose_name = "Завдання імпорту"
+        verbose_name_plural = "Завдання імпорту"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.file_name} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def awaits_confirmation(self):
+        return self.status == self.STATUS_PREVIEW
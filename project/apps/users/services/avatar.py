@@ -0,0 +1,125 @@
+"""
+URL фото профілю без звернень до віддаленого сховища на кожен запит.
+
+URL, обчислений default_storage.url(), кешується за користувачем і назвою
+файлу: нова назва (crop_profile_picture завжди зберігає файл з новою
+міткою часу) автоматично дає новий ключ, а refresh_avatar_url() одразу
+кладе в кеш свіжий URL. Існування файлу (exists()) не перевіряється —
+назву в БД записує лише успішне збереження.
+
+Звернення до сховища проходять через запобіжник (circuit breaker): після
+кількох помилок або повільних відповідей поспіль він на reset_timeout
+секунд повертає аватар за замовчуванням, не чіпаючи сховище.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AVATAR = 'images/default-avatar.jpg'
+CACHE_TIMEOUT = 24 * 60 * 60
+AVATAR_KEY = "avatar:url:{}:{}"
+
+
+class CircuitBreaker:
+    """
+    Простий запобіжник у межах процесу: failure_threshold помилок (або відповідей,
+    повільніших за slow_call_seconds) поспіль відкривають його на reset_timeout секунд.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30, slow_call_seconds=1.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Напіввідкритий стан: пропускаємо наступний виклик для перевірки
+                self._opened_at = None
+                self._failures = self.failure_threshold - 1
+                return False
+            return True
+
+    def call(self, func, *args, **kwargs):
+        """Викликає func або кидає RuntimeError, якщо запобіжник відкритий."""
+        if self.is_open:
+            raise RuntimeError("Circuit breaker is open")
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        if time.monotonic() - started > self.slow_call_seconds:
+            self._record_failure()
+        else:
+            with self._lock:
+                self._failures = 0
+        return result
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold and self._opened_at is None:
+                self._opened_at = time.monotonic()
+                logger.warning(f"Storage circuit breaker opened for {self.reset_timeout}s")
+
+    def reset(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+
+storage_breaker = CircuitBreaker()
+
+
+def default_avatar_url():
+    return static(DEFAULT_AVATAR)
+
+
+def _key(user_id, name):
+    return AVATAR_KEY.format(user_id, hashlib.md5(name.encode('utf-8')).hexdigest())
+
+
+def get_avatar_url(user):
+    """URL фото профілю користувача або аватар за замовчуванням."""
+    name = getattr(user, 'profile_picture', None) and user.profile_picture.name
+    if not name:
+        return default_avatar_url()
+
+    key = _key(user.pk, name)
+    url = cache.get(key)
+    if url is not None:
+        return url
+    try:
+        url = storage_breaker.call(default_storage.url, name)
+    except Exception as e:
+        logger.warning(f"Could not resolve profile picture URL for user {user.pk}: {e}")
+        # Не кешуємо: після відновлення сховища URL буде отримано знову
+        return default_avatar_url()
+    cache.set(key, url, CACHE_TIMEOUT)
+    return url
+
+
+def refresh_avatar_url(user, url=None):
+    """Кладе в кеш URL щойно збереженого фото (url — вже отриманий від сховища)."""
+    name = user.profile_picture.name if user.profile_picture else None
+    if not name:
+        return default_avatar_url()
+    if url is None:
+        url = storage_breaker.call(default_storage.url, name)
+    cache.set(_key(user.pk, name), url, CACHE_TIMEOUT)
+    return url
@@ -0,0 +1,948 @@
+"""
+Масовий імпорт Excel-файлів адмінки: викладачі зі слотами, студенти
+(StudentExcelMapping) і теми викладачів із запитами студентів.
+
+Імпорт читає файл потоково (excel_reader.ExcelReader) і обробляє його
+пакетами по CHUNK_SIZE рядків:
+
+1. колонки шукаються один раз (без урахування регістру й пробілів), рядки з
+   помилками відсіюються з повідомленням «Рядок N: ...» (N — номер рядка в Excel);
+2. усе, що потрібно для перевірок, завантажується словниками: довідники
+   (потоки за кодом, кафедри за назвою) — один раз, користувачі, слоти й
+   теми — одним запитом на пакет;
+3. зміни пакета записуються bulk_create(update_conflicts=True) і масовими
+   UPDATE в окремій транзакції пакета: блокування тримаються недовго, а
+   прогрес (progress(оброблено рядків, ImportResult) після кожного пакета)
+   відповідає тому, що вже збережено. Повторний імпорт того самого файлу
+   безпечний — наявні записи оновлюються, а не дублюються.
+
+Для викладачів і тем є dry-run: plan_teachers()/plan_themes() перевіряють
+увесь файл і порівнюють його з БД кількома запитами на весь файл, повертаючи
+ImportPlan зі зведенням змін; apply_teachers()/apply_themes() записують той
+самий план без повторного читання файлу.
+
+Пакетні операції не надсилають post_save, тому кеші, які скидають сигнали
+(картки каталогу, академічний контекст, автодоповнення, вкладки профілю),
+скидаються тут після коміту, а лічильники слотів, яких торкнувся пакет,
+звіряються reconcile_occupied у транзакції цього пакета.
+З тієї ж причини ключі імен мапінгів (student_names.name_key) заповнюються тут.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.catalog.models import Department, OnlyTeacher, Request, Slot, Stream, TeacherTheme
+from apps.catalog.services import (
+    academic_context, autocomplete_index, catalog_snapshot, profile_tabs, semestr_policy, theme_search,
+)
+from apps.users.models import CustomUser, StudentExcelMapping, StudentRequestMapping
+
+from . import registration_services, student_names
+from .excel_reader import CHUNK_SIZE, HEADER_ROW
+
+logger = logging.getLogger(__name__)
+
+EMAIL_DOMAIN = '@lnu.edu.ua'
+PROFILE_LINK_WORKERS = 8
+
+TEACHER_COLUMNS = ['Прізвище', 'Ім\'я', 'По-батькові', 'Адреса корпоративної скриньки', 'Кафедра']
+STUDENT_COLUMNS = ['Прізвище', 'Ім\'я', 'По-батькові', 'Кафедра', 'Група']
+THEME_COLUMNS = ['Корпоративна скринька', 'Потік', 'Тема']
+THEME_OPTIONAL_COLUMNS = ['Студент', 'Опис теми (за бажанням)']
+
+# Грецькі літери, які трапляються в кодах потоків замість схожих кириличних
+GREEK_TO_CYRILLIC = str.maketrans({
+    'Φ': 'Ф', 'Ε': 'Е', 'Ι': 'І', 'Μ': 'М', 'Π': 'П', 'Σ': 'С', 'Λ': 'Л',
+})
+# Значення колонки «Студент», які не є іменами
+INVALID_STUDENT_NAMES = {
+    'nan', 'none', 'null', 'undefined', '0', '1', 'true', 'false', 'yes', 'no', 'да', 'ні', 'так', '',
+}
+
+
+class ImportFileError(ValueError):
+    """Файл не можна імпортувати (наприклад, бракує обов'язкових колонок)."""
+
+
+@dataclass
+class ImportResult:
+    success_count: int = 0
+    # (номер рядка Excel або None, текст помилки)
+    errors: list = field(default_factory=list)
+
+    @property
+    def error_count(self):
+        return len(self.errors)
+
+    def row_error(self, row, message):
+        self.errors.append((row, f'Рядок {row}: {message}'))
+
+    def error(self, message):
+        self.errors.append((None, message))
+
+    def error_lines(self):
+        """Тексти помилок: спершу помилки рядків за порядком у файлі, далі решта."""
+        ordered = sorted(self.errors, key=lambda error: (error[0] is None, error[0] or 0))
+        return [text for _, text in ordered]
+
+    def message(self, error_limit=None):
+        message = f'Імпорт завершено. Успішно: {self.success_count}, Помилок: {self.error_count}'
+        lines = self.error_lines()
+        if lines:
+            message += '\nПомилки:\n' + '\n'.join(lines[:error_limit])
+            if error_limit is not None and len(lines) > error_limit:
+                message += f'\n... та ще {len(lines) - error_limit} помилок'
+        return message
+
+    def as_json(self, error_limit=None):
+        return {
+            'success': True,
+            'message': self.message(error_limit),
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+        }
+
+
+# Скільки прикладів показувати в кожному розділі зведення dry-run
+SUMMARY_ITEMS = 50
+
+
+def _section(title, items):
+    return {'title': title, 'count': len(items), 'items': items[:SUMMARY_ITEMS]}
+
+
+@dataclass
+class ImportPlan:
+    """
+    Результат dry-run: перевірені рядки файлу (items, словники), помилки
+    перевірки і зведення змін (summary — розділи {title, count, items}).
+    Зберігається як JSON, тож застосування плану не читає файл повторно.
+    """
+    items: list
+    summary: list
+    success_count: int = 0
+    errors: list = field(default_factory=list)
+
+    @classmethod
+    def build(cls, result, items, summary):
+        return cls(items, summary, result.success_count, list(result.errors))
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(**data)
+
+    def as_json(self):
+        return asdict(self)
+
+    def result(self):
+        """ImportResult, що продовжує результат перевірки під час застосування."""
+        return ImportResult(self.success_count, [tuple(error) for error in self.errors])
+
+
+# --- Колонки ---
+
+def _column_key(name):
+    return str(name).strip().lower()
+
+
+def resolve_columns(columns, required, optional=()):
+    """
+    {очікувана назва: назва колонки у файлі} без урахування регістру.
+    Відсутні необов'язкові колонки — None; відсутні обов'язкові — ImportFileError.
+    """
+    by_key = {}
+    for column in columns:
+        by_key.setdefault(_column_key(column), column)
+    missing = [name for name in required if _column_key(name) not in by_key]
+    if missing:
+        raise ImportFileError(f'Відсутні обов\'язкові колонки: {", ".join(missing)}')
+    return {name: by_key.get(_column_key(name)) for name in (*required, *optional)}
+
+
+# --- Запис ---
+
+def upsert(model, objs, unique_fields, update_fields, batch_size=CHUNK_SIZE):
+    """
+    INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE пакетами. MySQL не приймає
+    unique_fields і не повертає pk, тому після upsert-у pk треба дочитати.
+    """
+    if not objs:
+        return
+    target = unique_fields if connection.features.supports_update_conflicts_with_target else None
+    model.objects.bulk_create(
+        objs, batch_size=batch_size, update_conflicts=True, unique_fields=target, update_fields=update_fields,
+    )
+
+
+def email_key(email):
+    """
+    Email у нижньому регістрі: ключ словників імпорту. Колація MySQL не враховує
+    регістр, тож БД може повернути Ivan.P@lnu.edu.ua на запит ivan.p@lnu.edu.ua.
+    """
+    return email.strip().lower() if email else email
+
+
+def _on_commit(func, *args):
+    transaction.on_commit(lambda: func(*args))
+
+
+def _report(progress, chunk, result):
+    # Номер останнього рядка пакета враховує і пропущені порожні рядки
+    if progress is not None:
+        progress(chunk[-1].row - HEADER_ROW, result)
+
+
+def _apply_in_batches(items, write, result, progress):
+    """write(пакет) для елементів плану dry-run, кожен пакет у своїй транзакції."""
+    for start in range(0, len(items), CHUNK_SIZE):
+        batch = items[start:start + CHUNK_SIZE]
+        with transaction.atomic():
+            write(batch)
+        if progress is not None:
+            progress(start + len(batch), result)
+
+
+def _academic_year():
+    # Те саме, що Request.save() для нового запиту
+    now = timezone.now()
+    if now.month >= 9:
+        return f"{now.year}/{str(now.year + 1)[-2:]}"
+    return f"{now.year - 1}/{str(now.year)[-2:]}"
+
+
+# --- Викладачі ---
+
+def _department_resolver(allowed_departments, department_short_names):
+    """
+    Функція назва -> (Department або None, помилка або None) з усіма кафедрами
+    в пам'яті; результат для кожної назви обчислюється один раз.
+    """
+    allowed = {name.upper() for name in allowed_departments}
+    full_by_short = {short.upper(): full for full, short in department_short_names.items()}
+    departments = {}
+    for department in Department.objects.select_related('faculty'):
+        departments.setdefault(department.department_name.strip().upper(), department)
+    allowed_hint = ", ".join(allowed_departments[:6])
+    resolved = {}
+
+    def resolve(name):
+        if name not in resolved:
+            if name.upper() not in allowed:
+                resolved[name] = None, f'Недозволена кафедра "{name}". Дозволені: {allowed_hint}'
+            else:
+                full_name = full_by_short.get(name.upper(), name)
+                department = departments.get(full_name.strip().upper())
+                if department is None:
+                    resolved[name] = None, f'Кафедра "{full_name}" не існує в системі. Дозволені: {allowed_hint}'
+                else:
+                    resolved[name] = department, None
+        return resolved[name]
+
+    return resolve
+
+
+def _profile_links(teachers):
+    """{email: посилання або None} для [(email, кафедра)], перевірки URL паралельно."""
+    def check(item):
+        email, department = item
+        faculty_short_name = department.faculty.short_name if department.faculty else "unknown"
+        try:
+            url = registration_services.teacher_profile_url(email, faculty_short_name)
+        except (ValueError, IndexError):
+            return email, None
+        return email, url if registration_services.url_exists(url) else None
+
+    if not teachers:
+        return {}
+    with ThreadPoolExecutor(max_workers=PROFILE_LINK_WORKERS) as pool:
+        return dict(pool.map(check, teachers))
+
+
+@dataclass
+class TeacherRow:
+    row: int  # номер рядка в Excel
+    email: str
+    first_name: str
+    last_name: str
+    patronymic: str
+    department_id: int
+    quotas: dict  # {код потоку: квота}
+
+
+def _valid_teachers(chunk, stream_codes, resolve, result):
+    """{email: TeacherRow}; для повторного email діє останній рядок."""
+    teachers = {}
+    for record in chunk:
+        email = email_key(record['Адреса корпоративної скриньки'])
+        if not record['Прізвище'] or not record['Ім\'я'] or not email:
+            result.row_error(record.row, 'Пропущено обов\'язкові поля')
+            continue
+        if EMAIL_DOMAIN not in email:
+            result.row_error(record.row, f'Невірний email {email}')
+            continue
+        if not record['Кафедра']:
+            result.row_error(record.row, 'Не вказано кафедру')
+            continue
+        department, error = resolve(record['Кафедра'])
+        if error:
+            result.row_error(record.row, error)
+            continue
+        quotas = {}
+        for code in stream_codes:
+            try:
+                quotas[code] = int(float(record[code])) if record[code] else 0
+            except ValueError:
+                result.row_error(record.row, f'Некоректна кількість місць для потоку {code}')
+                break
+        else:
+            teachers.pop(email, None)
+            teachers[email] = TeacherRow(
+                record.row, email, record['Ім\'я'], record['Прізвище'], record['По-батькові'], department.pk, quotas,
+            )
+            result.success_count += 1
+    return teachers
+
+
+def _write_teachers(teachers, streams, result):
+    """Upsert користувачів, профілів і слотів пакета. Повертає (id викладачів, id потоків)."""
+    emails = list(teachers)
+    existing_users = {user.email.lower(): user for user in CustomUser.objects.filter(email__in=emails)}
+    existing_links = {
+        email.lower(): link
+        for email, link in OnlyTeacher.objects.filter(teacher_id__email__in=emails)
+        .values_list('teacher_id__email', 'profile_link')
+    }
+    # Посилання перевіряються HTTP-запитом, тому лише для профілів без посилання
+    without_link = [teacher for email, teacher in teachers.items() if not existing_links.get(email)]
+    departments = Department.objects.select_related('faculty').in_bulk(
+        {teacher.department_id for teacher in without_link}
+    )
+    links = _profile_links([(teacher.email, departments[teacher.department_id]) for teacher in without_link])
+
+    upsert(
+        CustomUser,
+        [
+            CustomUser(
+                email=email, first_name=teacher.first_name, last_name=teacher.last_name,
+                patronymic=teacher.patronymic, role='Викладач', is_active=True, is_staff=False,
+            )
+            for email, teacher in teachers.items()
+        ],
+        unique_fields=['email'],
+        update_fields=['first_name', 'last_name', 'patronymic'],
+    )
+    user_ids = {
+        email.lower(): pk for email, pk in CustomUser.objects.filter(email__in=emails).values_list('email', 'pk')
+    }
+    upsert(
+        OnlyTeacher,
+        [
+            OnlyTeacher(
+                teacher_id_id=user_ids[email], academic_level='Викладач', department_id=teacher.department_id,
+                profile_link=existing_links.get(email) or links.get(email),
+            )
+            for email, teacher in teachers.items()
+        ],
+        unique_fields=['teacher_id'],
+        update_fields=['academic_level', 'department', 'profile_link'],
+    )
+
+    occupied = {
+        (teacher_pk, stream_pk): count
+        for teacher_pk, stream_pk, count in Slot.objects.filter(teacher_id__in=user_ids.values())
+        .values_list('teacher_id', 'stream_id', 'occupied')
+    }
+    slots = {}
+    for email, teacher in teachers.items():
+        teacher_pk = user_ids[email]
+        for code, quota in teacher.quotas.items():
+            # Потік могли видалити між перевіркою файлу і застосуванням плану
+            if quota <= 0 or code not in streams:
+                continue
+            key = (teacher_pk, streams[code])
+            if occupied.get(key, 0) > quota:
+                result.row_error(
+                    teacher.row, f'Помилка створення слоту для {code}: кількість зайнятих місць перевищує квоту',
+                )
+                continue
+            slots[key] = Slot(teacher_id_id=teacher_pk, stream_id_id=streams[code], quota=quota, occupied=0)
+    upsert(Slot, list(slots.values()), unique_fields=['teacher_id', 'stream_id'], update_fields=['quota'])
+
+    # ПІБ викладача входить у пошукові документи його тем
+    renamed = []
+    for email, user in existing_users.items():
+        teacher = teachers[email]
+        names = (teacher.first_name, teacher.last_name, teacher.patronymic)
+        if user.role == 'Викладач' and (user.first_name, user.last_name, user.patronymic) != names:
+            renamed.append(user.pk)
+    theme_search.rebuild(teacher_ids=renamed)
+    Slot.reconcile_occupied(slot_ids=Slot.objects.filter(teacher_id__in=user_ids.values()).values('pk'))
+    return set(user_ids.values()), {stream_pk for _, stream_pk in slots}
+
+
+def _teacher_stream_columns(reader):
+    """({код потоку: id}, {код потоку: колонка у файлі}) для потоків, що є у файлі."""
+    streams = dict(Stream.objects.values_list('stream_code', 'pk'))
+    stream_columns = {}
+    for code in streams:
+        for column in reader.columns:
+            if _column_key(column) == code.lower():
+                stream_columns[code] = column
+                break
+    if not stream_columns:
+        raise ImportFileError('Не знайдено колонок з кількістю слотів для потоків')
+    return streams, stream_columns
+
+
+def _teachers_written(teacher_ids, stream_ids, result):
+    _on_commit(catalog_snapshot.invalidate_teachers, teacher_ids, True)
+    _on_commit(catalog_snapshot.invalidate_streams, stream_ids)
+    _on_commit(academic_context.invalidate_all)
+    _on_commit(autocomplete_index.mark_changed, autocomplete_index.ALL)
+    logger.info(f"Імпорт викладачів: {len(teacher_ids)} викладачів, помилок {result.error_count}")
+
+
+def import_teachers(reader, allowed_departments, department_short_names, progress=None):
+    """
+    Викладачі (CustomUser + OnlyTeacher) і квоти слотів за колонками потоків.
+    Наявних користувачів оновлює (ПІБ), профілі — кафедра й посилання.
+    """
+    columns = resolve_columns(reader.columns, TEACHER_COLUMNS)
+    streams, stream_columns = _teacher_stream_columns(reader)
+
+    result = ImportResult()
+    resolve = _department_resolver(allowed_departments, department_short_names)
+    teacher_ids, stream_ids = set(), set()
+    for chunk in reader.chunks({**columns, **stream_columns}):
+        with transaction.atomic():
+            teachers = _valid_teachers(chunk, stream_columns, resolve, result)
+            if teachers:
+                chunk_teacher_ids, chunk_stream_ids = _write_teachers(teachers, streams, result)
+                teacher_ids |= chunk_teacher_ids
+                stream_ids |= chunk_stream_ids
+        _report(progress, chunk, result)
+
+    _teachers_written(teacher_ids, stream_ids, result)
+    return result
+
+
+def _full_name(last_name, first_name, patronymic):
+    return ' '.join(part for part in (last_name, first_name, patronymic) if part)
+
+
+def _teachers_diff(teachers):
+    """Зведення змін, які внесе імпорт викладачів: чотири запити до БД на весь файл."""
+    users = {
+        email.lower(): (pk, _full_name(last_name, first_name, patronymic))
+        for email, pk, last_name, first_name, patronymic in CustomUser.objects.filter(
+            email__in=list(teachers),
+        ).values_list('email', 'pk', 'last_name', 'first_name', 'patronymic')
+    }
+    user_pks = [pk for pk, _ in users.values()]
+    current_departments = dict(OnlyTeacher.objects.filter(pk__in=user_pks).values_list('pk', 'department_id'))
+    department_names = dict(Department.objects.values_list('pk', 'department_name'))
+    slots = {
+        (teacher_pk, code): (quota, occupied)
+        for teacher_pk, code, quota, occupied in Slot.objects.filter(teacher_id__in=user_pks)
+        .values_list('teacher_id', 'stream_id__stream_code', 'quota', 'occupied')
+    }
+
+    new_teachers, renamed, moved, new_slots, quota_changes, conflicts = [], [], [], [], [], []
+    for email, teacher in teachers.items():
+        name = _full_name(teacher.last_name, teacher.first_name, teacher.patronymic)
+        if email not in users:
+            new_teachers.append(f'{name} ({email})')
+            teacher_pk = None
+        else:
+            teacher_pk, old_name = users[email]
+            if old_name != name:
+                renamed.append(f'{email}: {old_name} → {name}')
+            old_department = current_departments.get(teacher_pk)
+            if old_department is not None and old_department != teacher.department_id:
+                moved.append(
+                    f'{email}: {department_names.get(old_department)} → {department_names.get(teacher.department_id)}'
+                )
+        for code, quota in teacher.quotas.items():
+            if quota <= 0:
+                continue
+            if (teacher_pk, code) not in slots:
+                new_slots.append(f'{email}, {code}: {quota}')
+                continue
+            old_quota, occupied = slots[(teacher_pk, code)]
+            if occupied > quota:
+                conflicts.append(f'Рядок {teacher.row}: {email}, {code}: квота {quota} менша за зайняті {occupied}')
+            elif old_quota != quota:
+                quota_changes.append(f'{email}, {code}: {old_quota} → {quota}')
+
+    return [
+        _section('Нові викладачі', new_teachers),
+        _section('Зміна ПІБ', renamed),
+        _section('Зміна кафедри', moved),
+        _section('Нові слоти', new_slots),
+        _section('Зміна квот', quota_changes),
+        _section('Квоти, які не буде змінено (менші за кількість зайнятих місць)', conflicts),
+    ]
+
+
+def plan_teachers(reader, allowed_departments, department_short_names, progress=None):
+    """
+    Dry-run імпорту викладачів: перевіряє весь файл і порівнює його з БД,
+    нічого не записуючи. apply_teachers() застосовує отриманий план.
+    """
+    columns = resolve_columns(reader.columns, TEACHER_COLUMNS)
+    _, stream_columns = _teacher_stream_columns(reader)
+
+    result = ImportResult()
+    resolve = _department_resolver(allowed_departments, department_short_names)
+    teachers = {}
+    for chunk in reader.chunks({**columns, **stream_columns}):
+        for email, teacher in _valid_teachers(chunk, stream_columns, resolve, result).items():
+            teachers.pop(email, None)
+            teachers[email] = teacher
+        _report(progress, chunk, result)
+    return ImportPlan.build(result, [asdict(teacher) for teacher in teachers.values()], _teachers_diff(teachers))
+
+
+def apply_teachers(plan, progress=None):
+    """Записує викладачів з плану plan_teachers() пакетами, як import_teachers()."""
+    result = plan.result()
+    teachers = [TeacherRow(**item) for item in plan.items]
+    streams = dict(Stream.objects.values_list('stream_code', 'pk'))
+    teacher_ids, stream_ids = set(), set()
+
+    def write(batch):
+        batch_teacher_ids, batch_stream_ids = _write_teachers(
+            {teacher.email: teacher for teacher in batch}, streams, result,
+        )
+        teacher_ids.update(batch_teacher_ids)
+        stream_ids.update(batch_stream_ids)
+
+    _apply_in_batches(teachers, write, result, progress)
+    _teachers_written(teacher_ids, stream_ids, result)
+    return result
+
+
+# --- Студенти ---
+
+def import_students(reader, allowed_departments, progress=None):
+    """Рядки StudentExcelMapping: нові додаються, наявним оновлюється кафедра."""
+    columns = resolve_columns(reader.columns, STUDENT_COLUMNS)
+    allowed = {name.upper() for name in allowed_departments}
+    allowed_hint = ", ".join(allowed_departments[:6])
+
+    result = ImportResult()
+    for chunk in reader.chunks(columns):
+        students = {}
+        for record in chunk:
+            if not record['Прізвище'] or not record['Ім\'я'] or not record['Група']:
+                result.row_error(record.row, 'Пропущено обов\'язкові поля')
+                continue
+            department = record['Кафедра']
+            if department and department.upper() not in allowed:
+                result.row_error(record.row, f'Недозволена кафедра "{department}". Дозволені: {allowed_hint}')
+                continue
+            key = (record['Прізвище'], record['Ім\'я'], record['По-батькові'], record['Група'])
+            students.pop(key, None)
+            students[key] = StudentExcelMapping(
+                last_name=key[0], first_name=key[1], patronymic=key[2], group=key[3], department=department,
+                name_key=student_names.name_key(f'{key[0]} {key[1]}'),
+            )
+            result.success_count += 1
+        with transaction.atomic():
+            upsert(
+                StudentExcelMapping, list(students.values()),
+                unique_fields=['last_name', 'first_name', 'patronymic', 'group'],
+                update_fields=['department', 'updated_at'],
+            )
+        _report(progress, chunk, result)
+    logger.info(f"Імпорт студентів: {result.success_count} рядків, помилок {result.error_count}")
+    return result
+
+
+# --- Теми ---
+
+class StudentMatcher:
+    """
+    Пошук зареєстрованого студента за «Прізвище Ім'я [По-батькові]» серед
+    усіх студентів, завантажених одним запитом. Спершу точний збіг прізвища
+    й імені, інакше — перший студент, чиї прізвище та ім'я містять частини
+    імені (як у попередньому last_name__icontains/first_name__icontains).
+    """
+
+    def __init__(self):
+        self._students = None
+        self._exact = {}
+
+    def _load(self):
+        self._students = []
+        queryset = CustomUser.objects.filter(role='Студент').order_by('pk')
+        for pk, last_name, first_name in queryset.values_list('pk', 'last_name', 'first_name'):
+            last_name, first_name = (last_name or '').casefold(), (first_name or '').casefold()
+            self._students.append((pk, last_name, first_name))
+            self._exact.setdefault((last_name, first_name), pk)
+
+    def find(self, student_name):
+        if self._students is None:
+            self._load()
+        parts = student_name.casefold().split()
+        if not parts:
+            return None
+        last_name, first_name = parts[0], parts[1] if len(parts) > 1 else ''
+        if (last_name, first_name) in self._exact:
+            return self._exact[(last_name, first_name)]
+        for pk, student_last_name, student_first_name in self._students:
+            if last_name in student_last_name and first_name in student_first_name:
+                return pk
+        return None
+
+
+def _clean_student_name(name):
+    name = ''.join(char for char in name if char.isprintable()).strip()
+    return '' if name.lower() in INVALID_STUDENT_NAMES else name
+
+
+def _themes_by_key(teacher_ids, keys):
+    themes = {}
+    queryset = TeacherTheme.objects.filter(teacher_id__in=teacher_ids, theme_key__in=keys).order_by('pk')
+    for pk, teacher_pk, key in queryset.values_list('pk', 'teacher_id', 'theme_key'):
+        themes.setdefault((teacher_pk, key), pk)
+    return themes
+
+
+@dataclass
+class ThemeRow:
+    teacher_email: str
+    stream_code: str
+    title: str
+    description: str
+    students: list = field(default_factory=list)
+
+
+class ThemeImport:
+    """
+    Стан імпорту тем між пакетами: викладачі й слоти, вже завантажені з БД,
+    вільні місця (кожен новий активний запит займає одне) і пошук студентів.
+    """
+
+    def __init__(self, result):
+        self.result = result
+        self.streams = dict(Stream.objects.values_list('stream_code', 'pk'))
+        self.streams_ci = {}
+        for code, stream_pk in self.streams.items():
+            self.streams_ci.setdefault(code.lower(), stream_pk)
+        self.teachers = {}
+        self.loaded_emails = set()
+        self.slots = {}
+        self.free = {}
+        self.matcher = StudentMatcher()
+        self.academic_year = _academic_year()
+        self.new_theme_count = 0
+        self.new_requests = []
+
+    def group(self, chunk):
+        """Рядки пакета, згруповані за (викладач, потік, тема): опис з першого рядка, студенти за порядком."""
+        groups = {}
+        for record in chunk:
+            email, title = email_key(record['Корпоративна скринька']), record['Тема']
+            stream_code = record['Потік'].translate(GREEK_TO_CYRILLIC)
+            missing = [
+                name for name, value in (('email', email), ('stream', stream_code), ('theme', title)) if not value
+            ]
+            if missing:
+                self.result.row_error(record.row, f'Пропущено обов\'язкові поля: {", ".join(missing)}')
+                continue
+            if EMAIL_DOMAIN not in email:
+                self.result.row_error(record.row, f'Невірний email викладача {email}')
+                continue
+            row = groups.setdefault(
+                (email, stream_code, title),
+                ThemeRow(email, stream_code, title, record['Опис теми (за бажанням)']),
+            )
+            student = _clean_student_name(record['Студент'])
+            if student:
+                row.students.append(student)
+        return list(groups.values())
+
+    def load_teachers(self, emails):
+        """Довантажує викладачів (id, кафедра, ПІБ) і їхні слоти, яких ще немає в пам'яті."""
+        emails = set(emails) - self.loaded_emails
+        if not emails:
+            return
+        self.loaded_emails |= emails
+        teacher_ids = set()
+        for email, *teacher in OnlyTeacher.objects.filter(
+            teacher_id__email__in=emails, teacher_id__role='Викладач',
+        ).values_list(
+            'teacher_id__email', 'pk', 'department_id',
+            'teacher_id__first_name', 'teacher_id__last_name', 'teacher_id__patronymic',
+        ):
+            self.teachers[email.lower()] = teacher
+            teacher_ids.add(teacher[0])
+        for slot in Slot.objects.filter(teacher_id__in=teacher_ids):
+            key = (slot.teacher_id_id, slot.stream_id_id)
+            self.slots[key] = slot
+            self.free[key] = slot.get_available_slots()
+
+    def plan(self, rows):
+        """[(тема, викладач, id потоку)] для тем з відомим викладачем і потоком."""
+        self.load_teachers(row.teacher_email for row in rows)
+        plan = []
+        for row in rows:
+            teacher = self.teachers.get(row.teacher_email)
+            if teacher is None:
+                self.result.error(f'Викладач з email {row.teacher_email} не знайдено')
+                continue
+            stream_pk = self.streams.get(row.stream_code) or self.streams_ci.get(row.stream_code.lower())
+            if stream_pk is None:
+                self.result.error(
+                    f'Потік {row.stream_code} не знайдено. Доступні: {", ".join(list(self.streams)[:10])}'
+                )
+                continue
+            plan.append((row, teacher, stream_pk))
+        return plan
+
+    def write_themes(self, plan):
+        """Створює відсутні теми, позначає зайняті й прив'язує потоки. Повертає {(викладач, ключ): id теми}."""
+        teacher_ids = {teacher[0] for _, teacher, _ in plan}
+        keys = {theme_search.theme_key(row.title) for row, _, _ in plan}
+        themes = _themes_by_key(teacher_ids, keys)
+        new_themes = {}
+        for row, teacher, _ in plan:
+            key = (teacher[0], theme_search.theme_key(row.title))
+            if key in themes or key in new_themes:
+                continue
+            theme = TeacherTheme(
+                teacher_id_id=teacher[0], theme=row.title, theme_description=row.description,
+                is_active=True, is_occupied=bool(row.students), theme_key=key[1],
+            )
+            theme.search_title, theme.search_document = theme_search.build_document(theme, teacher[2:])
+            new_themes[key] = theme
+        if new_themes:
+            TeacherTheme.objects.bulk_create(new_themes.values(), batch_size=CHUNK_SIZE)
+            themes = _themes_by_key(teacher_ids, keys)
+            self.new_theme_count += len(new_themes)
+
+        occupied, theme_streams = set(), set()
+        for row, teacher, stream_pk in plan:
+            theme_pk = themes[(teacher[0], theme_search.theme_key(row.title))]
+            theme_streams.add((theme_pk, stream_pk))
+            if row.students:
+                occupied.add(theme_pk)
+        TeacherTheme.objects.filter(pk__in=occupied, is_occupied=False).update(is_occupied=True)
+
+        through = TeacherTheme.streams.through
+        theme_streams -= set(
+            through.objects.filter(teachertheme_id__in={pk for pk, _ in theme_streams})
+            .values_list('teachertheme_id', 'stream_id')
+        )
+        through.objects.bulk_create(
+            [through(teachertheme_id=theme_pk, stream_id=stream_pk) for theme_pk, stream_pk in theme_streams],
+            batch_size=CHUNK_SIZE, ignore_conflicts=True,
+        )
+        return themes
+
+    def requests_for(self, plan, themes, result):
+        """
+        Нові запити для студентів тем плану, без запису: ([(студент, Request)],
+        мапінги StudentRequestMapping). Вільні місця слотів зменшуються в пам'яті.
+        """
+        existing = set()
+        for teacher_pk, student_pk, theme_pk, topic_name in Request.objects.filter(
+            teacher_theme_id__in=set(themes.values())
+        ).values_list('teacher_id', 'student_id', 'teacher_theme_id', 'topic_name'):
+            existing.add(('student', teacher_pk, theme_pk, student_pk))
+            existing.add(('virtual', teacher_pk, theme_pk, topic_name))
+
+        new_requests, mappings = [], {}
+        for row, teacher, stream_pk in plan:
+            if not row.students:
+                continue
+            teacher_pk, department_pk = teacher[0], teacher[1]
+            theme_pk = themes[(teacher_pk, theme_search.theme_key(row.title))]
+            policy = semestr_policy.get_policy(department_pk, self.academic_year)
+            slot_key = (teacher_pk, stream_pk)
+            for student_name in row.students:
+                slot = self.slots.get(slot_key)
+                if slot is None:
+                    result.error(
+                        f'Слот для викладача {row.teacher_email} та потоку {row.stream_code} не знайдено'
+                    )
+                    continue
+                if self.free[slot_key] <= 0:
+                    result.error(
+                        f'Слот для викладача {row.teacher_email} та потоку {row.stream_code} вже заповнений '
+                        f'(зайнято: {slot.quota - self.free[slot_key]}/{slot.quota})'
+                    )
+                    continue
+                student_pk = self.matcher.find(student_name)
+                if student_pk is None:
+                    key = ('virtual', teacher_pk, theme_pk, row.title)
+                    motivation = f'Віртуальний запит для не зареєстрованого студента: {student_name}'
+                else:
+                    key = ('student', teacher_pk, theme_pk, student_pk)
+                    motivation = f'Автоматично створений запит для теми: {row.title}'
+                created = key not in existing
+                if created:
+                    if policy and not policy.can_student_create_request:
+                        result.error(
+                            f'Помилка створення запиту для студента {student_name}: '
+                            f'Дедлайн подачі нових запитів минув. Створення неможливе.'
+                        )
+                        continue
+                    existing.add(key)
+                    self.free[slot_key] -= 1
+                    new_requests.append((student_name, Request(
+                        teacher_id_id=teacher_pk, student_id_id=student_pk, teacher_theme_id=theme_pk,
+                        slot=slot, request_status='Активний', motivation_text=motivation,
+                        topic_name=row.title, topic_description=row.description,
+                        academic_year=self.academic_year,
+                    )))
+                # Для зареєстрованого студента мапінг лише разом з новим запитом
+                if student_pk is None or created:
+                    mappings.setdefault((row.teacher_email, row.stream_code, student_name), StudentRequestMapping(
+                        teacher_email=row.teacher_email, stream=row.stream_code, student_name=student_name,
+                        student_key=student_names.name_key(student_name),
+                        theme=row.title, theme_description=row.description,
+                    ))
+                result.success_count += 1
+        return new_requests, mappings
+
+    def write_requests(self, plan, themes):
+        """Запити для студентів тем пакета і мапінги StudentRequestMapping."""
+        created, mappings = self.requests_for(plan, themes, self.result)
+        new_requests = [req for _, req in created]
+        Request.objects.bulk_create(new_requests, batch_size=CHUNK_SIZE)
+        # Активні запити створено без Slot.reserve(): лічильники звіряються в транзакції пакета
+        if new_requests:
+            Slot.reconcile_occupied(slot_ids={req.slot_id for req in new_requests})
+        # Наявні мапінги не змінюються (як get_or_create)
+        StudentRequestMapping.objects.bulk_create(mappings.values(), batch_size=CHUNK_SIZE, ignore_conflicts=True)
+        self.new_requests.extend(new_requests)
+
+    def write(self, rows):
+        plan = self.plan(rows)
+        if plan:
+            self.write_requests(plan, self.write_themes(plan))
+
+    def run(self, chunk):
+        self.write(self.group(chunk))
+
+    def diff(self, rows):
+        """
+        Зведення змін для рядків без запису в БД: ([рядки з відомим викладачем
+        і потоком], розділи зведення). Усі теми викладачів файлу, їхні потоки
+        й наявні запити читаються кількома запитами на весь файл.
+        """
+        plan = self.plan(rows)
+        emails = {teacher[0]: row.teacher_email for row, teacher, _ in plan}
+        stream_codes = {stream_pk: code for code, stream_pk in self.streams.items()}
+        existing = {}
+        for pk, teacher_pk, key, title, is_deleted, is_occupied in TeacherTheme.objects.filter(
+            teacher_id__in=emails,
+        ).order_by('pk').values_list('pk', 'teacher_id', 'theme_key', 'theme', 'is_deleted', 'is_occupied'):
+            existing.setdefault((teacher_pk, key), (pk, title, is_deleted, is_occupied))
+        linked = set(
+            TeacherTheme.streams.through.objects.filter(
+                teachertheme_id__in=[theme[0] for theme in existing.values()],
+            ).values_list('teachertheme_id', 'stream_id')
+        )
+
+        themes, new_themes, new_links, occupied = {}, [], {}, {}
+        for row, teacher, stream_pk in plan:
+            key = (teacher[0], theme_search.theme_key(row.title))
+            label = f'{row.teacher_email}: {row.title}'
+            if key in existing:
+                themes[key] = existing[key][0]
+                if row.students and not existing[key][3]:
+                    occupied.setdefault(key, label)
+            elif key not in themes:
+                # Тимчасовий id ще не створеної теми
+                themes[key] = -(len(new_themes) + 1)
+                new_themes.append(label)
+            if (themes[key], stream_pk) not in linked:
+                new_links.setdefault((themes[key], stream_pk), f'{label} → {stream_codes[stream_pk]}')
+        missing = [
+            f'{emails[key[0]]}: {title}'
+            for key, (_, title, is_deleted, _) in existing.items()
+            if key not in themes and not is_deleted
+        ]
+
+        skipped = ImportResult()
+        created, _ = self.requests_for(plan, themes, skipped)
+        registered, virtual = [], []
+        for student_name, req in created:
+            label = f'{student_name} → {req.topic_name}'
+            (virtual if req.student_id_id is None else registered).append(label)
+
+        return [row for row, _, _ in plan], [
+            _section('Нові теми', new_themes),
+            _section('Нові прив\'язки тем до потоків', list(new_links.values())),
+            _section('Наявні теми, які стануть зайнятими', list(occupied.values())),
+            _section('Нові запити зареєстрованих студентів', registered),
+            _section('Віртуальні запити (студент ще не зареєстрований)', virtual),
+            _section('Запити, які не буде створено', skipped.error_lines()),
+            _section('Теми викладачів, яких немає у файлі (імпорт їх не змінює)', missing),
+        ]
+
+
+def _themes_written(state, result):
+    new_requests = state.new_requests
+    _on_commit(autocomplete_index.mark_changed, autocomplete_index.ALL)
+    if new_requests:
+        student_ids = {req.student_id_id for req in new_requests} - {None}
+        teacher_ids = {req.teacher_id_id for req in new_requests}
+        _on_commit(profile_tabs.invalidate_users, student_ids | teacher_ids)
+        for student_pk in student_ids:
+            _on_commit(academic_context.invalidate, student_pk)
+    logger.info(
+        f"Імпорт тем: {state.new_theme_count} нових тем, {len(new_requests)} запитів, "
+        f"помилок {result.error_count}"
+    )
+
+
+def import_themes(reader, progress=None):
+    """
+    Теми викладачів за потоками і запити для вказаних студентів. Для
+    незареєстрованого студента створюється «віртуальний» запит без студента,
+    а StudentRequestMapping зберігає зв'язок до його реєстрації.
+    """
+    columns = resolve_columns(reader.columns, THEME_COLUMNS, THEME_OPTIONAL_COLUMNS)
+
+    result = ImportResult()
+    state = ThemeImport(result)
+    for chunk in reader.chunks(columns):
+        with transaction.atomic():
+            state.run(chunk)
+        _report(progress, chunk, result)
+
+    _themes_written(state, result)
+    return result
+
+
+def plan_themes(reader, progress=None):
+    """
+    Dry-run імпорту тем: перевіряє весь файл і порівнює його з БД, нічого
+    не записуючи. apply_themes() застосовує отриманий план.
+    """
+    columns = resolve_columns(reader.columns, THEME_COLUMNS, THEME_OPTIONAL_COLUMNS)
+
+    result = ImportResult()
+    state = ThemeImport(result)
+    rows = []
+    for chunk in reader.chunks(columns):
+        rows.extend(state.group(chunk))
+        _report(progress, chunk, result)
+    rows, summary = state.diff(rows)
+    return ImportPlan.build(result, [asdict(row) for row in rows], summary)
+
+
+def apply_themes(plan, progress=None):
+    """Записує теми й запити з плану plan_themes() пакетами, як import_themes()."""
+    result = plan.result()
+    state = ThemeImport(result)
+    _apply_in_batches([ThemeRow(**item) for item in plan.items], state.write, result, progress)
+    _themes_written(state, result)
+    return result
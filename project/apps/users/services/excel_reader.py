@@ -0,0 +1,89 @@
+"""
+Потокове читання Excel-файлів імпорту без завантаження всієї книги в пам'ять.
+
+openpyxl у режимі read_only розбирає аркуш по рядку, тож ExcelReader тримає
+в пам'яті лише поточний пакет записів (CHUNK_SIZE рядків) — пікова пам'ять
+імпорту не залежить від розміру файлу. Записи вже нормалізовані: значення
+потрібних колонок як обрізані рядки ('' для порожніх клітинок).
+"""
+from dataclasses import dataclass
+
+from openpyxl import load_workbook
+
+CHUNK_SIZE = 500
+# Перший рядок аркуша — заголовок, рядки Excel нумеруються з 1
+HEADER_ROW = 1
+
+
+@dataclass(frozen=True)
+class Record:
+    row: int  # номер рядка в Excel
+    values: dict  # {очікувана назва колонки: текст}
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+
+def cell_text(value):
+    """Текст клітинки: None і 'nan' — порожній рядок, ціле число без '.0'."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return '' if text.lower() == 'nan' else text
+
+
+class ExcelReader:
+    """
+    Перший аркуш файлу: columns — заголовки, chunks(fields) — пакети Record.
+    Використовується як контекстний менеджер, щоб закрити файл книги.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.workbook = load_workbook(file, read_only=True, data_only=True)
+        self.sheet = self.workbook.worksheets[0]
+        # Кількість рядків даних за розміром, записаним у файлі (None, якщо його немає) —
+        # лише оцінка для прогресу імпорту
+        declared = self.sheet.max_row
+        self.total_rows = max(declared - HEADER_ROW, 0) if declared else None
+        # Розмір аркуша у файлі може бути записаний невірно — читаємо до останнього рядка
+        self.sheet.reset_dimensions()
+        header = next(self.sheet.iter_rows(min_row=HEADER_ROW, max_row=HEADER_ROW, values_only=True), ())
+        self.columns = [cell_text(value) for value in header]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.workbook.close()
+
+    def chunks(self, fields):
+        """
+        Пакети записів з колонок fields ({назва: колонка у файлі або None}).
+        Повністю порожні рядки пропускаються, номери рядків зберігаються.
+        """
+        positions = {
+            name: self.columns.index(column) if column is not None else None
+            for name, column in fields.items()
+        }
+        chunk = []
+        for row, cells in enumerate(
+            self.sheet.iter_rows(min_row=HEADER_ROW + 1, values_only=True), start=HEADER_ROW + 1,
+        ):
+            values = {
+                name: cell_text(cells[position]) if position is not None and position < len(cells) else ''
+                for name, position in positions.items()
+            }
+            if not any(values.values()):
+                continue
+            chunk.append(Record(row, values))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,253 @@
+"""
+Фонові завдання імпорту Excel-файлів.
+
+Сторінка імпорту лише зберігає файл у ImportJob (enqueue) і одразу отримує
+id завдання. Черга — сама таблиця ImportJob: команда run_import_jobs забирає
+найстаріше завдання в черзі (SELECT ... FOR UPDATE SKIP LOCKED, тож воркерів
+може бути кілька) і виконує імпорт з excel_import. Після кожного пакета
+рядків у завдання записуються лічильники і перші помилки, а status_json()
+віддає їх сторінці, що опитує стан, разом з оцінкою часу до завершення.
+
+Dry-run (викладачі й теми): воркер лише перевіряє файл і зберігає в
+завданні план і зведення змін (статус «Очікує підтвердження»), файл
+видаляється. Після confirm() завдання знову стає в чергу, і воркер
+застосовує збережений план, не читаючи файл повторно.
+
+Завдання, яке не оновлювалося STALE_AFTER (воркер зупинився посеред
+імпорту), повертається в чергу: імпорт безпечно повторювати з початку.
+"""
+import logging
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.users.models import ImportJob
+
+from . import excel_import
+from .excel_reader import ExcelReader
+
+logger = logging.getLogger(__name__)
+
+# Скільки помилок зберігати в завданні для показу під час імпорту
+ERROR_PREVIEW = 20
+# Ліміт помилок у підсумковому повідомленні (None — усі), як раніше у views
+MESSAGE_ERROR_LIMITS = {
+    ImportJob.KIND_TEACHERS: 10,
+    ImportJob.KIND_STUDENTS: 10,
+    ImportJob.KIND_THEMES: None,
+}
+STALE_AFTER = timedelta(minutes=30)
+# Імпорти, для яких є dry-run з підтвердженням
+PREVIEW_KINDS = {ImportJob.KIND_TEACHERS, ImportJob.KIND_THEMES}
+
+
+def enqueue(kind, upload, user=None, dry_run=False):
+    """Зберігає завантажений файл і ставить завдання в чергу."""
+    return ImportJob.objects.create(
+        kind=kind,
+        file=upload,
+        file_name=upload.name[:255],
+        dry_run=dry_run and kind in PREVIEW_KINDS,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def confirm(job_id):
+    """Ставить у чергу застосування плану dry-run. False, якщо завдання не чекає підтвердження."""
+    return bool(ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_PREVIEW).update(
+        status=ImportJob.STATUS_QUEUED, dry_run=False,
+    ))
+
+
+def _import(kind, reader, progress):
+    # admin імпортує цей модуль у views, тому довідники кафедр — всередині функції
+    from apps.users.admin import ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES
+
+    if kind == ImportJob.KIND_TEACHERS:
+        return excel_import.import_teachers(reader, ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES, progress)
+    if kind == ImportJob.KIND_STUDENTS:
+        return excel_import.import_students(reader, ALLOWED_DEPARTMENTS, progress)
+    return excel_import.import_themes(reader, progress)
+
+
+def _plan(kind, reader, progress):
+    from apps.users.admin import ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES
+
+    if kind == ImportJob.KIND_TEACHERS:
+        return excel_import.plan_teachers(reader, ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES, progress)
+    return excel_import.plan_themes(reader, progress)
+
+
+def _apply(kind, plan, progress):
+    if kind == ImportJob.KIND_TEACHERS:
+        return excel_import.apply_teachers(plan, progress)
+    return excel_import.apply_themes(plan, progress)
+
+
+def requeue_stale():
+    """Повертає в чергу завдання, воркер яких перестав звітувати."""
+    return ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=ImportJob.STATUS_QUEUED)
+
+
+def claim_next():
+    """Забирає найстаріше завдання в черзі і позначає його як таке, що виконується."""
+    with transaction.atomic():
+        qs = ImportJob.objects.filter(status=ImportJob.STATUS_QUEUED).order_by('created_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        job = qs.first()
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = job.heartbeat_at = now
+        job.processed_rows = job.success_count = job.error_count = 0
+        job.errors = []
+        job.message = ''
+        job.save(update_fields=[
+            'status', 'started_at', 'heartbeat_at', 'processed_rows', 'success_count', 'error_count', 'errors',
+            'message',
+        ])
+    return job
+
+
+def _finish(job, status, message, result=None):
+    job.status = status
+    job.message = message
+    job.finished_at = job.heartbeat_at = timezone.now()
+    fields = ['status', 'message', 'finished_at', 'heartbeat_at']
+    if result is not None:
+        job.success_count, job.error_count = result.success_count, result.error_count
+        job.errors = result.error_lines()[:ERROR_PREVIEW]
+        fields += ['success_count', 'error_count', 'errors']
+        if job.total_rows is not None and job.processed_rows > job.total_rows:
+            job.total_rows = job.processed_rows
+            fields.append('total_rows')
+    job.save(update_fields=fields)
+
+
+def _preview(job, plan):
+    """Зберігає план dry-run і зведення; завдання чекає підтвердження."""
+    result = plan.result()
+    job.plan = plan.as_json()
+    job.summary = plan.summary
+    lines = result.error_lines()
+    message = f'Перевірку завершено. Помилок у файлі: {result.error_count}'
+    if lines:
+        message += '\nПомилки:\n' + '\n'.join(lines)
+    ImportJob.objects.filter(pk=job.pk).update(plan=job.plan, summary=job.summary)
+    _finish(job, ImportJob.STATUS_PREVIEW, message, result)
+
+
+def _read_file(job, progress):
+    """Імпорт (або dry-run) з файлу завдання. None — якщо збережено план dry-run."""
+    # openpyxl потрібен файл з довільним доступом, а сховище може бути віддаленим
+    with job.file.open('rb') as source, tempfile.TemporaryFile() as local:
+        shutil.copyfileobj(source, local)
+        local.seek(0)
+        with ExcelReader(local) as reader:
+            job.total_rows = reader.total_rows
+            ImportJob.objects.filter(pk=job.pk).update(total_rows=reader.total_rows)
+            if job.dry_run:
+                _preview(job, _plan(job.kind, reader, progress))
+                return None
+            return _import(job.kind, reader, progress)
+
+
+def _apply_plan(job, progress):
+    plan = excel_import.ImportPlan.from_json(job.plan)
+    job.total_rows = len(plan.items)
+    ImportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+    result = _apply(job.kind, plan, progress)
+    # План застосовано — більше не потрібен
+    job.plan = None
+    ImportJob.objects.filter(pk=job.pk).update(plan=None)
+    return result
+
+
+def run(job):
+    """Виконує імпорт завдання, записуючи прогрес після кожного пакета."""
+    def progress(processed_rows, result):
+        job.processed_rows = processed_rows
+        ImportJob.objects.filter(pk=job.pk).update(
+            processed_rows=processed_rows,
+            success_count=result.success_count,
+            error_count=result.error_count,
+            errors=result.error_lines()[:ERROR_PREVIEW],
+            heartbeat_at=timezone.now(),
+        )
+
+    try:
+        if job.plan is not None:
+            result = _apply_plan(job, progress)
+        else:
+            result = _read_file(job, progress)
+    except excel_import.ImportFileError as e:
+        _finish(job, ImportJob.STATUS_FAILED, str(e))
+    except Exception as e:
+        logger.exception(f'Помилка фонового імпорту {job.pk}: {e}')
+        _finish(job, ImportJob.STATUS_FAILED, f'Помилка обробки файлу: {str(e)}')
+    else:
+        # None — dry-run: план уже збережено і завдання чекає підтвердження
+        if result is not None:
+            if result.errors:
+                logger.warning(f"Помилки імпорту {job.pk} ({job.kind}): {result.error_lines()[:5]}")
+            _finish(job, ImportJob.STATUS_DONE, result.message(MESSAGE_ERROR_LIMITS[job.kind]), result)
+    # Завантажений файл містить персональні дані і після імпорту не потрібен
+    # (save=False: лічильники прогресу в пам'яті могли не оновлюватися)
+    job.file.delete(save=False)
+    ImportJob.objects.filter(pk=job.pk).update(file='')
+    return job
+
+
+def run_pending(max_jobs=None):
+    """Виконує завдання з черги, доки вона не спорожніє. Повертає кількість виконаних."""
+    requeue_stale()
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_next()
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def eta_seconds(job, now=None):
+    """Оцінка часу до завершення за середньою швидкістю з початку імпорту."""
+    if job.status != ImportJob.STATUS_RUNNING or not job.total_rows or not job.processed_rows:
+        return None
+    remaining = job.total_rows - job.processed_rows
+    if remaining <= 0:
+        return 0
+    elapsed = ((now or timezone.now()) - job.started_at).total_seconds()
+    return round(elapsed / job.processed_rows * remaining)
+
+
+def status_json(job):
+    """Стан завдання для сторінки імпорту, що його опитує."""
+    data = {
+        'job_id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'success_count': job.success_count,
+        'error_count': job.error_count,
+        'errors': job.errors,
+        'eta_seconds': eta_seconds(job),
+    }
+    if job.awaits_confirmation:
+        data.update(finished=True, preview=True, summary=job.summary, message=job.message)
+    elif job.status == ImportJob.STATUS_DONE:
+        data.update(success=True, message=job.message)
+    elif job.status == ImportJob.STATUS_FAILED:
+        data.update(success=False, error=job.message)
+    return data
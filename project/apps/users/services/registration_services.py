@@ -3,6 +3,7 @@ from django.conf import settings
 import requests
 import logging
 from django.contrib import messages
+from django.db.models import Q
 from django.shortcuts import redirect
 from apps.catalog.models import (OnlyStudent, OnlyTeacher)
 
@@ -151,304 +152,253 @@ def create_student_profile(user, group_code, email, faculty, department=None):
                 logger.error("No groups available in DB for student creation.")
 
 
-def create_automatic_requests_for_student(user, group_code):
+# Мапінг скорочень кафедр до повних назв
+DEPARTMENT_MAPPING = {
+    'РКС': 'Радіоелектронних і комп\'ютерних систем',
+    'РКТ': 'Радіофізики та комп\'ютерних технологій',
+    'СП': 'Системного проектування',
+    'КОІТ': 'Оптоелектроніки та інформаційних технологій',
+    'СНПЕ': 'Сенсорної та напівпровідникової електроніки',
+    'ФБМЕ': 'Фізичної та біомедичної електроніки',
+}
+
+
+def _student_excel_mapping(user, group_code):
     """
-    Автоматично створює запити для студента на основі StudentRequestMapping
+    StudentExcelMapping студента в групі реєстрації: рівність ключа імені
+    (індекс name_key + group), по батькові перевіряється серед знайдених.
     """
-    from apps.users.models import StudentExcelMapping, StudentRequestMapping
-    from apps.catalog.models import Request, TeacherTheme, Slot, Stream
-    from apps.users.models import CustomUser
-    from django.db import transaction
-    
+    from apps.users.models import StudentExcelMapping
+    from . import student_names
+
+    full_name = user.get_full_name_with_patronymic()
+    candidates = StudentExcelMapping.objects.filter(
+        name_key=student_names.name_key(full_name), group=group_code,
+    ).order_by('pk')
+    return next((m for m in candidates if student_names.same_person(m.full_name, full_name)), None)
+
+
+def _student_request_mappings(user):
+    """StudentRequestMapping студента одним запитом за ключами варіантів його імені."""
+    from apps.users.models import StudentRequestMapping
+    from . import student_names
+
+    variants = student_names.user_name_variants(user)
+    candidates = StudentRequestMapping.objects.filter(
+        student_key__in={student_names.name_key(variant) for variant in variants},
+    ).order_by('pk')
+    return [
+        mapping for mapping in candidates
+        if any(student_names.same_person(mapping.student_name, variant) for variant in variants)
+    ]
+
+
+def _assign_department(user, student_mapping):
+    """Призначає студенту кафедру з StudentExcelMapping, якщо її ще немає."""
+    from apps.catalog.models import Department
+
+    if not student_mapping.department:
+        return
+    department_name = DEPARTMENT_MAPPING.get(student_mapping.department, student_mapping.department)
     try:
-        logger.info(f"=== STARTING create_automatic_requests_for_student ===")
-        logger.info(f"User: {user.get_full_name_with_patronymic()}, ID: {user.id}, group: {group_code}")
-        
-        # Шукаємо студента в мапінгу
-        logger.info(f"Looking for mapping for student: {user.get_full_name_with_patronymic()}, group: {group_code}")
-        
-        # Спочатку шукаємо без групи, щоб перевірити чи є студент в мапінгу взагалі
-        student_mapping = StudentExcelMapping.objects.filter(
-            last_name__icontains=user.last_name,
-            first_name__icontains=user.first_name
-        ).first()
-        
-        if not student_mapping and user.patronymic:
-            logger.info(f"Trying with patronymic: {user.patronymic}")
-            student_mapping = StudentExcelMapping.objects.filter(
-                last_name__icontains=user.last_name,
-                first_name__icontains=user.first_name,
-                patronymic__icontains=user.patronymic
-            ).first()
-        
-        # Якщо знайшли студента, перевіряємо групу
-        if student_mapping:
-            if student_mapping.group != group_code:
-                logger.warning(f"Student {student_mapping.full_name} found but group mismatch: mapping has '{student_mapping.group}', registration has '{group_code}'")
-                # Спробуємо знайти з правильною групою
-                student_mapping = StudentExcelMapping.objects.filter(
-                    last_name__icontains=user.last_name,
-                    first_name__icontains=user.first_name,
-                    group=group_code
-                ).first()
-                
-                if not student_mapping and user.patronymic:
-                    student_mapping = StudentExcelMapping.objects.filter(
-                        last_name__icontains=user.last_name,
-                        first_name__icontains=user.first_name,
-                        patronymic__icontains=user.patronymic,
-                        group=group_code
-                    ).first()
-        
-        if not student_mapping:
-            logger.info(f"No StudentExcelMapping found for student {user.get_full_name_with_patronymic()}")
-            # Логуємо всі доступні мапінги для діагностики
-            all_mappings = StudentExcelMapping.objects.filter(group=group_code)
-            logger.info(f"Available StudentExcelMapping for group {group_code}: {list(all_mappings.values('last_name', 'first_name', 'patronymic', 'department'))}")
-            
-            # ВАЖЛИВО! Тепер шукаємо в StudentRequestMapping
-            logger.info(f"=== SEARCHING in StudentRequestMapping ===")
-            request_mappings = StudentRequestMapping.objects.filter(
-                student_name__icontains=user.get_full_name_with_patronymic()
-            ) | StudentRequestMapping.objects.filter(
-                student_name__icontains=f"{user.last_name} {user.first_name}"
+        department = Department.objects.get(department_name__iexact=department_name)
+    except Department.DoesNotExist:
+        logger.warning(f"Department {department_name} (mapped from {student_mapping.department}) not found")
+        return
+    student_profile = user.get_profile()
+    if student_profile:
+        if not student_profile.department:
+            student_profile.department = department
+            student_profile.save()
+            logger.info(f"Assigned department {department.department_name} to student {user.get_full_name_with_patronymic()}")
+        else:
+            logger.info(f"Student {user.get_full_name_with_patronymic()} already has department {student_profile.department.department_name}")
+
+
+class _RequestMappingContext:
+    """
+    Усе, що потрібно для мапінгів студента, завантажене наперед: викладачі за
+    email, потоки за кодом, теми за (викладач, theme_key), слоти за
+    (викладач, потік), а запити — віртуальні (без студента) і вже наявні
+    запити студента — за (викладач, тема). Шість запитів незалежно від
+    кількості мапінгів.
+    """
+
+    def __init__(self, user, mappings):
+        from apps.catalog.models import OnlyTeacher, Request, Slot, Stream, TeacherTheme
+        from apps.catalog.services.theme_search import theme_key
+
+        # Ключ — email у нижньому регістрі: колація MySQL не враховує регістр
+        self.teachers = {
+            teacher.teacher_id.email.lower(): teacher
+            for teacher in OnlyTeacher.objects.filter(
+                teacher_id__email__in={m.teacher_email.lower() for m in mappings}, teacher_id__role='Викладач',
+            ).select_related('teacher_id')
+        }
+        self.streams = Stream.objects.in_bulk({m.stream for m in mappings}, field_name='stream_code')
+        teacher_pks = [teacher.pk for teacher in self.teachers.values()]
+
+        self.themes = {}
+        for theme in TeacherTheme.objects.filter(
+            teacher_id__in=teacher_pks, theme_key__in={theme_key(m.theme) for m in mappings},
+        ).order_by('pk'):
+            self.themes.setdefault((theme.teacher_id_id, theme.theme_key), theme)
+
+        self.slots = {
+            (slot.teacher_id_id, slot.stream_id_id): slot
+            for slot in Slot.objects.filter(teacher_id__in=teacher_pks, stream_id__in=self.streams.values())
+        }
+
+        self.virtual_requests = {}
+        self.student_requests = {}
+        candidates = Request.objects.filter(
+            teacher_id__in=teacher_pks, teacher_theme__in=[theme.pk for theme in self.themes.values()],
+        )
+        if user.pk:
+            candidates = candidates.filter(Q(student_id__isnull=True) | Q(student_id=user))
+        else:
+            candidates = candidates.filter(student_id__isnull=True)
+        for request in candidates.order_by('pk'):
+            key = (request.teacher_id_id, request.teacher_theme_id)
+            if request.student_id_id is None:
+                self.virtual_requests.setdefault(key, []).append(request)
+            else:
+                self.student_requests.setdefault(key, request)
+
+    def take_virtual_request(self, teacher_pk, theme_pk, topic):
+        """
+        Віртуальний запит теми: спершу з тією ж назвою, далі з назвою, що
+        містить перші 50 символів теми, інакше будь-який. Взятий запит
+        більше не пропонується іншим мапінгам.
+        """
+        candidates = self.virtual_requests.get((teacher_pk, theme_pk), [])
+        prefix = topic[:50].casefold()
+        for match in (
+            lambda r: r.topic_name == topic,
+            lambda r: prefix in (r.topic_name or '').casefold(),
+            lambda r: True,
+        ):
+            for request in candidates:
+                if match(request):
+                    candidates.remove(request)
+                    return request
+        return None
+
+
+def _apply_request_mapping(user, request_mapping, context):
+    """Запит студента за одним мапінгом: займає віртуальний запит або створює новий."""
+    from apps.catalog.models import Request, TeacherTheme
+    from apps.catalog.services.theme_search import theme_key
+    from django.db import transaction
+
+    teacher_profile = context.teachers.get(request_mapping.teacher_email.lower())
+    if teacher_profile is None:
+        logger.warning(f"Teacher {request_mapping.teacher_email} not found")
+        return
+    stream = context.streams.get(request_mapping.stream)
+    if stream is None:
+        logger.warning(f"Stream {request_mapping.stream} not found")
+        return
+
+    key = (teacher_profile.pk, theme_key(request_mapping.theme))
+    teacher_theme = context.themes.get(key)
+    if teacher_theme is None:
+        logger.info(f"Teacher theme not found, creating new one")
+        teacher_theme = TeacherTheme.objects.create(
+            teacher_id=teacher_profile,
+            theme=request_mapping.theme,
+            theme_description=request_mapping.theme_description,
+            is_active=True,
+            is_occupied=False,  # Займається нижче, разом із запитом
+        )
+        teacher_theme.streams.add(stream)
+        context.themes[key] = teacher_theme
+        logger.info(f"Created new teacher theme with ID: {teacher_theme.id}")
+
+    slot = context.slots.get((teacher_profile.pk, stream.pk))
+    if slot is None:
+        logger.warning(f"No slot found for teacher {teacher_profile} and stream {stream}")
+        return
+    if slot.occupied >= slot.quota:
+        logger.warning(f"Slot for teacher {teacher_profile} and stream {stream} is full ({slot.occupied}/{slot.quota})")
+        return
+
+    virtual_request = context.take_virtual_request(teacher_profile.pk, teacher_theme.pk, request_mapping.theme)
+    motivation = f'Автоматично створений запит для теми: {request_mapping.theme}'
+    with transaction.atomic():
+        if not user.pk:
+            user.save()
+        if virtual_request:
+            # Віртуальний запит імпорту тем переходить до зареєстрованого студента
+            virtual_request.student_id = user
+            virtual_request.request_status = 'Активний'
+            virtual_request.motivation_text = motivation
+            virtual_request.slot = slot
+            virtual_request.topic_description = request_mapping.theme_description
+            virtual_request.save()
+            logger.info(f"Updated virtual request {virtual_request.id} with student {user.get_full_name_with_patronymic()}")
+        else:
+            # Як update_or_create, але наявний запит студента вже завантажено.
+            # Місце в слоті займається атомарно в Request.save() (і в slot у пам'яті)
+            request = context.student_requests.get((teacher_profile.pk, teacher_theme.pk))
+            created = request is None
+            if created:
+                request = Request(teacher_id=teacher_profile, teacher_theme=teacher_theme, student_id=user)
+                context.student_requests[(teacher_profile.pk, teacher_theme.pk)] = request
+            request.request_status = 'Активний'
+            request.motivation_text = motivation
+            request.slot = slot
+            request.topic_name = request_mapping.theme
+            request.topic_description = request_mapping.theme_description
+            request.save()
+            logger.info(
+                f"{'Created' if created else 'Updated'} automatic request for student "
+                f"{user.get_full_name_with_patronymic()} with theme {request_mapping.theme}"
             )
-            
-            logger.info(f"Found {request_mappings.count()} StudentRequestMapping entries")
-            for mapping in request_mappings:
-                logger.info(f"  - Student: {mapping.student_name}, Stream: {mapping.stream}, Theme: {mapping.theme}")
-            
-            if not request_mappings.exists():
-                logger.info(f"No StudentRequestMapping found either.")
-                # Логуємо всі доступні StudentRequestMapping для діагностики
-                all_request_mappings = StudentRequestMapping.objects.all()[:10]  # Перші 10 для прикладу
-                logger.info(f"Sample StudentRequestMapping entries: {list(all_request_mappings.values('student_name', 'stream', 'theme'))}")
-                logger.info(f"Exiting create_automatic_requests_for_student.")
-                return None
-        
+        teacher_theme.claim()
+
+
+def create_automatic_requests_for_student(user, group_code):
+    """
+    Автоматично створює запити для студента на основі StudentRequestMapping.
+
+    Мапінги студента шукаються рівністю індексованих ключів імені
+    (services.student_names), а викладачі, потоки, теми, слоти й віртуальні
+    запити для всіх мапінгів завантажуються наперед, тож кількість читань
+    з БД не залежить від кількості мапінгів.
+    """
+    try:
+        full_name = user.get_full_name_with_patronymic()
+        logger.info(f"Looking for mappings for student: {full_name}, ID: {user.id}, group: {group_code}")
+
+        student_mapping = _student_excel_mapping(user, group_code)
+        request_mappings = _student_request_mappings(user)
+        if not student_mapping and not request_mappings:
+            logger.info(f"No StudentExcelMapping or StudentRequestMapping found for student {full_name}")
+            return None
+
         # Якщо є StudentExcelMapping - призначаємо кафедру
         if student_mapping:
             logger.info(f"Found StudentExcelMapping for student: {student_mapping.full_name}, department: {student_mapping.department}")
-            
-            # Автоматично призначаємо кафедру студенту
-            if student_mapping.department:
-                from apps.catalog.models import Department
-            
-            # Мапінг скорочень кафедр до повних назв
-            DEPARTMENT_MAPPING = {
-                'РКС': 'Радіоелектронних і комп\'ютерних систем',
-                'РКТ': 'Радіофізики та комп\'ютерних технологій', 
-                'СП': 'Системного проектування',
-                'КОІТ': 'Оптоелектроніки та інформаційних технологій',
-                'СНПЕ': 'Сенсорної та напівпровідникової електроніки',
-                'ФБМЕ': 'Фізичної та біомедичної електроніки',
-            }
-            
-            department_name = DEPARTMENT_MAPPING.get(student_mapping.department, student_mapping.department)
-            try:
-                department = Department.objects.get(department_name__iexact=department_name)
-                student_profile = user.get_profile()
-                if student_profile:
-                    # Перевіряємо, чи кафедра ще не призначена
-                    if not student_profile.department:
-                        student_profile.department = department
-                        student_profile.save()
-                        logger.info(f"Assigned department {department.department_name} to student {user.get_full_name_with_patronymic()}")
-                    else:
-                        logger.info(f"Student {user.get_full_name_with_patronymic()} already has department {student_profile.department.department_name}")
-            except Department.DoesNotExist:
-                logger.warning(f"Department {department_name} (mapped from {student_mapping.department}) not found")
-        
-        # Шукаємо запити для створення - пробуємо різні варіанти імені
-        logger.info(f"=== SEARCHING StudentRequestMapping for automatic requests ===")
-        
-        # Варіанти пошуку імені
-        search_variants = [
-            user.get_full_name_with_patronymic(),  # "Камаренко Вікторія Іванівна"
-            f"{user.last_name} {user.first_name}",  # "Камаренко Вікторія"
-            f"{user.first_name} {user.last_name}",  # "Вікторія Камаренко"
-        ]
-        
-        student_requests = StudentRequestMapping.objects.none()  # Порожній QuerySet
-        
-        for variant in search_variants:
-            logger.info(f"Searching for: '{variant}'")
-            found_requests = StudentRequestMapping.objects.filter(student_name__icontains=variant)
-            logger.info(f"  Found {found_requests.count()} matches")
-            student_requests = student_requests | found_requests  # Об'єднуємо результати
-        
-        student_requests = student_requests.distinct()  # Видаляємо дублікати
-        logger.info(f"Total unique request mappings found: {student_requests.count()}")
-        
-        for mapping in student_requests:
-            logger.info(f"  - Student: '{mapping.student_name}', Stream: '{mapping.stream}', Theme: '{mapping.theme}'")
-        
-        for request_mapping in student_requests:
+            _assign_department(user, student_mapping)
+
+        if not request_mappings:
+            return None
+
+        context = _RequestMappingContext(user, request_mappings)
+        for request_mapping in request_mappings:
             try:
-                logger.info(f"=== PROCESSING mapping: {request_mapping.student_name} -> {request_mapping.theme} ===")
-                
-                # Знаходимо викладача
-                logger.info(f"Looking for teacher: {request_mapping.teacher_email}")
-                teacher_user = CustomUser.objects.get(email=request_mapping.teacher_email, role='Викладач')
-                teacher_profile = teacher_user.catalog_teacher_profile
-                logger.info(f"Found teacher: {teacher_user.get_full_name()}")
-                
-                # Знаходимо потік
-                stream = Stream.objects.get(stream_code=request_mapping.stream)
-                
-                # Знаходимо тему викладача
-                logger.info(f"Looking for teacher theme with teacher={teacher_profile.pk}, theme contains '{request_mapping.theme[:50]}...'")
-                teacher_theme = TeacherTheme.objects.filter(
-                    teacher_id=teacher_profile,
-                    theme__icontains=request_mapping.theme
-                ).first()
-                
-                if not teacher_theme:
-                    logger.info(f"Teacher theme not found, creating new one")
-                    # Створюємо тему, якщо її немає
-                    teacher_theme = TeacherTheme.objects.create(
-                        teacher_id=teacher_profile,
-                        theme=request_mapping.theme,
-                        theme_description=request_mapping.theme_description,
-                        is_active=True,
-                        is_occupied=False  # ВИПРАВЛЕНО: Спочатку не зайнята
-                    )
-                    # Додаємо тему до потоку
-                    teacher_theme.streams.add(stream)
-                    logger.info(f"Created new teacher theme with ID: {teacher_theme.id}")
-                else:
-                    logger.info(f"Found existing teacher theme with ID: {teacher_theme.id}")
-                
-                # Знаходимо слот
-                logger.info(f"Looking for slot with teacher={teacher_profile.pk}, stream={stream.stream_code}")
-                slot = Slot.objects.filter(
-                    teacher_id=teacher_profile,
-                    stream_id=stream
-                ).first()
-                
-                if not slot:
-                    logger.warning(f"No slot found for teacher {teacher_profile} and stream {stream}")
-                    # Логуємо всі слоти цього викладача
-                    all_slots = Slot.objects.filter(teacher_id=teacher_profile).values('stream_id__stream_code', 'quota', 'occupied')
-                    logger.info(f"Available slots for teacher: {list(all_slots)}")
-                    continue
-                
-                logger.info(f"Found slot: quota={slot.quota}, occupied={slot.occupied}")
-                
-                # Перевіряємо чи є вільні місця
-                if slot.occupied >= slot.quota:
-                    logger.warning(f"Slot for teacher {teacher_profile} and stream {stream} is full ({slot.occupied}/{slot.quota})")
-                    continue
-                
-                # Спочатку шукаємо віртуальний запит (без student_id)
-                logger.info(f"Searching for virtual request with teacher={teacher_profile.pk}, theme={teacher_theme.id}, topic='{request_mapping.theme}'")
-                
-                # Спробуємо різні варіанти пошуку віртуального запиту
-                virtual_request = Request.objects.filter(
-                    teacher_id=teacher_profile,
-                    teacher_theme=teacher_theme,
-                    student_id__isnull=True,
-                    topic_name=request_mapping.theme
-                ).first()
-                
-                # Якщо не знайшли точний збіг, спробуємо пошук за частковим збігом
-                if not virtual_request:
-                    virtual_request = Request.objects.filter(
-                        teacher_id=teacher_profile,
-                        teacher_theme=teacher_theme,
-                        student_id__isnull=True,
-                        topic_name__icontains=request_mapping.theme[:50]  # Перші 50 символів
-                    ).first()
-                
-                # Якщо все ще не знайшли, спробуємо пошук без topic_name
-                if not virtual_request:
-                    virtual_request = Request.objects.filter(
-                        teacher_id=teacher_profile,
-                        teacher_theme=teacher_theme,
-                        student_id__isnull=True
-                    ).first()
-                
-                if virtual_request:
-                    logger.info(f"Found virtual request ID: {virtual_request.id}, topic: '{virtual_request.topic_name}'")
-                else:
-                    logger.info(f"No virtual request found for teacher {teacher_profile.pk} and theme {teacher_theme.id}")
-                    # Логуємо всі віртуальні запити цього викладача для діагностики
-                    all_virtual = Request.objects.filter(
-                        teacher_id=teacher_profile,
-                        student_id__isnull=True
-                    ).values('id', 'topic_name', 'teacher_theme__theme')
-                    logger.info(f"All virtual requests for teacher: {list(all_virtual)}")
-                
-                # Обгортаємо критичні операції в транзакцію
-                with transaction.atomic():
-                    if virtual_request:
-                        # Переконуємося що user збережений в БД
-                        if not user.pk:
-                            user.save()
-                        
-                        # Оновлюємо віртуальний запит реальним студентом
-                        virtual_request.student_id = user
-                        virtual_request.request_status = 'Активний'
-                        virtual_request.motivation_text = f'Автоматично створений запит для теми: {request_mapping.theme}'
-                        virtual_request.slot = slot
-                        virtual_request.topic_description = request_mapping.theme_description
-                        virtual_request.save()
-                        request_obj = virtual_request
-                        created = False
-                        logger.info(f"Updated virtual request {virtual_request.id} with student {user.get_full_name_with_patronymic()}")
-                    else:
-                        # Переконуємося що user збережений в БД
-                        if not user.pk:
-                            user.save()
-                            
-                        # Створюємо новий запит
-                        request_obj, created = Request.objects.update_or_create(
-                            teacher_id=teacher_profile,
-                            teacher_theme=teacher_theme,
-                            student_id=user,
-                            defaults={
-                                'request_status': 'Активний',
-                                'motivation_text': f'Автоматично створений запит для теми: {request_mapping.theme}',
-                                'slot': slot,
-                                'topic_name': request_mapping.theme,
-                                'topic_description': request_mapping.theme_description
-                            }
-                        )
-                    
-                    if request_obj:
-                        if created and slot.occupied < slot.quota:
-                            slot.occupied += 1
-                            slot.save()
-                            logger.info(f"Updated slot occupancy to {slot.occupied}/{slot.quota}")
-                        elif virtual_request:
-                            logger.info(f"Virtual request updated, slot occupancy remains: {slot.occupied}/{slot.quota}")
-                        
-                        # Позначаємо тему як зайняту
-                        teacher_theme.is_occupied = True
-                        teacher_theme.save()
-                        
-                        if virtual_request:
-                            logger.info(f"Updated virtual request for student {user.get_full_name_with_patronymic()} with theme {request_mapping.theme}")
-                        elif created:
-                            logger.info(f"Created new automatic request for student {user.get_full_name_with_patronymic()} with theme {request_mapping.theme}")
-                        else:
-                            logger.info(f"Updated existing automatic request for student {user.get_full_name_with_patronymic()} with theme {request_mapping.theme}")
-                    
-                    # ВИПРАВЛЕНО: Не повертаємо одразу, щоб обробити всі мапінги
-                    logger.info(f"Successfully processed mapping for {user.get_full_name_with_patronymic()}")
-                
+                logger.info(f"Processing mapping: {request_mapping.student_name} -> {request_mapping.theme}")
+                _apply_request_mapping(user, request_mapping, context)
             except Exception as e:
-                logger.error(f"Error creating automatic request for student {user.get_full_name_with_patronymic()}: {str(e)}")
-                continue
-        
-        # ВИПРАВЛЕНО: Повертаємо True, якщо хоча б один запит було оброблено
-        if student_requests.exists():
-            logger.info(f"Successfully processed {student_requests.count()} mappings for student {user.get_full_name_with_patronymic()}")
-            return True
-                
+                logger.error(f"Error creating automatic request for student {full_name}: {str(e)}")
+
+        logger.info(f"Successfully processed {len(request_mappings)} mappings for student {full_name}")
+        return True
+
     except Exception as e:
         logger.error(f"Error in create_automatic_requests_for_student: {str(e)}")
-    
+
     return None  # Повертаємо None, якщо запит не було створено
 
 
@@ -468,16 +418,7 @@ def create_teacher_profile(user, job_title, department_obj):
     
     logger.info(f"Creating teacher profile for {user.email} with department: {department_obj.department_name}")
 
-    # Формуємо базовий profile_link
-    email = user.email.split('@')[0]  # take only the "first.last" part
-    first_name, last_name = email.split('.')  # split into first and last
-    first_initial = first_name[0]  # take first letter of first name
-    base_link = f"{last_name}-{first_initial}"
-
-
-    # Формуємо повне посилання
-    full_url = f"https://{faculty_short_name}.lnu.edu.ua/employee/{base_link}"
-
+    full_url = teacher_profile_url(user.email, faculty_short_name)
     if url_exists(full_url):
         profile_link = full_url
     else:
@@ -507,6 +448,17 @@ def create_teacher_profile(user, job_title, department_obj):
         logger.error(f"Error creating OnlyTeacher for user {user.email}: {str(e)}", exc_info=True)
         raise  # Передаємо помилку далі
 
+def teacher_profile_url(email, faculty_short_name):
+    """
+    Очікуване посилання на сторінку викладача на сайті факультету:
+    first.last@lnu.edu.ua -> https://<факультет>.lnu.edu.ua/employee/last-f
+    """
+    local_part = email.split('@')[0]  # take only the "first.last" part
+    first_name, last_name = local_part.split('.')  # split into first and last
+    first_initial = first_name[0]  # take first letter of first name
+    return f"https://{faculty_short_name}.lnu.edu.ua/employee/{last_name}-{first_initial}"
+
+
 def url_exists(url):
     try:
         response = requests.head(url, allow_redirects=True, timeout=5)
@@ -0,0 +1,44 @@
+"""
+Ключі імен студентів для точного пошуку за індексом.
+
+Імена з Excel і з облікового запису відрізняються регістром, апострофами
+(' ’ ʼ `) і пробілами. name_key() зводить ім'я до перших KEY_TOKENS
+нормалізованих слів («прізвище ім'я») — ключ зберігається в індексованих
+полях StudentExcelMapping.name_key і StudentRequestMapping.student_key, і
+реєстрація шукає мапінги рівністю ключа замість ланцюжків icontains.
+По батькові в ключ не входить, бо в Excel воно часто відсутнє; серед
+знайдених за ключем записів same_person() перевіряє решту імені.
+"""
+import unicodedata
+
+KEY_TOKENS = 2
+KEY_MAX_LENGTH = 200
+
+_APOSTROPHES = str.maketrans({
+    '’': "'", 'ʼ': "'", '‘': "'", '`': "'", 'ʹ': "'", '′': "'", '´': "'",
+})
+
+
+def name_tokens(text):
+    """Слова імені без урахування регістру, варіантів апострофа і зайвих пробілів."""
+    return unicodedata.normalize("NFKC", text or "").casefold().translate(_APOSTROPHES).split()
+
+
+def name_key(text):
+    """Ключ імені: перші KEY_TOKENS нормалізованих слів ('' для порожнього імені)."""
+    return " ".join(name_tokens(text)[:KEY_TOKENS])[:KEY_MAX_LENGTH]
+
+
+def same_person(name, other):
+    """
+    Імена збігаються, якщо коротше з них (щонайменше прізвище та ім'я) —
+    початок довшого: «Прізвище Ім'я» відповідає «Прізвище Ім'я По-батькові».
+    """
+    tokens, other_tokens = name_tokens(name), name_tokens(other)
+    length = min(len(tokens), len(other_tokens))
+    return length >= KEY_TOKENS and tokens[:length] == other_tokens[:length]
+
+
+def user_name_variants(user):
+    """Можливі записи імені користувача у файлах: «Прізвище Ім'я По-батькові» і «Ім'я Прізвище»."""
+    return [user.get_full_name_with_patronymic(), f"{user.first_name} {user.last_name}"]
@@ -0,0 +1,568 @@
+import io
+import json
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from apps.catalog.models import Department, OnlyTeacher, Request, Slot, TeacherTheme
+from apps.catalog.services import theme_search
+from apps.catalog.templatetags.catalog_extras import get_profile_picture_url
+from apps.catalog.testing import CatalogFixtureMixin
+from apps.users.admin import ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES
+from apps.users.models import ImportJob, StudentExcelMapping, StudentRequestMapping
+from apps.users.services import avatar, excel_import, excel_reader, import_jobs, student_names
+from apps.users.services.excel_reader import ExcelReader
+from apps.users.services.registration_services import create_automatic_requests_for_student
+
+User = get_user_model()
+
+
+def excel_file(rows, columns=None):
+    """xlsx у пам'яті: рядок заголовків (ключі першого словника) і рядки значень."""
+    columns = columns or list(rows[0])
+    workbook = Workbook()
+    workbook.active.append(columns)
+    for row in rows:
+        workbook.active.append([row.get(column) for column in columns])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class ExcelReaderTestCase(TestCase):
+    def test_chunks_skip_blank_rows_and_keep_row_numbers(self):
+        rows = [
+            {'Група': 'ФЕС-21', 'Кількість': 2.0},
+            {'Група': None, 'Кількість': None},
+            {'Група': '  ФЕІ-22 ', 'Кількість': 'nan'},
+            {'Група': 21, 'Кількість': 1.5},
+        ]
+        with ExcelReader(excel_file(rows), chunk_size=2) as reader:
+            self.assertEqual(reader.columns, ['Група', 'Кількість'])
+            chunks = list(reader.chunks({'group': 'Група', 'count': 'Кількість', 'absent': None}))
+
+        self.assertEqual([[record.row for record in chunk] for chunk in chunks], [[2, 4], [5]])
+        self.assertEqual(chunks[0][0].values, {'group': 'ФЕС-21', 'count': '2', 'absent': ''})
+        self.assertEqual(chunks[0][1].values, {'group': 'ФЕІ-22', 'count': '', 'absent': ''})
+        self.assertEqual(chunks[1][0]['count'], '1.5')
+
+
+class ExcelImportTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        self.sp_department, _ = Department.objects.get_or_create(
+            department_name='Системного проектування', defaults={'short_name': 'СП', 'faculty': self.faculty}
+        )
+        patcher = mock.patch.object(excel_import.registration_services, 'url_exists', return_value=False)
+        self.url_exists = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def teacher_rows(self, count, **overrides):
+        rows = [
+            {
+                'Прізвище': f'Прізвище{i}', "Ім'я": f'Ім{i}', 'По-батькові': '',
+                'Адреса корпоративної скриньки': f'name{i}.surname{i}@lnu.edu.ua', 'Кафедра': 'СП', 'ФЕС-2': 3,
+            }
+            for i in range(count)
+        ]
+        for i, values in overrides.items():
+            rows[int(i)].update(values)
+        return rows
+
+    def import_teachers(self, rows, chunk_size=excel_reader.CHUNK_SIZE):
+        with self.captureOnCommitCallbacks(execute=True), \
+                ExcelReader(excel_file(rows), chunk_size=chunk_size) as reader:
+            return excel_import.import_teachers(reader, ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES)
+
+    def test_teachers_upsert_users_profiles_and_slots(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        rows = self.teacher_rows(4, **{
+            '0': {'Адреса корпоративної скриньки': 'old.teacher@lnu.edu.ua', 'Прізвище': 'Нове'},
+            '2': {'Адреса корпоративної скриньки': 'wrong@gmail.com'},
+            '3': {'Кафедра': 'Невідома'},
+        })
+        result = self.import_teachers(rows)
+
+        self.assertEqual(result.success_count, 2)
+        self.assertEqual(result.error_lines(), [
+            'Рядок 4: Невірний email wrong@gmail.com',
+            f'Рядок 5: Недозволена кафедра "Невідома". Дозволені: {", ".join(ALLOWED_DEPARTMENTS[:6])}',
+        ])
+        self.teacher_user.refresh_from_db()
+        self.assertEqual(self.teacher_user.last_name, 'Нове')
+        new_user = User.objects.get(email='name1.surname1@lnu.edu.ua')
+        self.assertEqual(new_user.role, 'Викладач')
+        for user in (self.teacher_user, new_user):
+            self.assertEqual(OnlyTeacher.objects.get(pk=user.pk).department, self.sp_department)
+            self.assertEqual(Slot.objects.get(teacher_id=user.pk, stream_id=self.stream).quota, 3)
+
+    def test_teachers_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.import_teachers(self.teacher_rows(3))
+        with CaptureQueriesContext(connection) as large:
+            self.import_teachers(self.teacher_rows(30))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Slot.objects.filter(stream_id=self.stream, quota=3).count(), 30)
+
+    def test_teachers_last_row_wins_across_chunks(self):
+        rows = self.teacher_rows(3, **{'2': {'Адреса корпоративної скриньки': 'name0.surname0@lnu.edu.ua', 'ФЕС-2': 5}})
+        result = self.import_teachers(rows, chunk_size=2)
+        self.assertEqual(result.success_count, 3)
+        user = User.objects.get(email='name0.surname0@lnu.edu.ua')
+        self.assertEqual((user.last_name, Slot.objects.get(teacher_id=user.pk).quota), ('Прізвище2', 5))
+
+    def test_teachers_quota_below_occupied_is_row_error(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        Slot.objects.filter(pk=self.slot.pk).update(quota=3, occupied=2)
+        Request.objects.bulk_create([
+            Request(student_id=student, teacher_id=self.teacher, slot=self.slot, request_status='Активний')
+            for student in self.create_students(2)
+        ])
+        result = self.import_teachers(self.teacher_rows(1, **{
+            '0': {'Адреса корпоративної скриньки': 'old.teacher@lnu.edu.ua', 'ФЕС-2': 1},
+        }))
+        self.assertIn('Рядок 2: Помилка створення слоту для ФЕС-2', result.error_lines()[0])
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.quota, self.slot.occupied), (3, 2))
+
+    def test_missing_columns_raise(self):
+        rows = self.teacher_rows(1)
+        with self.assertRaisesMessage(excel_import.ImportFileError, 'Кафедра'), \
+                ExcelReader(excel_file(rows, [c for c in rows[0] if c != 'Кафедра'])) as reader:
+            excel_import.import_teachers(reader, ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES)
+
+    def test_students_upsert_mapping(self):
+        StudentExcelMapping.objects.create(
+            last_name='Студент', first_name='Тест', patronymic='', group='ФЕС-21', department='СП'
+        )
+        rows = [
+            {'Прізвище': 'Студент', "Ім'я": 'Тест', 'По-батькові': None, 'Кафедра': 'КОІТ', 'Група': 'ФЕС-21'},
+            {'Прізвище': 'Новий', "Ім'я": 'Студент', 'По-батькові': 'Іванович', 'Кафедра': 'СП', 'Група': 'ФЕС-22'},
+            {'Прізвище': 'Без', "Ім'я": 'Групи', 'По-батькові': '', 'Кафедра': 'СП', 'Група': None},
+        ]
+        with ExcelReader(excel_file(rows)) as reader:
+            result = excel_import.import_students(reader, ALLOWED_DEPARTMENTS)
+
+        self.assertEqual(result.success_count, 2)
+        self.assertEqual(result.error_lines(), ["Рядок 4: Пропущено обов'язкові поля"])
+        self.assertEqual(StudentExcelMapping.objects.get(last_name='Студент').department, 'КОІТ')
+        self.assertTrue(StudentExcelMapping.objects.filter(last_name='Новий', group='ФЕС-22').exists())
+
+    def test_themes_create_themes_requests_and_mappings(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        existing = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Оптичні сенсори')
+        email = 'old.teacher@lnu.edu.ua'
+        rows = [
+            {'Корпоративна скринька': email, 'Потік': 'ΦЕС-2', 'Тема': 'ОПТИЧНІ сенсори', 'Студент': 'Студент Тест'},
+            {'Корпоративна скринька': email, 'Потік': 'ФЕС-2', 'Тема': 'Нова тема', 'Студент': 'Відсутній Студент'},
+            {'Корпоративна скринька': email, 'Потік': 'ФЕС-2', 'Тема': 'Вільна тема', 'Студент': None},
+            {'Корпоративна скринька': 'nobody.here@lnu.edu.ua', 'Потік': 'ФЕС-2', 'Тема': 'Тема', 'Студент': None},
+            {'Корпоративна скринька': email, 'Потік': None, 'Тема': 'Тема', 'Студент': None},
+        ]
+
+        def run_import():
+            with self.captureOnCommitCallbacks(execute=True), ExcelReader(excel_file(rows)) as reader:
+                return excel_import.import_themes(reader)
+
+        result = run_import()
+        self.assertEqual(result.success_count, 2)
+        self.assertEqual(result.error_lines(), [
+            "Рядок 6: Пропущено обов'язкові поля: stream",
+            'Викладач з email nobody.here@lnu.edu.ua не знайдено',
+        ])
+        themes = {t.theme: t for t in TeacherTheme.objects.filter(teacher_id=self.teacher)}
+        self.assertEqual(set(themes), {'Оптичні сенсори', 'Нова тема', 'Вільна тема'})
+        self.assertEqual(themes['Оптичні сенсори'].pk, existing.pk)
+        self.assertTrue(themes['Оптичні сенсори'].is_occupied)
+        self.assertFalse(themes['Вільна тема'].is_occupied)
+        self.assertEqual(themes['Нова тема'].theme_key, theme_search.theme_key('нова тема'))
+        self.assertIn('нова тема', themes['Нова тема'].search_document)
+        self.assertTrue(all(t.streams.filter(pk=self.stream.pk).exists() for t in themes.values()))
+
+        registered = Request.objects.get(student_id=self.student_user)
+        self.assertEqual((registered.teacher_theme_id, registered.request_status), (existing.pk, 'Активний'))
+        virtual = Request.objects.get(student_id__isnull=True)
+        self.assertEqual(virtual.teacher_theme, themes['Нова тема'])
+        self.assertEqual(
+            set(StudentRequestMapping.objects.values_list('student_name', flat=True)),
+            {'Студент Тест', 'Відсутній Студент'},
+        )
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 2)
+
+        # Повторний імпорт нічого не дублює, а на повний слот повідомляє
+        result = run_import()
+        self.assertEqual(Request.objects.count(), 2)
+        self.assertIn('вже заповнений (зайнято: 2/2)', result.error_lines()[-1])
+
+    def plan_teachers(self, rows):
+        with ExcelReader(excel_file(rows)) as reader:
+            return excel_import.plan_teachers(reader, ALLOWED_DEPARTMENTS, DEPARTMENT_SHORT_NAMES)
+
+    def sections(self, plan):
+        return {section['title']: section['items'] for section in plan.summary}
+
+    def test_teachers_dry_run_diff_and_apply(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        rows = self.teacher_rows(3, **{
+            '0': {'Адреса корпоративної скриньки': 'old.teacher@lnu.edu.ua', 'Прізвище': 'Нове', 'ФЕС-2': 5},
+            '2': {'Кафедра': 'Невідома'},
+        })
+        users_before = User.objects.count()
+        plan = self.plan_teachers(rows)
+
+        self.assertEqual(User.objects.count(), users_before)
+        sections = self.sections(plan)
+        self.assertEqual(sections['Нові викладачі'], ['Прізвище1 Ім1 (name1.surname1@lnu.edu.ua)'])
+        self.assertEqual(sections['Зміна ПІБ'], ['old.teacher@lnu.edu.ua: Викладач Іван → Нове Ім0'])
+        self.assertEqual(
+            sections['Зміна кафедри'], ['old.teacher@lnu.edu.ua: Кафедра тестування → Системного проектування'],
+        )
+        self.assertEqual(sections['Нові слоти'], ['name1.surname1@lnu.edu.ua, ФЕС-2: 3'])
+        self.assertEqual(sections['Зміна квот'], ['old.teacher@lnu.edu.ua, ФЕС-2: 2 → 5'])
+        self.assertEqual(plan.result().error_count, 1)
+
+        # План зберігається як JSON і застосовується без файлу
+        plan = excel_import.ImportPlan.from_json(json.loads(json.dumps(plan.as_json())))
+        with self.captureOnCommitCallbacks(execute=True):
+            result = excel_import.apply_teachers(plan)
+        self.assertEqual((result.success_count, result.error_count), (2, 1))
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.quota, 5)
+        self.assertEqual(OnlyTeacher.objects.get(pk=self.teacher.pk).department, self.sp_department)
+        self.assertTrue(Slot.objects.filter(teacher_id__teacher_id__email='name1.surname1@lnu.edu.ua').exists())
+
+    def test_teachers_dry_run_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.plan_teachers(self.teacher_rows(3))
+        with CaptureQueriesContext(connection) as large:
+            self.plan_teachers(self.teacher_rows(30))
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 8)
+
+    def test_emails_match_regardless_of_case(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        result = self.import_teachers(self.teacher_rows(1, **{
+            '0': {'Адреса корпоративної скриньки': 'Old.Teacher@LNU.edu.ua', 'Прізвище': 'Нове'},
+        }))
+        self.assertEqual((result.success_count, result.error_lines()), (1, []))
+        self.assertEqual(User.objects.filter(email__iexact='old.teacher@lnu.edu.ua').count(), 1)
+        self.teacher_user.refresh_from_db()
+        self.assertEqual(self.teacher_user.last_name, 'Нове')
+
+        rows = [{'Корпоративна скринька': 'OLD.teacher@lnu.edu.ua', 'Потік': 'ФЕС-2', 'Тема': 'Тема', 'Студент': None}]
+        with self.captureOnCommitCallbacks(execute=True), ExcelReader(excel_file(rows)) as reader:
+            result = excel_import.import_themes(reader)
+        self.assertEqual(result.error_lines(), [])
+        self.assertTrue(TeacherTheme.objects.filter(teacher_id=self.teacher, theme='Тема').exists())
+
+    def test_themes_reconcile_slot_in_each_chunk(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        rows = [
+            {'Корпоративна скринька': 'old.teacher@lnu.edu.ua', 'Потік': 'ФЕС-2', 'Тема': f'Тема {i}',
+             'Студент': name}
+            for i, name in enumerate(['Студент Тест', 'Відсутній Студент'])
+        ]
+        occupied = []
+
+        def progress(processed, result):
+            occupied.append(Slot.objects.get(pk=self.slot.pk).occupied)
+
+        with self.captureOnCommitCallbacks(execute=True), ExcelReader(excel_file(rows), chunk_size=1) as reader:
+            excel_import.import_themes(reader, progress)
+        self.assertEqual(occupied, [1, 2])
+
+    def test_themes_dry_run_diff_and_apply(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        TeacherTheme.objects.create(teacher_id=self.teacher, theme='Оптичні сенсори')
+        TeacherTheme.objects.create(teacher_id=self.teacher, theme='Стара тема')
+        email = 'old.teacher@lnu.edu.ua'
+        rows = [
+            {'Корпоративна скринька': email, 'Потік': 'ФЕС-2', 'Тема': 'ОПТИЧНІ сенсори', 'Студент': 'Студент Тест'},
+            {'Корпоративна скринька': email, 'Потік': 'ФЕС-2', 'Тема': 'Нова тема', 'Студент': 'Відсутній Студент'},
+            {'Корпоративна скринька': 'nobody.here@lnu.edu.ua', 'Потік': 'ФЕС-2', 'Тема': 'Тема', 'Студент': None},
+        ]
+        with CaptureQueriesContext(connection) as queries, ExcelReader(excel_file(rows)) as reader:
+            plan = excel_import.plan_themes(reader)
+
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(TeacherTheme.objects.count(), 2)
+        self.assertFalse(Request.objects.exists())
+        sections = self.sections(plan)
+        self.assertEqual(sections['Нові теми'], [f'{email}: Нова тема'])
+        self.assertEqual(len(sections["Нові прив'язки тем до потоків"]), 2)
+        self.assertEqual(sections['Наявні теми, які стануть зайнятими'], [f'{email}: ОПТИЧНІ сенсори'])
+        self.assertEqual(sections['Нові запити зареєстрованих студентів'], ['Студент Тест → ОПТИЧНІ сенсори'])
+        self.assertEqual(
+            sections['Віртуальні запити (студент ще не зареєстрований)'], ['Відсутній Студент → Нова тема'],
+        )
+        self.assertEqual(sections['Теми викладачів, яких немає у файлі (імпорт їх не змінює)'], [f'{email}: Стара тема'])
+        self.assertEqual(len(plan.items), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = excel_import.apply_themes(plan)
+        self.assertEqual(result.error_lines(), ['Викладач з email nobody.here@lnu.edu.ua не знайдено'])
+        self.assertEqual(result.success_count, 2)
+        self.assertEqual(Request.objects.count(), 2)
+        self.assertEqual(TeacherTheme.objects.count(), 3)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.occupied, 2)
+
+    def test_progress_reported_after_each_chunk(self):
+        rows = [
+            {'Прізвище': f'Студент{i}', "Ім'я": 'Тест', 'По-батькові': '', 'Кафедра': 'СП', 'Група': 'ФЕС-21'}
+            for i in range(5)
+        ]
+        rows[3]['Група'] = None
+        progress = []
+        with ExcelReader(excel_file(rows), chunk_size=2) as reader:
+            self.assertEqual(reader.total_rows, 5)
+            excel_import.import_students(
+                reader, ALLOWED_DEPARTMENTS,
+                progress=lambda processed, result: progress.append((processed, result.success_count)),
+            )
+        self.assertEqual(progress, [(2, 2), (4, 3), (5, 4)])
+
+
+class ImportJobTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_catalog()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.admin_user = User.objects.create_user(email='admin.user@lnu.edu.ua', password='x', is_staff=True)
+        self.client.force_login(self.admin_user)
+
+    def upload(self, rows, url_name='import_students_excel', **data):
+        upload = SimpleUploadedFile('import.xlsx', excel_file(rows).getvalue())
+        response = self.client.post(reverse(url_name), {'excel_file': upload, **data})
+        self.assertEqual(response.status_code, 202)
+        return ImportJob.objects.get(pk=response.json()['job_id']), response.json()['status_url']
+
+    def test_job_runs_in_worker_and_reports_status(self):
+        rows = [
+            {'Прізвище': 'Студент', "Ім'я": 'Тест', 'По-батькові': '', 'Кафедра': 'СП', 'Група': 'ФЕС-21'},
+            {'Прізвище': 'Без', "Ім'я": 'Групи', 'По-батькові': '', 'Кафедра': 'СП', 'Група': None},
+        ]
+        job, status_url = self.upload(rows)
+        self.assertEqual(job.status, ImportJob.STATUS_QUEUED)
+        self.assertFalse(StudentExcelMapping.objects.exists())
+
+        self.assertEqual(self.client.get(status_url).json()['status'], ImportJob.STATUS_QUEUED)
+
+        call_command('run_import_jobs', stdout=io.StringIO())
+        data = self.client.get(status_url).json()
+        self.assertTrue(data['finished'])
+        self.assertTrue(data['success'])
+        self.assertEqual((data['total_rows'], data['processed_rows']), (2, 2))
+        self.assertEqual((data['success_count'], data['error_count']), (1, 1))
+        self.assertEqual(data['errors'], ["Рядок 3: Пропущено обов'язкові поля"])
+        self.assertIn('Імпорт завершено. Успішно: 1, Помилок: 1', data['message'])
+        self.assertTrue(StudentExcelMapping.objects.filter(last_name='Студент').exists())
+        job.refresh_from_db()
+        self.assertFalse(job.file)
+
+    def test_dry_run_job_waits_for_confirmation(self):
+        self.teacher_user.email = 'old.teacher@lnu.edu.ua'
+        self.teacher_user.save()
+        rows = [{'Корпоративна скринька': 'old.teacher@lnu.edu.ua', 'Потік': 'ФЕС-2', 'Тема': 'Нова тема'}]
+        job, status_url = self.upload(rows, 'import_themes_excel', dry_run='1')
+        import_jobs.run_pending()
+
+        data = self.client.get(status_url).json()
+        self.assertTrue(data['finished'])
+        self.assertTrue(data['preview'])
+        self.assertEqual(data['summary'][0], {'title': 'Нові теми', 'count': 1, 'items': [
+            'old.teacher@lnu.edu.ua: Нова тема',
+        ]})
+        self.assertFalse(TeacherTheme.objects.exists())
+        job.refresh_from_db()
+        self.assertFalse(job.file)
+
+        response = self.client.post(data['apply_url'])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.post(data['apply_url']).status_code, 409)
+        import_jobs.run_pending()
+
+        data = self.client.get(status_url).json()
+        self.assertEqual(data['status'], ImportJob.STATUS_DONE)
+        self.assertTrue(TeacherTheme.objects.filter(teacher_id=self.teacher, theme='Нова тема').exists())
+        job.refresh_from_db()
+        self.assertIsNone(job.plan)
+
+    def test_invalid_file_fails_job(self):
+        job, status_url = self.upload([{'Прізвище': 'Тест'}])
+        import_jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn('Відсутні обов', job.message)
+
+    def test_status_requires_staff(self):
+        job, status_url = self.upload([{'Прізвище': 'Тест'}])
+        self.client.force_login(self.student_user)
+        self.assertEqual(self.client.get(status_url).status_code, 302)
+
+    def test_upload_requires_staff(self):
+        for user in (None, self.student_user):
+            self.client.logout()
+            if user:
+                self.client.force_login(user)
+            for url_name in ('import_teachers_excel', 'import_students_excel', 'import_themes_excel'):
+                upload = SimpleUploadedFile('import.xlsx', excel_file([{'Прізвище': 'Тест'}]).getvalue())
+                response = self.client.post(reverse(url_name), {'excel_file': upload})
+                self.assertEqual(response.status_code, 302)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_eta_and_stale_jobs(self):
+        job, _ = self.upload([{'Прізвище': 'Тест'}])
+        claimed = import_jobs.claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(import_jobs.claim_next())
+
+        claimed.total_rows, claimed.processed_rows = 1000, 250
+        self.assertEqual(import_jobs.eta_seconds(claimed, now=claimed.started_at + timedelta(seconds=10)), 30)
+
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - import_jobs.STALE_AFTER * 2)
+        self.assertEqual(import_jobs.requeue_stale(), 1)
+        self.assertEqual(import_jobs.claim_next().pk, job.pk)
+
+
+class StudentNameKeyTestCase(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        self.student_user.patronymic = 'Петрівна'
+        self.student_user.save()
+        self.other_theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Інша тема')
+
+    def mapping(self, student_name, theme):
+        return StudentRequestMapping.objects.create(
+            teacher_email=self.teacher_user.email, stream=self.stream.stream_code,
+            theme=theme, student_name=student_name,
+        )
+
+    def test_name_key_normalizes_case_apostrophes_and_spaces(self):
+        self.assertEqual(student_names.name_key("  Дʼячок   ОЛЕНА Іванівна"), "д'ячок олена")
+        self.assertEqual(student_names.name_key("Д’ячок олена"), student_names.name_key("д`ячок Олена"))
+        self.assertEqual(student_names.name_key(''), '')
+        self.assertTrue(student_names.same_person('Студент Тест', 'студент тест петрівна'))
+        self.assertFalse(student_names.same_person('Студент Тест Іванівна', 'Студент Тест Петрівна'))
+        self.assertFalse(student_names.same_person('Студент', 'Студент Тест'))
+
+    def test_keys_filled_on_save_and_import(self):
+        mapping = StudentExcelMapping.objects.create(
+            last_name='СТУДЕНТ', first_name='Тест', department='СП', group='ФЕС-21',
+        )
+        self.assertEqual(mapping.name_key, 'студент тест')
+        self.assertEqual(self.mapping('Студент  Тест', 'Тема').student_key, 'студент тест')
+
+    def test_registration_claims_virtual_requests_by_key(self):
+        theme = TeacherTheme.objects.create(teacher_id=self.teacher, theme='Тема проєкту')
+        virtual = Request.objects.create(
+            teacher_id=self.teacher, teacher_theme=theme, slot=self.slot,
+            request_status='Активний', topic_name='Тема проєкту', motivation_text='',
+        )
+        self.mapping("студент  тест", 'Тема проєкту')
+        self.mapping('Студент Тест Іванівна', 'Інша тема')  # інша людина з тим самим ключем
+
+        self.assertTrue(create_automatic_requests_for_student(self.student_user, 'ФЕС-21'))
+        virtual.refresh_from_db()
+        self.assertEqual(virtual.student_id, self.student_user)
+        self.assertFalse(Request.objects.filter(teacher_theme=self.other_theme).exists())
+
+    def test_registration_matches_teacher_email_regardless_of_case(self):
+        StudentRequestMapping.objects.create(
+            teacher_email=self.teacher_user.email.upper(), stream=self.stream.stream_code,
+            theme='Інша тема', student_name='Студент Тест',
+        )
+        self.assertTrue(create_automatic_requests_for_student(self.student_user, 'ФЕС-21'))
+        self.assertTrue(Request.objects.filter(student_id=self.student_user, teacher_theme=self.other_theme).exists())
+
+    def test_registration_query_count_does_not_grow_with_mappings(self):
+        # Унікальність мапінгу — (викладач, потік, ім'я), тож ім'я записане по-різному
+        names = ['Студент Тест', 'Тест Студент', 'студент тест петрівна']
+
+        def count_queries(themes):
+            Request.objects.all().delete()
+            StudentRequestMapping.objects.all().delete()
+            Slot.objects.filter(pk=self.slot.pk).update(quota=10, occupied=0)
+            for name, theme in zip(names, themes):
+                TeacherTheme.objects.get_or_create(teacher_id=self.teacher, theme=theme)
+                self.mapping(name, theme)
+            with CaptureQueriesContext(connection) as queries:
+                create_automatic_requests_for_student(self.student_user, 'ФЕС-21')
+            self.assertEqual(Request.objects.filter(student_id=self.student_user).count(), len(themes))
+            return len([q for q in queries.captured_queries if q['sql'].startswith('SELECT')])
+
+        self.assertEqual(count_queries(['Тема 1']), count_queries(['Тема 1', 'Тема 2', 'Тема 3']))
+
+
+class AvatarUrlTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        avatar.storage_breaker.reset()
+        self.user = User.objects.create_user(
+            email='avatar@test.com', first_name='А', last_name='Викладач', role='Викладач'
+        )
+        self.user.profile_picture.name = 'profile_pics/profile_1_100.jpg'
+
+    def test_url_is_cached_and_storage_exists_is_never_called(self):
+        with mock.patch.object(avatar.default_storage, 'exists') as exists, \
+                mock.patch.object(avatar.default_storage, 'url', return_value='https://cdn/p1.jpg') as url:
+            self.assertEqual(get_profile_picture_url(self.user), 'https://cdn/p1.jpg')
+            self.assertEqual(get_profile_picture_url(self.user), 'https://cdn/p1.jpg')
+        exists.assert_not_called()
+        self.assertEqual(url.call_count, 1)
+
+    def test_new_file_name_gets_fresh_url(self):
+        with mock.patch.object(avatar.default_storage, 'url', side_effect=lambda name: f'https://cdn/{name}'):
+            get_profile_picture_url(self.user)
+            self.user.profile_picture.name = 'profile_pics/profile_1_200.jpg'
+            avatar.refresh_avatar_url(self.user, 'https://cdn/new.jpg')
+            self.assertEqual(get_profile_picture_url(self.user), 'https://cdn/new.jpg')
+
+    def test_breaker_falls_back_to_default_avatar_when_storage_is_slow(self):
+        breaker = avatar.CircuitBreaker(failure_threshold=2, reset_timeout=60, slow_call_seconds=0.01)
+
+        def slow_url(name):
+            time.sleep(0.02)
+            return f'https://cdn/{name}'
+
+        with mock.patch.object(avatar, 'storage_breaker', breaker), \
+                mock.patch.object(avatar.default_storage, 'url', side_effect=slow_url) as url:
+            for i in range(4):
+                self.user.profile_picture.name = f'profile_pics/profile_1_{i}.jpg'
+                result = get_profile_picture_url(self.user)
+        self.assertTrue(breaker.is_open)
+        self.assertEqual(url.call_count, 2)
+        self.assertEqual(result, avatar.default_avatar_url())
+
+    def test_user_without_picture_gets_default(self):
+        self.user.profile_picture = None
+        with mock.patch.object(avatar.default_storage, 'url') as url:
+            self.assertEqual(get_profile_picture_url(self.user), avatar.default_avatar_url())
+        url.assert_not_called()
@@ -26,6 +26,7 @@ urlpatterns = [
     path('request-files/<int:request_id>/', views.request_files_for_completion, name='request_files_for_completion'),
     path('request-details-for-approve/<int:request_id>/', views.request_details_for_approve, name='request_details_for_approve'),
     path('approve-request-with-theme/<int:request_id>/', views.approve_request_with_theme, name='approve_request_with_theme'),
+    path('bulk-transition-requests/', views.bulk_transition_requests, name='bulk_transition_requests'),
     path('student-refuse-request/<int:request_id>/', views.student_refuse_request, name='student_refuse_request'),
     path('edit-request-theme/<int:request_id>/', views.edit_request_theme, name='edit_request_theme'),
     path('get-student-request-details/<int:request_id>/', views.get_student_request_details, name='get_student_request_details'),
@@ -39,10 +39,14 @@ from apps.catalog.models import (FileComment, OnlyStudent, OnlyTeacher,
                                  Request, RequestFile, Slot, Stream,
                                  StudentTheme, TeacherTheme, Group)
 from apps.catalog.views import request_files_for_completion
+from apps.catalog.services.request_transitions import bulk_transition, cancel_other_pending_requests
+from apps.catalog.services import comment_tree, profile_dashboard, profile_tabs, theme_search
+from apps.notifications.services.request_notifications import notify_status_changed
 
 from .forms import (CropProfilePictureForm, ProfilePictureUploadForm,
                     RegistrationForm, StudentProfileForm, TeacherProfileForm)
 from .models import CustomUser
+from .services.avatar import refresh_avatar_url
 from .services.registration_services import (
     get_access_token,
     get_user_info,
@@ -602,67 +606,23 @@ def profile(request: HttpRequest, user_id=None):
     # Add role-specific data
     if user_profile.role == "Викладач":
         teacher_profile = get_object_or_404(OnlyTeacher, teacher_id=user_profile)
-        active_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes", "files")
-            .filter(teacher_id__teacher_id=user_profile, request_status="Активний")
-        )
-
-        # Get files for active requests
-        active_request_files = {}
-        for req in active_requests:
-            files = RequestFile.objects.filter(request=req).select_related(
-                "uploaded_by"
-            )
-            active_request_files[str(req.id)] = list(files)
-
-        # Додаю accepted_requests
-        accepted_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes", "files")
-            .filter(
-                teacher_id__teacher_id=user_profile,
-                request_status__in=["Активний", "Завершено"],
-            )
-        )
-
-        # Додаю rejected_requests
-        rejected_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes", "files")
-            .filter(teacher_id__teacher_id=user_profile, request_status="Відхилено")
-        )
+        # Усі запити викладача завантажуються одним набором запитів і діляться за статусами
+        dashboard = profile_dashboard.load_dashboard(user_profile)
 
         context.update(
             {
                 "teacher_profile": teacher_profile,
                 # Групуємо теми викладача за потоками
                 "themes_by_stream": _group_teacher_themes_by_stream(teacher_profile),
-                "slots": Slot.objects.filter(teacher_id=teacher_profile).annotate(
-                    available=F("quota") - F("occupied")
-                ),
-                "pending_requests": Request.objects.select_related(
-                    "student_id", "teacher_id", "teacher_theme", "slot"
-                )
-                .prefetch_related("student_themes", "files")
-                .filter(teacher_id__teacher_id=user_profile, request_status="Очікує"),
-                "active_requests": active_requests,
-                "active_request_files": active_request_files,
-                "archived_requests": Request.objects.select_related(
-                    "student_id", "teacher_id", "teacher_theme", "slot"
-                )
-                .prefetch_related("student_themes", "files")
-                .filter(
-                    teacher_id__teacher_id=user_profile, request_status="Завершено"
-                ),
-                "accepted_requests": accepted_requests,
-                "rejected_requests": rejected_requests,
+                "slots": Slot.objects.filter(teacher_id=teacher_profile)
+                .select_related("stream_id")
+                .annotate(available=F("quota") - F("occupied")),
+                "pending_requests": dashboard.pending,
+                "active_requests": dashboard.active,
+                "active_request_files": dashboard.active_request_files,
+                "archived_requests": dashboard.completed,
+                "accepted_requests": dashboard.accepted,
+                "rejected_requests": dashboard.rejected,
             }
         )
     else:  # Student
@@ -681,39 +641,18 @@ def profile(request: HttpRequest, user_id=None):
                 messages.error(request, "Помилка: немає доступних груп в системі. Зверніться до адміністратора.")
                 return redirect('login')
 
-        # Get all requests for the student
-        all_requests = (
-            Request.objects.select_related(
-                "student_id", "teacher_id", "teacher_theme", "slot"
-            )
-            .prefetch_related("student_themes")
-            .filter(student_id=user_profile)
-        )
-
-        # Активні та архівні запити для вкладок
-        active_requests = all_requests.filter(request_status="Активний")
-        archived_requests = all_requests.filter(request_status="Завершено")
-
-        # Get all active requests with files
-        active_request_files = {}
-        for req in active_requests:
-            files = RequestFile.objects.filter(request=req).select_related(
-                "uploaded_by"
-            )
-            active_request_files[str(req.id)] = list(files)
+        dashboard = profile_dashboard.load_dashboard(user_profile)
 
         context.update(
             {
                 "student_profile": student_profile,
-                "all_requests": all_requests,
-                "has_rejected": all_requests.filter(
-                    request_status="Відхилено"
-                ).exists(),
-                "has_pending": all_requests.filter(request_status="Очікує").exists(),
-                "pending_requests": all_requests.filter(request_status="Очікує"),
-                "active_requests": active_requests,
-                "archived_requests": archived_requests,
-                "active_request_files": active_request_files,
+                "all_requests": dashboard.requests,
+                "has_rejected": bool(dashboard.rejected),
+                "has_pending": bool(dashboard.pending),
+                "pending_requests": dashboard.pending,
+                "active_requests": dashboard.active,
+                "archived_requests": dashboard.completed,
+                "active_request_files": dashboard.active_request_files,
             }
         )
         # Додаємо номер курсу для шаблону
@@ -763,11 +702,7 @@ def reject_request(request, request_id):
                 req.rejected_reason = (
                     reason if reason else "Викладач не вказав причину відмови"
                 )
-                req.save()
-
-                if req.teacher_theme:
-                    req.teacher_theme.is_occupied = False
-                    req.teacher_theme.save()
+                req.save()  # тема звільняється в Request.save()
 
                 messages.success(request, "Запит успішно відхилено")
 
@@ -888,8 +823,7 @@ def crop_profile_picture(request):
                 saved_file_name = default_storage.save(file_name, img_content)
                 user.profile_picture.name = saved_file_name
                 user.save(update_fields=["profile_picture"])
-                user.refresh_from_db()
-                new_url = default_storage.url(saved_file_name)
+                new_url = refresh_avatar_url(user, default_storage.url(saved_file_name))
 
                 logger.debug(
                     f"Forced Cloudinary upload successful for user {user.id}. URL: {new_url}"
@@ -1003,18 +937,15 @@ def teacher_profile_edit(request):
                             for theme_data in new_themes:
                                 theme_text = theme_data.get("theme", "").strip()
                                 if theme_text:
-                                    theme_obj, created = (
-                                        TeacherTheme.objects.update_or_create(
-                                            teacher_id=teacher_profile,
-                                            theme=theme_text,
-                                            defaults={
-                                                "theme_description": theme_data.get(
-                                                    "description", ""
-                                                ),
-                                                "is_deleted": False,  # Ensure it's active
-                                            },
-                                        )
+                                    theme_obj = TeacherTheme.find_by_title(
+                                        teacher_profile, theme_text
+                                    ) or TeacherTheme(teacher_id=teacher_profile)
+                                    theme_obj.theme = theme_text
+                                    theme_obj.theme_description = theme_data.get(
+                                        "description", ""
                                     )
+                                    theme_obj.is_deleted = False  # Ensure it's active
+                                    theme_obj.save()
 
                         except json.JSONDecodeError as e:
                             logger.error(
@@ -1182,9 +1113,11 @@ def student_profile_edit(request):
 
 
 @login_required
+@transaction.atomic
 def complete_request(request, request_id):
     """
     Complete a request and assign a grade.
+    Archive flags of the files and the request itself are saved in one transaction.
     """
     if request.method != "POST":
         return JsonResponse({"success": False, "error": "Invalid method"})
@@ -1242,7 +1175,12 @@ def complete_request(request, request_id):
             req.request_status = "Завершено"
             req.grade = int(grade)
             req.completion_date = timezone.now()
-            req.save()
+            req.has_archived_files = updated_files > 0
+            try:
+                req.save()
+            except ValidationError as e:
+                # Статус уже змінено в іншому запиті: позначки файлів теж відкочуються
+                return _rollback_response({"success": False, "error": " ".join(e.messages)}, 400)
         else:
             logger.error("[COMPLETE DEBUG] No files selected")
             # If no files selected, don't complete the request
@@ -1251,10 +1189,7 @@ def complete_request(request, request_id):
                 "error": "Необхідно обрати хоча б один файл для збереження в архіві"
             })
 
-        # Free the teacher theme if it exists
-        if req.teacher_theme:
-            req.teacher_theme.is_occupied = False
-            req.teacher_theme.save()
+        # Teacher theme is freed in Request.save() on completion
 
         messages.success(request, "Роботу успішно завершено")
         return JsonResponse({"success": True})
@@ -1263,7 +1198,7 @@ def complete_request(request, request_id):
         return JsonResponse({"success": False, "error": "Запит не знайдено"})
     except Exception as e:
         logger.error(f"Error completing request {request_id}: {str(e)}")
-        return JsonResponse(
+        return _rollback_response(
             {"success": False, "error": "Сталася помилка при обробці запиту"}
         )
 
@@ -1271,97 +1206,19 @@ def complete_request(request, request_id):
 @login_required
 def load_profile_tab(request, tab_name):
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        context = {"user_profile": request.user}
-
-        if tab_name == "active":
-            if request.user.role == "Студент":
-                active_requests = Request.objects.filter(
-                    student_id=request.user, request_status="Активний"
-                ).select_related("teacher_id__teacher_id", "teacher_theme", "slot")
-
-                # Створюємо словник для файлів
-                active_request_files = {}
-                for req in active_requests:
-                    files = RequestFile.objects.filter(request=req).order_by(
-                        "-uploaded_at"
-                    )
-                    active_request_files[req.id] = files
-
-                context.update(
-                    {
-                        "active_requests": active_requests,
-                        "active_request_files": active_request_files,
-                    }
-                )
-            else:  # Викладач
-                active_requests = Request.objects.filter(
-                    teacher_id__teacher_id=request.user, request_status="Активний"
-                )
-
-                active_request_files = {}
-                for req in active_requests:
-                    files = RequestFile.objects.filter(request=req).order_by(
-                        "-uploaded_at"
-                    )
-                    active_request_files[req.id] = files
-
-                context.update(
-                    {
-                        "active_requests": active_requests,
-                        "active_request_files": active_request_files,
-                    }
-                )
-
-            html = render_to_string("profile/active.html", context, request=request)
-            return JsonResponse({"html": html})
-
-        elif tab_name == "requests":
-            if request.user.role == "Викладач":
-                # Отримати запити, що очікують на підтвердження та відхилені запити
-                pending_requests = Request.objects.filter(
-                    teacher_id__teacher_id=request.user,
-                    request_status__in=["Очікує", "Відхилено"],
-                ).select_related("student_id", "teacher_id", "teacher_theme", "slot")
-
-                # Отримати запити, які були прийняті (Активний) або завершені
-                accepted_requests = Request.objects.filter(
-                    teacher_id__teacher_id=request.user,
-                    request_status__in=["Активний", "Завершено"],
-                ).select_related("student_id", "teacher_id", "teacher_theme", "slot")
-
-                context.update(
-                    {
-                        "pending_requests": pending_requests,
-                        "accepted_requests": accepted_requests,
-                    }
-                )
-            else:
-                # Для студента отримуємо всі запити
-                sent_requests = Request.objects.filter(
-                    student_id=request.user
-                ).select_related("teacher_id__teacher_id", "teacher_theme", "slot")
-                context["sent_requests"] = sent_requests
-
-            html = render_to_string("profile/requests.html", context, request=request)
-            return JsonResponse({"html": html})
-
-        elif tab_name == "archive":
-            if request.user.role == "Викладач":
-                archive_requests = Request.objects.filter(
-                    teacher_id__teacher_id=request.user, 
-                    request_status="Завершено",
-                    files__is_archived=True
-                ).select_related("student_id", "teacher_id", "teacher_theme", "slot").distinct()
-            else:
-                archive_requests = Request.objects.filter(
-                    student_id=request.user, 
-                    request_status="Завершено",
-                    files__is_archived=True
-                ).select_related("teacher_id__teacher_id", "teacher_theme", "slot").distinct()
+        if tab_name not in profile_tabs.TABS:
+            return JsonResponse({"error": "Unknown tab"}, status=404)
+        try:
+            page = profile_tabs.load_tab(
+                request.user, tab_name, request.GET.get("cursor"),
+                profile_tabs.parse_page_size(request.GET.get("page_size")),
+            )
+        except profile_tabs.InvalidPage as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
-            context["archived_requests"] = archive_requests
-            html = render_to_string("profile/archive.html", context, request=request)
-        return JsonResponse({"html": html})
+        context = {"user_profile": request.user, **page.context}
+        html = render_to_string(page.template, context, request=request)
+        return JsonResponse({"html": html, "next_cursor": page.next_cursor})
 
     return JsonResponse({"error": "Invalid request"}, status=400)
 
@@ -1458,7 +1315,6 @@ def archived_request_details(request, request_id):
             Request.objects.select_related(
                 "student_id", "teacher_id__teacher_id", "teacher_theme"
             )
-            .prefetch_related("files__comments__author")
             .get(id=request_id, request_status="Завершено")
         )
 
@@ -1471,12 +1327,18 @@ def archived_request_details(request, request_id):
         ):
             return JsonResponse({"error": "Forbidden"}, status=403)
 
+        # Коментарі всіх архівних файлів — одним запитом (comment_tree)
+        archived_files = comment_tree.attach(
+            req.files.filter(is_archived=True).select_related("uploaded_by")
+        )
         files_data = []
-        for file in req.files.filter(is_archived=True):
+        for file in archived_files:
             comments_data = []
             for comment in file.comments.all():
                 comments_data.append(
                     {
+                        "id": comment.id,
+                        "parent_id": comment.parent_id,
                         "author": comment.author.get_full_name(),
                         "text": comment.text,
                         "created_at": comment.created_at.strftime("%d.%m.%Y %H:%M"),
@@ -1573,35 +1435,15 @@ def request_details_for_approve(request, request_id):
             & (Q(is_occupied=False, is_active=True) | Q(id=selected_theme_id))
         )
         student = req.student_id
-        if hasattr(student, 'academic_group') and student.academic_group:
-            is_master = "м" in student.academic_group.lower()
-            # Оновлений регулярний вираз для обробки ВПК груп
-            match = re.match(r"([А-ЯІЇЄҐ]+)-(\d+)(ВПК)?", student.academic_group)
-            if match:
-                faculty = match.group(1)
-                course = match.group(2)
-                vpk = match.group(3) if match.group(3) else ''
-                
-                # Для ВПК груп також використовуємо тільки першу цифру курсу
-                if vpk:
-                    # ВПК група: використовуємо тільки першу цифру курсу (напр. ФЕП-24ВПК -> ФЕП-2ВПК)
-                    if len(course) > 1:
-                        course = course[0]
-                    stream_code_base = f"{faculty}-{course}{vpk}"
-                else:
-                    # Звичайна група: використовуємо тільки першу цифру курсу
-                    if len(course) > 1:
-                        course = course[0]
-                    stream_code_base = f"{faculty}-{course}"
-                user_stream_code = f"{stream_code_base}м" if is_master else stream_code_base
-                try:
-                    user_stream = Stream.objects.get(stream_code__iexact=user_stream_code)
-                    teacher_themes = teacher_themes.filter(
-                        Q(streams=user_stream) | Q(streams__isnull=True)
-                    )
-                except Stream.DoesNotExist:
-                    logger.warning(f"Stream '{user_stream_code}' not found for student {student.email}. Showing only themes without a stream.")
-                    teacher_themes = teacher_themes.filter(streams__isnull=True)
+        academic = student.get_academic_context()
+        if academic.is_matched:
+            if academic.stream_id:
+                teacher_themes = teacher_themes.filter(
+                    Q(streams=academic.stream_id) | Q(streams__isnull=True)
+                )
+            else:
+                logger.warning(f"Stream '{academic.stream_code}' not found for student {student.email}. Showing only themes without a stream.")
+                teacher_themes = teacher_themes.filter(streams__isnull=True)
 
         # Теми студента
         student_themes = req.student_themes.all()
@@ -1634,6 +1476,12 @@ def request_details_for_approve(request, request_id):
     except Request.DoesNotExist:
         return JsonResponse({"error": "Request not found"}, status=404)
 
+def _rollback_response(data, status=200):
+    """Відповідь з помилкою, що скасовує зміни транзакції view (@transaction.atomic)."""
+    transaction.set_rollback(True)
+    return JsonResponse(data, status=status)
+
+
 @csrf_exempt
 @require_POST
 @transaction.atomic
@@ -1648,12 +1496,12 @@ def approve_request_with_theme(request, request_id):
         )
 
         if request.user.role != "Викладач" or req.teacher_id.teacher_id != request.user:
-            return JsonResponse({"error": "Forbidden"}, status=403)
+            return _rollback_response({"error": "Forbidden"}, 403)
 
         data = json.loads(request.body.decode("utf-8"))
         theme_id = data.get("theme_id")
         if not theme_id:
-            return JsonResponse({"error": "Тему не обрано"}, status=400)
+            return _rollback_response({"error": "Тему не обрано"}, 400)
 
         # Зберігаємо початкову тему викладача, щоб звільнити її, якщо буде обрано іншу
         original_teacher_theme = req.teacher_theme
@@ -1666,24 +1514,6 @@ def approve_request_with_theme(request, request_id):
         # Store student_id before making changes
         student_id = req.student_id
 
-        # Cancel all other pending requests from this student
-        other_pending_requests = Request.objects.filter(
-            student_id=student_id, request_status="Очікує"
-        ).exclude(id=req.id)
-
-        cancelled_count = 0
-        for other_req in other_pending_requests:
-            # Звільняємо тему, якщо вона була зайнята
-            if other_req.teacher_theme:
-                other_req.teacher_theme.is_occupied = False
-                other_req.teacher_theme.save()
-            
-            # Скасовуємо запит
-            other_req.request_status = "Відхилено"
-            other_req.rejected_reason = "Автоматично скасовано через прийняття іншого запиту"
-            other_req.save()
-            cancelled_count += 1
-
         # Assign comment and send_contacts
         req.comment = comment
         req.send_contacts = send_contacts  # Використовуємо правильне ім'я поля
@@ -1693,10 +1523,8 @@ def approve_request_with_theme(request, request_id):
             theme_pk = int(str(theme_id).replace("teacher_", ""))
             theme = TeacherTheme.objects.get(id=theme_pk, teacher_id=req.teacher_id)
 
-            if theme.is_occupied and theme != original_teacher_theme:
-                return JsonResponse(
-                    {"error": "Ця тема вже зайнята іншим студентом."}, status=400
-                )
+            if theme != original_teacher_theme and not theme.claim():
+                return _rollback_response({"error": "Ця тема вже зайнята іншим студентом."}, 400)
             new_teacher_theme = theme
 
             req.teacher_theme = theme
@@ -1717,36 +1545,76 @@ def approve_request_with_theme(request, request_id):
             req.teacher_theme = None  # Очищаємо тему викладача
             req.approved_student_theme = None  # Очищаємо затверджену тему студента
         else:
-            return JsonResponse({"error": "Некоректна тема"}, status=400)
+            return _rollback_response({"error": "Некоректна тема"}, 400)
 
         if original_teacher_theme and original_teacher_theme != new_teacher_theme:
-            original_teacher_theme.is_occupied = False
-            original_teacher_theme.save()
-
-        if new_teacher_theme and not new_teacher_theme.is_occupied:
-            new_teacher_theme.is_occupied = True
-            new_teacher_theme.save()
+            original_teacher_theme.release()
 
         req.request_status = "Активний"
         print(f"Saving Request ID {req.id}")
         print(f"Comment: {req.comment}")
         print(f"Send contacts to student: {req.send_contacts}")
 
+        try:
+            req.save()
+        except ValidationError as e:
+            # Немає вільних місць у слоті, дедлайн семестру тощо
+            return _rollback_response({"error": " ".join(e.messages)}, 400)
+
+        # Інші запити студента скасовуються лише після успішного підтвердження (один UPDATE,
+        # пакетні сповіщення після коміту)
+        cancelled = cancel_other_pending_requests([student_id.pk], exclude_ids=[req.id])
+        transaction.on_commit(lambda: notify_status_changed(cancelled))
+        cancelled_count = len(cancelled)
+
         logger.info(
             f"Request {req.id} approved with theme. {cancelled_count} other pending requests cancelled for student {student_id.id}"
         )
-
-        req.save()
         return JsonResponse({"success": True, "cancelled_count": cancelled_count})
 
     except Request.DoesNotExist:
-        return JsonResponse({"error": "Request not found"}, status=404)
+        return _rollback_response({"error": "Request not found"}, 404)
     except TeacherTheme.DoesNotExist:
-        return JsonResponse({"error": "Тема викладача не знайдена"}, status=404)
+        return _rollback_response({"error": "Тема викладача не знайдена"}, 404)
     except StudentTheme.DoesNotExist:
-        return JsonResponse({"error": "Тема студента не знайдена"}, status=404)
+        return _rollback_response({"error": "Тема студента не знайдена"}, 404)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return _rollback_response({"error": str(e)}, 500)
+
+MAX_BULK_ACTIONS = 200
+
+
+@login_required
+@require_POST
+def bulk_transition_requests(request):
+    """
+    Пакетне підтвердження/відхилення запитів викладачем.
+
+    Тіло запиту: {"actions": [{"id": 1, "action": "approve"},
+                              {"id": 2, "action": "reject", "reason": "..."}]}
+    Підтверджені запити зберігають тему, обрану студентом; інші запити
+    "Очікує" цих студентів автоматично відхиляються.
+    """
+    if request.headers.get("X-Requested-With") != "XMLHttpRequest":
+        return JsonResponse({"error": "Invalid request"}, status=400)
+    if request.user.role != "Викладач":
+        return JsonResponse({"error": "Forbidden"}, status=403)
+
+    try:
+        actions = json.loads(request.body.decode("utf-8")).get("actions")
+    except (ValueError, AttributeError):
+        actions = None
+    if not isinstance(actions, list) or not actions:
+        return JsonResponse({"error": "Не передано жодної дії"}, status=400)
+    if len(actions) > MAX_BULK_ACTIONS:
+        return JsonResponse(
+            {"error": f"Можна обробити не більше {MAX_BULK_ACTIONS} запитів за раз"}, status=400
+        )
+
+    teacher = get_object_or_404(OnlyTeacher, teacher_id=request.user)
+    result = bulk_transition(teacher, [a for a in actions if isinstance(a, dict)])
+    return JsonResponse({"success": True, **result})
+
 
 @csrf_exempt
 @require_POST
@@ -1766,10 +1634,6 @@ def student_refuse_request(request, request_id):
                 status=400,
             )
 
-        if req.teacher_theme:
-            req.teacher_theme.is_occupied = False
-            req.teacher_theme.save()
-
         data = json.loads(request.body.decode("utf-8"))
         reason = data.get("reason", "").strip()
         req.request_status = "Відхилено студентом"
@@ -1873,35 +1737,15 @@ def get_student_request_details(request, request_id):
     ).filter(Q(is_occupied=False) | Q(id=selected_teacher_theme_id))
 
     student = req.student_id
-    if hasattr(student, 'academic_group') and student.academic_group:
-        is_master = "м" in student.academic_group.lower()
-        # Оновлений регулярний вираз для обробки ВПК груп
-        match = re.match(r"([А-ЯІЇЄҐ]+)-(\d+)(ВПК)?", student.academic_group)
-        if match:
-            faculty = match.group(1)
-            course = match.group(2)
-            vpk = match.group(3) if match.group(3) else ''
-            
-            # Для ВПК груп також використовуємо тільки першу цифру курсу
-            if vpk:
-                # ВПК група: використовуємо тільки першу цифру курсу (напр. ФЕП-24ВПК -> ФЕП-2ВПК)
-                if len(course) > 1:
-                    course = course[0]
-                stream_code_base = f"{faculty}-{course}{vpk}"
-            else:
-                # Звичайна група: використовуємо тільки першу цифру курсу
-                if len(course) > 1:
-                    course = course[0]
-                stream_code_base = f"{faculty}-{course}"
-            user_stream_code = f"{stream_code_base}м" if is_master else stream_code_base
-            try:
-                user_stream = Stream.objects.get(stream_code__iexact=user_stream_code)
-                available_teacher_themes_query = available_teacher_themes_query.filter(
-                    Q(streams=user_stream) | Q(streams__isnull=True)
-                )
-            except Stream.DoesNotExist:
-                logger.warning(f"Stream '{user_stream_code}' not found for student {student.email}. Showing only themes without a stream.")
-                available_teacher_themes_query = available_teacher_themes_query.filter(streams__isnull=True)
+    academic = student.get_academic_context()
+    if academic.is_matched:
+        if academic.stream_id:
+            available_teacher_themes_query = available_teacher_themes_query.filter(
+                Q(streams=academic.stream_id) | Q(streams__isnull=True)
+            )
+        else:
+            logger.warning(f"Stream '{academic.stream_code}' not found for student {student.email}. Showing only themes without a stream.")
+            available_teacher_themes_query = available_teacher_themes_query.filter(streams__isnull=True)
 
     available_teacher_themes = list(
         available_teacher_themes_query.values("id", "theme")
@@ -1958,17 +1802,6 @@ def edit_student_request(request, request_id):
             status=400,
         )
 
-    req.motivation_text = motivation
-
-    StudentTheme.objects.filter(request=req).exclude(
-        id__in=current_student_theme_ids
-    ).delete()
-
-    for theme_text in new_themes:
-        StudentTheme.objects.create(
-            request=req, student_id=request.user, theme=theme_text
-        )
-
     old_teacher_theme = req.teacher_theme
     new_teacher_theme = None
     if new_teacher_theme_id and new_teacher_theme_id.isdigit():
@@ -1980,19 +1813,26 @@ def edit_student_request(request, request_id):
                 status=400,
             )
 
+    # Тему викладача займаємо до змін власних тем: відмова не лишає часткових записів
     if old_teacher_theme != new_teacher_theme:
+        if new_teacher_theme and not new_teacher_theme.claim():
+            return _rollback_response(
+                {"success": False, "error": "Ця тема вже зайнята іншим студентом."},
+                status=400,
+            )
         if old_teacher_theme:
-            old_teacher_theme.is_occupied = False
-            old_teacher_theme.save()
+            old_teacher_theme.release()
 
-        if new_teacher_theme:
-            if new_teacher_theme.is_occupied:
-                return JsonResponse(
-                    {"success": False, "error": "Ця тема вже зайнята іншим студентом."},
-                    status=400,
-                )
-            new_teacher_theme.is_occupied = True
-            new_teacher_theme.save()
+    req.motivation_text = motivation
+
+    StudentTheme.objects.filter(request=req).exclude(
+        id__in=current_student_theme_ids
+    ).delete()
+
+    for theme_text in new_themes:
+        StudentTheme.objects.create(
+            request=req, student_id=request.user, theme=theme_text
+        )
 
     req.teacher_theme = new_teacher_theme
 
@@ -2270,7 +2110,9 @@ def update_teacher_theme(request, theme_id):
 
         # Перевіряємо чи тема з такою назвою вже існує у цього викладача
         existing_theme = (
-            TeacherTheme.objects.filter(teacher_id=theme.teacher_id, theme=theme_name)
+            TeacherTheme.objects.filter(
+                teacher_id=theme.teacher_id, theme_key=theme_search.theme_key(theme_name)
+            )
             .exclude(id=theme_id)
             .first()
         )
@@ -2353,7 +2195,8 @@ def _group_teacher_themes_by_stream(teacher_profile):
     themes_by_stream = {}
 
     for theme in themes:
-        if not theme.streams.exists():
+        # all() замість exists(): потоки вже підтягнуті prefetch_related
+        if not theme.streams.all():
             if "Без потоку" not in themes_by_stream:
                 themes_by_stream["Без потоку"] = []
             themes_by_stream["Без потоку"].append(theme)
@@ -2401,12 +2244,10 @@ def cancel_active_request(request, request_id):
         req.request_status = "Скасовано"
         req.rejected_reason = rejected_reason if rejected_reason else "Викладач не вказав причину скасування"
         req.completion_date = timezone.now()
-        req.save()
-        
-        # Free the teacher theme if it exists
-        if req.teacher_theme:
-            req.teacher_theme.is_occupied = False
-            req.teacher_theme.save()
+        try:
+            req.save()  # тема звільняється в Request.save()
+        except ValidationError as e:
+            return JsonResponse({"success": False, "error": " ".join(e.messages)}, status=400)
 
         messages.success(request, "Роботу успішно скасовано")
         return JsonResponse({"success": True})
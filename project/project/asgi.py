@@ -20,6 +20,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 application = get_asgi_application()
 
 import apps.notifications.routing
+from apps.catalog.services import autocomplete_index
+
+# Індекс автокомпліту будується одразу, а не на першому запиті
+autocomplete_index.warm_in_background()
 
 application = ProtocolTypeRouter({
     "http": application,
@@ -313,9 +313,37 @@ MICROSOFT_REDIRECT_URI = os.getenv('MICROSOFT_REDIRECT_URI')
 
 ASGI_APPLICATION = 'project.asgi.application' 
 
+# Спільний кеш у Redis (сервіс cache у docker-compose). Знімки каталогу, лічильники
+# непрочитаних, версії вкладок профілю та індекс автодоповнення інвалідуються з
+# будь-якого процесу (ASGI-воркери, mailer, importer), тож кеш мусить бути один на
+# всі процеси і не навантажувати MySQL. Без REDIS_URL — LocMemCache, придатний
+# лише для одного процесу (локальна розробка, тести).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "TIMEOUT": 60 * 60,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": 60 * 60,
+        }
+    }
+
+# Channel layer у спільній БД: group_send доходить до клієнтів усіх ASGI-воркерів
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+        "BACKEND": "apps.notifications.channel_layer.DatabaseChannelLayer",
+        "CONFIG": {
+            "poll_interval": 0.05,
+            "expiry": 60,
+            "group_expiry": 24 * 60 * 60,
+        },
     }
 }
 
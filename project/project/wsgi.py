@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
 application = get_wsgi_application()
+
+from apps.catalog.services import autocomplete_index
+
+# Індекс автокомпліту будується одразу, а не на першому запиті
+autocomplete_index.warm_in_background()
@@ -0,0 +1,162 @@
+// Фоновий імпорт Excel: форма ставить файл у чергу, далі сторінка опитує
+// стан завдання, поки воркер (run_import_jobs) його не завершить.
+// У режимі dry_run воркер повертає зведення змін, і імпорт застосовується
+// лише після підтвердження (той самий план, без повторного читання файлу).
+(function () {
+    const POLL_INTERVAL = 1500;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    function formatEta(seconds) {
+        if (seconds == null) return '';
+        if (seconds < 60) return `~${seconds} с`;
+        return `~${Math.ceil(seconds / 60)} хв`;
+    }
+
+    function progressHtml(data) {
+        if (data.status === 'queued') {
+            return '<p>Файл у черзі на обробку...</p>';
+        }
+        let html;
+        if (data.total_rows) {
+            const percent = Math.min(100, Math.floor(data.processed_rows * 100 / data.total_rows));
+            html = `
+                <progress value="${percent}" max="100" style="width: 100%;"></progress>
+                <p>Оброблено рядків: ${data.processed_rows} з ${data.total_rows} (${percent}%)</p>
+            `;
+        } else {
+            html = `<p>Оброблено рядків: ${data.processed_rows}</p>`;
+        }
+        html += `<p>Успішно: ${data.success_count}, помилок: ${data.error_count}</p>`;
+        const eta = formatEta(data.eta_seconds);
+        if (eta) {
+            html += `<p>Залишилось: ${eta}</p>`;
+        }
+        if (data.errors && data.errors.length) {
+            html += `<pre>${data.errors.map(escapeHtml).join('\n')}</pre>`;
+        }
+        return html;
+    }
+
+    function summaryHtml(sections) {
+        return sections.map(section => {
+            let html = `<h4>${escapeHtml(section.title)}: ${section.count}</h4>`;
+            if (section.items.length) {
+                html += '<ul>' + section.items.map(item => `<li>${escapeHtml(item)}</li>`).join('') + '</ul>';
+                if (section.count > section.items.length) {
+                    html += `<p>... та ще ${section.count - section.items.length}</p>`;
+                }
+            }
+            return html;
+        }).join('');
+    }
+
+    window.initImportJobForm = function (unitLabel) {
+        const form = document.getElementById('import-form');
+        const loading = document.getElementById('loading');
+        const result = document.getElementById('result');
+        const resultContent = document.getElementById('result-content');
+
+        function showError(message) {
+            loading.style.display = 'none';
+            result.style.display = 'block';
+            resultContent.innerHTML = `
+                <div class="error">
+                    <p><strong>Помилка:</strong> ${escapeHtml(message)}</p>
+                </div>
+            `;
+        }
+
+        function csrfToken() {
+            return document.querySelector('[name=csrfmiddlewaretoken]').value;
+        }
+
+        function showPreview(data) {
+            resultContent.innerHTML = `
+                <div class="preview">
+                    <p><strong>Попередній перегляд змін</strong> (ще нічого не записано)</p>
+                    ${summaryHtml(data.summary)}
+                    <pre>${escapeHtml(data.message)}</pre>
+                    <button type="button" class="default" id="apply-import">Застосувати зміни</button>
+                </div>
+            `;
+            document.getElementById('apply-import').addEventListener('click', function () {
+                this.disabled = true;
+                loading.innerHTML = '<p>Застосування змін...</p>';
+                loading.style.display = 'block';
+                result.style.display = 'none';
+                fetch(data.apply_url, {method: 'POST', headers: {'X-CSRFToken': csrfToken()}})
+                    .then(response => response.json())
+                    .then(applied => {
+                        if (applied.job_id) {
+                            poll(applied.status_url);
+                        } else {
+                            showError(applied.error);
+                        }
+                    })
+                    .catch(error => showError(error.message));
+            });
+        }
+
+        function showResult(data) {
+            loading.style.display = 'none';
+            result.style.display = 'block';
+            if (data.preview) {
+                showPreview(data);
+            } else if (data.success) {
+                resultContent.innerHTML = `
+                    <div class="success">
+                        <p><strong>Успішно імпортовано:</strong> ${data.success_count} ${unitLabel}</p>
+                        <p><strong>Помилок:</strong> ${data.error_count}</p>
+                        <pre>${escapeHtml(data.message)}</pre>
+                    </div>
+                `;
+            } else {
+                showError(data.error);
+            }
+        }
+
+        function poll(url) {
+            fetch(url, {headers: {'Accept': 'application/json'}})
+                .then(response => response.json())
+                .then(data => {
+                    if (data.finished) {
+                        showResult(data);
+                        return;
+                    }
+                    loading.innerHTML = progressHtml(data);
+                    setTimeout(() => poll(url), POLL_INTERVAL);
+                })
+                .catch(error => showError(error.message));
+        }
+
+        form.addEventListener('submit', function (e) {
+            e.preventDefault();
+
+            loading.innerHTML = '<p>Завантаження файлу...</p>';
+            loading.style.display = 'block';
+            result.style.display = 'none';
+
+            fetch(window.location.href, {
+                method: 'POST',
+                body: new FormData(form),
+                headers: {
+                    'X-CSRFToken': csrfToken()
+                }
+            })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.job_id) {
+                        poll(data.status_url);
+                    } else {
+                        showError(data.error);
+                    }
+                })
+                .catch(error => showError(error.message));
+        });
+    };
+})();
@@ -25,17 +25,96 @@ function markItemAsRead(el) {
         if (data.is_read) {
             el.classList.add('read');
         }
+        if (typeof data.unread_count === 'number') {
+            updateMessageBadges(data.unread_count);
+        }
     })
     .catch(err => console.error(`Error marking ${id} as read:`, err));
 }
 
-/** Mark all unread, given a NodeList or selector */
+/** Update unread counters in the header (desktop + mobile) */
+function updateMessageBadges(count) {
+    ['message-indicator', 'message-indicator-mobile'].forEach(id => {
+        const badge = document.getElementById(id);
+        if (!badge) return;
+        badge.textContent = count < 10 ? count : '9+';
+        badge.style.display = count === 0 ? 'none' : '';
+    });
+}
+
+/**
+ * Lazily load a page of messages into a container (header popup or mobile overlay).
+ * The first page replaces the content, "load more" pages replace the button.
+ */
+function loadMessages(container, url, replaceEl) {
+    return fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+        .then(resp => {
+            if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+            return resp.text();
+        })
+        .then(html => {
+            if (replaceEl) {
+                replaceEl.insertAdjacentHTML('beforebegin', html);
+                replaceEl.remove();
+            } else {
+                container.innerHTML = html;
+            }
+            container.dataset.loaded = 'true';
+        })
+        .catch(err => console.error('Error loading messages:', err));
+}
+
+/** Load the first page once, then run callback */
+function ensureMessagesLoaded(container, callback) {
+    if (!container) return;
+    if (container.dataset.loaded) {
+        callback();
+        return;
+    }
+    loadMessages(container, container.dataset.url).then(callback);
+}
+
+/** "Load more" button inside a messages container */
+function bindLoadMore(container, unreadSelector) {
+    if (!container) return;
+    container.addEventListener('click', event => {
+        const button = event.target.closest('.load-more-messages');
+        if (!button) return;
+        event.preventDefault();
+        // Keep the popup open: the button is removed from DOM after loading
+        event.stopPropagation();
+        loadMessages(container, button.dataset.url, button)
+            .then(() => markAllUnreadIn(unreadSelector));
+    });
+}
+
+/** Mark all unread, given a NodeList or selector, with a single request */
 function markAllUnreadIn(target) {
-    const list = (typeof target === 'string')
+    const list = Array.from((typeof target === 'string')
         ? document.querySelectorAll(target)
-        : target;
-    if (!list) return;
-    list.forEach(el => markItemAsRead(el));
+        : (target || []))
+        .filter(el => el.dataset.id && !el.classList.contains('read'));
+    if (!list.length) return;
+
+    fetch('/notifications/read/', {
+        method: "POST",
+        headers: {
+            "X-CSRFToken": csrfToken,
+            "Content-Type": "application/json"
+        },
+        body: JSON.stringify({ ids: list.map(el => parseInt(el.dataset.id, 10)) })
+    })
+    .then(resp => {
+        if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+        return resp.json();
+    })
+    .then(data => {
+        list.forEach(el => el.classList.add('read'));
+        if (typeof data.unread_count === 'number') {
+            updateMessageBadges(data.unread_count);
+        }
+    })
+    .catch(err => console.error('Error marking messages as read:', err));
 }
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -94,10 +173,11 @@ document.addEventListener('DOMContentLoaded', () => {
             if (messagePopup.classList.contains('show')) {
                 // Hide counter badge
                 if (messageIndicator) messageIndicator.style.display = 'none';
-                // Mark desktop messages as read
-                markAllUnreadIn('.message-item.message:not(.read)');
+                // Load messages on first open, then mark desktop messages as read
+                ensureMessagesLoaded(messagePopup, () => markAllUnreadIn('.message-item.message:not(.read)'));
             }
         });
+        bindLoadMore(messagePopup, '.message-item.message:not(.read)');
     }
 
     // --- Do not close dropdowns when rejection modal is open
@@ -125,9 +205,16 @@ document.addEventListener('DOMContentLoaded', () => {
             // Here we just schedule marking as read slightly later to ensure DOM is ready.
             setTimeout(() => {
                 if (mobileMsgIndicator) mobileMsgIndicator.style.display = 'none';
-                markAllUnreadIn('#mobile-messages-content .mobile-message-item:not(.read)');
+                ensureMessagesLoaded(
+                    document.getElementById('mobile-messages-content'),
+                    () => markAllUnreadIn('#mobile-messages-content .mobile-message-item:not(.read)')
+                );
             }, 0);
         });
+        bindLoadMore(
+            document.getElementById('mobile-messages-content'),
+            '#mobile-messages-content .mobile-message-item:not(.read)'
+        );
 
         // Also mark a single message immediately on tap inside mobile overlay
         mobileMessagesOverlay.addEventListener('click', e => {
@@ -173,8 +260,48 @@ document.addEventListener('DOMContentLoaded', () => {
 
 });
 
-// Websocket push: show indicator + drop item into list
+/** Build notification markup from a JSON item (text is inserted as textContent) */
+function renderNotification(item, profileUrl) {
+    const wrapper = document.createElement('div');
+    wrapper.className = 'notification';
+    wrapper.setAttribute('role', 'alert');
+
+    const link = document.createElement('a');
+    link.href = profileUrl;
+    link.style.textDecoration = 'none';
+    link.style.display = 'block';
+
+    const text = document.createElement('p');
+    text.className = 'notification-text';
+    const strong = document.createElement('strong');
+    strong.textContent = 'Увага!';
+    text.append(strong, ' ' + item.notification);
+    link.appendChild(text);
+
+    const time = document.createElement('div');
+    time.className = 'notification-time';
+    time.textContent = item.time;
+
+    wrapper.append(link, time);
+    return wrapper;
+}
+
+// Websocket push: one JSON frame may carry several coalesced notifications and the unread counter
 document.body.addEventListener('htmx:wsAfterMessage', function(event) {
+    let frame;
+    try {
+        frame = JSON.parse(event.detail.message);
+    } catch (err) {
+        console.error('Invalid websocket payload:', err);
+        return;
+    }
+
+    if (typeof frame.unread_count === 'number') {
+        updateMessageBadges(frame.unread_count);
+    }
+    const items = frame.items || [];
+    if (!items.length) return;
+
     // Show indicators
     const notificationDot = document.getElementById('notification-indicator');
     const mobileNotifIndicator = document.getElementById('notification-indicator-mobile');
@@ -185,15 +312,13 @@ document.body.addEventListener('htmx:wsAfterMessage', function(event) {
     const noNotificationsMsg = document.getElementById('no-notifications-message');
     if (noNotificationsMsg) noNotificationsMsg.remove();
 
-    // Add the new notification HTML (server-sent) to a container if possible
-    if (event.detail.message) {
-        const container =
-            document.getElementById('notifications-container') ||
-            document.getElementById('notification-list');
-        if (container) {
-            container.insertAdjacentHTML('afterbegin', event.detail.message);
-        }
-    }
+    const container =
+        document.getElementById('notifications-container') ||
+        document.getElementById('notification-list');
+    if (!container) return;
+    const profileUrl = container.dataset.profileUrl || '/';
+    // Newest first, same as the server-rendered order
+    items.forEach(item => container.prepend(renderNotification(item, profileUrl)));
 });
 
 